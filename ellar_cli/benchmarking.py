@@ -0,0 +1,439 @@
+"""
+In-process benchmarking of an ASGI application.
+
+`ellar bench` drives synthetic requests at the routes of an application by calling its
+ASGI callable directly, without sockets or a server, and reports the throughput and the
+latency percentiles of every route. `LatencyHistogram` records the latencies of
+`ellar loadtest`.
+"""
+
+import asyncio
+import contextlib
+import fnmatch
+import json
+import math
+import re
+import time
+import typing as t
+
+__all__ = [
+    "BenchRequest",
+    "BenchRoute",
+    "LATENCY_PERCENTILES",
+    "LatencyHistogram",
+    "RouteResult",
+    "benchmark_route",
+    "build_requests",
+    "filter_routes",
+    "get_routes",
+    "lifespan",
+    "percentile",
+]
+
+LATENCY_PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+_PATH_PARAM = re.compile(r"{([a-zA-Z_][a-zA-Z0-9_]*)(?::([a-zA-Z_][a-zA-Z0-9_]*))?}")
+
+# values used for path parameters the fixtures don't set, by convertor
+_DEFAULT_PATH_VALUES = {
+    "str": "bench",
+    "path": "bench",
+    "int": "1",
+    "float": "1.0",
+    "uuid": "00000000-0000-4000-8000-000000000001",
+}
+
+
+class BenchRoute(t.NamedTuple):
+    method: str
+    path: str
+    name: t.Optional[str]
+
+    @property
+    def key(self) -> str:
+        """Identifies the route in fixtures and reports, e.g. `GET /items/{item_id:int}`"""
+        return f"{self.method} {self.path}"
+
+
+class BenchRequest(t.NamedTuple):
+    scope: t.Dict[str, t.Any]
+    body: bytes
+
+
+class RouteResult(t.NamedTuple):
+    route: BenchRoute
+    requests: int
+    duration: float
+    latencies: t.List[float]
+    statuses: t.Dict[str, int]
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.duration if self.duration else 0.0
+
+    @property
+    def failed(self) -> int:
+        """Requests that raised or returned a server error"""
+        return sum(
+            count
+            for status, count in self.statuses.items()
+            if status == "error" or status.startswith("5")
+        )
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "route": self.route.key,
+            "name": self.route.name,
+            "requests": self.requests,
+            "duration_s": round(self.duration, 3),
+            "requests_per_second": round(self.requests_per_second, 1),
+            "latency_ms": {
+                f"p{p:g}": round(percentile(self.latencies, p) * 1000, 3)
+                for p in LATENCY_PERCENTILES
+            },
+            "statuses": self.statuses,
+        }
+
+
+def percentile(sorted_values: t.Sequence[float], p: float) -> float:
+    """Nearest-rank percentile of already sorted values, 0 when there are none"""
+    if not sorted_values:
+        return 0.0
+    # rounded first, so that 99.9% of 1000 values is 999 and not 1000
+    rank = math.ceil(round(p / 100 * len(sorted_values), 9))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+class LatencyHistogram:
+    """
+    Histogram of latencies in microseconds with HDR histogram buckets: every value is
+    recorded with `significant_figures` decimal digits of precision, whatever its magnitude,
+    so millions of latencies take a few thousand counters.
+    """
+
+    def __init__(self, significant_figures: int = 3) -> None:
+        self.significant_figures = significant_figures
+        # values up to `_sub_bucket_mask` are recorded exactly. Above, each power of two
+        # range is split into as many sub-buckets as the range below it
+        self._magnitude = math.ceil(math.log2(2 * 10**significant_figures))
+        self._sub_bucket_mask = (1 << self._magnitude) - 1
+        self.counts: t.Dict[int, int] = {}
+        self.total_count = 0
+        self.min = 0
+        self.max = 0
+        self._total = 0
+
+    def _bucket_shift(self, value: int) -> int:
+        return max((value | self._sub_bucket_mask).bit_length() - self._magnitude, 0)
+
+    def record(self, value: float, count: int = 1) -> None:
+        value = max(int(value), 0)
+        shift = self._bucket_shift(value)
+        lowest = (value >> shift) << shift
+        self.counts[lowest] = self.counts.get(lowest, 0) + count
+        self.min = value if not self.total_count else min(self.min, value)
+        self.max = max(self.max, value)
+        self.total_count += count
+        self._total += value * count
+
+    def record_corrected(
+        self, value: float, expected_interval: float, count: int = 1
+    ) -> None:
+        """
+        Records `value`, and the latencies the requests that would have been sent every
+        `expected_interval` during a stall would have had, like HdrHistogram's
+        `recordValueWithExpectedInterval`. Corrects the coordinated omission of
+        load generators that wait for a response before sending the next request.
+        """
+        self.record(value, count)
+        if expected_interval <= 0:
+            return
+        missing = value - expected_interval
+        while missing >= expected_interval:
+            self.record(missing, count)
+            missing -= expected_interval
+
+    def corrected(self, expected_interval: float) -> "LatencyHistogram":
+        """Copy of this histogram corrected for coordinated omission, see `record_corrected`"""
+        histogram = LatencyHistogram(self.significant_figures)
+        for value, count in self.counts.items():
+            histogram.record_corrected(value, expected_interval, count)
+        return histogram
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for value, count in other.counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        if other.total_count:
+            self.min = other.min if not self.total_count else min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.total_count += other.total_count
+        self._total += other._total
+
+    @property
+    def mean(self) -> float:
+        return self._total / self.total_count if self.total_count else 0.0
+
+    def value_at_percentile(self, p: float) -> int:
+        """Highest value equivalent to the nearest-rank percentile `p`, 0 when empty"""
+        if not self.total_count:
+            return 0
+        rank = max(math.ceil(round(p / 100 * self.total_count, 9)), 1)
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if seen >= rank:
+                highest = value + (1 << self._bucket_shift(value)) - 1
+                return min(highest, self.max)
+        return self.max  # pragma: no cover
+
+    def to_dict(self, percentiles: t.Sequence[float]) -> t.Dict[str, float]:
+        """Count, extremes, mean and `percentiles` of the histogram, in milliseconds"""
+        result: t.Dict[str, float] = {
+            "count": self.total_count,
+            "min": self.min / 1000,
+            "mean": round(self.mean / 1000, 3),
+            "max": self.max / 1000,
+        }
+        for p in percentiles:
+            result[f"p{p:g}"] = self.value_at_percentile(p) / 1000
+        return result
+
+
+def get_routes(routes: t.Iterable[t.Any], prefix: str = "") -> t.Iterator[BenchRoute]:
+    """
+    HTTP routes of a router, mounted routers included. `HEAD` is left out for routes that
+    also answer `GET`. Websocket routes and mounted applications without routes are skipped.
+    """
+    for route in routes:
+        path = prefix + getattr(route, "path", "")
+        methods = getattr(route, "methods", None)
+        if methods:
+            for method in sorted(methods):
+                if method == "HEAD" and "GET" in methods:
+                    continue
+                yield BenchRoute(method, path or "/", getattr(route, "name", None))
+        else:
+            yield from get_routes(
+                getattr(route, "routes", None) or [], path.rstrip("/")
+            )
+
+
+def filter_routes(
+    routes: t.Iterable[BenchRoute], patterns: t.Sequence[str]
+) -> t.List[BenchRoute]:
+    """Routes whose key (`GET /items/`) or path match one of the glob `patterns`"""
+    if not patterns:
+        return list(routes)
+    return [
+        route
+        for route in routes
+        if any(
+            fnmatch.fnmatchcase(route.key, pattern)
+            or fnmatch.fnmatchcase(route.path, pattern)
+            for pattern in patterns
+        )
+    ]
+
+
+def _format_path(path: str, path_params: t.Mapping[str, t.Any]) -> str:
+    def _path_value(match: "re.Match[str]") -> str:
+        name, convertor = match.group(1), match.group(2) or "str"
+        if name in path_params:
+            return str(path_params[name])
+        return _DEFAULT_PATH_VALUES.get(convertor, "bench")
+
+    return _PATH_PARAM.sub(_path_value, path)
+
+
+def build_requests(
+    route: BenchRoute, fixtures: t.Sequence[t.Mapping[str, t.Any]]
+) -> t.List[BenchRequest]:
+    """
+    Requests to send to `route`, one per fixture, or a single request without a body when
+    there are no fixtures. A fixture may set `path_params`, `query`, `headers` and either a
+    `json` or a raw `body`.
+    """
+    requests = []
+    for fixture in fixtures or [{}]:
+        path = _format_path(route.path, fixture.get("path_params", {}))
+        headers = {
+            str(name).lower(): str(value)
+            for name, value in fixture.get("headers", {}).items()
+        }
+        if "json" in fixture:
+            body = json.dumps(fixture["json"]).encode()
+            headers.setdefault("content-type", "application/json")
+        else:
+            body = str(fixture.get("body", "")).encode()
+        headers.setdefault("host", "testserver")
+        headers.setdefault("user-agent", "ellar-bench")
+        if body:
+            headers["content-length"] = str(len(body))
+
+        query = fixture.get("query", "")
+        if isinstance(query, t.Mapping):
+            from urllib.parse import urlencode
+
+            query = urlencode(query, doseq=True)
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": "1.1",
+            "method": route.method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": str(query).encode(),
+            "headers": [
+                (name.encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers.items()
+            ],
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        requests.append(BenchRequest(scope, body))
+    return requests
+
+
+async def _send_request(
+    app: t.Callable[..., t.Awaitable[None]],
+    request: BenchRequest,
+    state: t.Dict[str, t.Any],
+) -> str:
+    """
+    Sends `request` to `app`. Returns the response status, `error` if the app raised
+    before starting a response.
+    """
+    status = "error"
+    response_complete = asyncio.Event()
+    body_sent = False
+
+    async def receive() -> t.Dict[str, t.Any]:
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": request.body, "more_body": False}
+        await response_complete.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: t.Dict[str, t.Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = str(message["status"])
+        elif message["type"] == "http.response.body" and not message.get(
+            "more_body", False
+        ):
+            response_complete.set()
+
+    scope = dict(request.scope, state=dict(state))
+    try:
+        await app(scope, receive, send)
+    except Exception:
+        # applications may raise again after sending an error response, like in debug mode
+        pass
+    finally:
+        response_complete.set()
+    return status
+
+
+async def benchmark_route(
+    app: t.Callable[..., t.Awaitable[None]],
+    route: BenchRoute,
+    requests: t.Sequence[BenchRequest],
+    concurrency: int,
+    duration: float,
+    warmup: float = 0.0,
+    state: t.Optional[t.Dict[str, t.Any]] = None,
+) -> RouteResult:
+    """
+    Sends `requests` to `app` in turn from `concurrency` concurrent clients, each sending
+    its next request once the previous one completed, for `duration` seconds.
+    Nothing is recorded during the first `warmup` seconds.
+    """
+    state = state if state is not None else {}
+    latencies: t.List[float] = []
+    statuses: t.Dict[str, int] = {}
+    counter = 0
+
+    async def _client(until: float, record: bool) -> None:
+        nonlocal counter
+        clock = time.perf_counter
+        while clock() < until:
+            request = requests[counter % len(requests)]
+            counter += 1
+            start = clock()
+            status = await _send_request(app, request, state)
+            if record:
+                latencies.append(clock() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+
+    if warmup > 0:
+        until = time.perf_counter() + warmup
+        await asyncio.gather(*(_client(until, False) for _ in range(concurrency)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(start + duration, True) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return RouteResult(route, len(latencies), elapsed, latencies, statuses)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(
+    app: t.Callable[..., t.Awaitable[None]],
+) -> t.AsyncIterator[t.Dict[str, t.Any]]:
+    """
+    Runs the lifespan of `app` around the block, like a server would. Yields the lifespan
+    state. Applications that don't support the lifespan protocol run without it.
+    """
+    from ellar_cli.service import EllarCLIException
+
+    state: t.Dict[str, t.Any] = {}
+    receive_queue: "asyncio.Queue[t.Dict[str, t.Any]]" = asyncio.Queue()
+    startup_done: "asyncio.Future[t.Dict[str, t.Any]]" = (
+        asyncio.get_running_loop().create_future()
+    )
+    shutdown_done: "asyncio.Future[t.Dict[str, t.Any]]" = (
+        asyncio.get_running_loop().create_future()
+    )
+
+    async def send(message: t.Dict[str, t.Any]) -> None:
+        if message["type"].startswith("lifespan.startup"):
+            startup_done.set_result(message)
+        elif message["type"].startswith("lifespan.shutdown"):
+            shutdown_done.set_result(message)
+
+    scope = {
+        "type": "lifespan",
+        "asgi": {"version": "3.0", "spec_version": "2.0"},
+        "state": state,
+    }
+    task: "asyncio.Future[t.Any]" = asyncio.ensure_future(
+        app(scope, receive_queue.get, send)
+    )
+    await receive_queue.put({"type": "lifespan.startup"})
+    await asyncio.wait([task, startup_done], return_when=asyncio.FIRST_COMPLETED)
+
+    if not startup_done.done():
+        # the lifespan protocol isn't supported
+        with contextlib.suppress(Exception):
+            task.result()
+        yield state
+        return
+
+    message = startup_done.result()
+    if message["type"] == "lifespan.startup.failed":
+        raise EllarCLIException(
+            f"Application startup failed. {message.get('message', '')}".strip()
+        )
+
+    try:
+        yield state
+    finally:
+        await receive_queue.put({"type": "lifespan.shutdown"})
+        await asyncio.wait([task, shutdown_done], return_when=asyncio.FIRST_COMPLETED)
+        if not task.done():
+            task.cancel()
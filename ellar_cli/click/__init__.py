@@ -22,6 +22,7 @@ from click.exceptions import FileError as FileError
 from click.exceptions import MissingParameter as MissingParameter
 from click.exceptions import NoSuchOption as NoSuchOption
 from click.exceptions import UsageError as UsageError
+from click.termui import clear as clear
 from click.types import BOOL as BOOL
 from click.types import FLOAT as FLOAT
 from click.types import INT as INT
@@ -42,7 +43,8 @@ from click.utils import get_app_dir as get_app_dir
 from click.utils import get_binary_stream as get_binary_stream
 from click.utils import get_text_stream as get_text_stream
 from click.utils import open_file as open_file
-from ellar.threading import run_as_sync
+
+from ellar_cli.constants import BootLevel
 
 from .argument import Argument
 from .command import Command
@@ -91,11 +93,16 @@ def group(
 __all__ = [
     "argument",
     "run_as_sync",
+    "fan_out",
+    "run_fan_out",
+    "parallel",
+    "run_in_processes",
     "command",
     "Argument",
     "Option",
     "option",
     "AppContextGroup",
+    "BootLevel",
     "EllarCommandGroup",
     "with_injector_context",
     "Context",
@@ -132,6 +139,7 @@ __all__ = [
     "Tuple",
     "UNPROCESSED",
     "UUID",
+    "clear",
     "echo",
     "format_filename",
     "get_app_dir",
@@ -142,5 +150,24 @@ __all__ = [
 ]
 
 
+def __getattr__(name: str) -> t.Any:
+    if name == "run_as_sync":
+        # re-exported lazily, `ellar_cli.event_loop` imports asyncio
+        from ellar_cli.event_loop import run_as_sync
+
+        return run_as_sync
+    if name in ("fan_out", "run_fan_out"):
+        # `asyncio` is only imported by commands that use them
+        from . import pipeline
+
+        return getattr(pipeline, name)
+    if name in ("parallel", "run_in_processes"):
+        # `multiprocessing` is only imported by commands that use them
+        from . import process_pool
+
+        return getattr(process_pool, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 def __dir__() -> t.List[str]:
     return sorted(__all__)  # pragma: no cover
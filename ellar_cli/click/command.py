@@ -2,12 +2,21 @@ import typing as t
 
 import click
 
+from ellar_cli.constants import BootLevel
+
 
 class Command(click.Command):
     """
-    The same as click.Command with extra behavior to print command args and options
+    The same as click.Command with extra behavior to print command args and options.
+    `boot_level` is the least of the project the command needs to run.
     """
 
+    def __init__(
+        self, *args: t.Any, boot_level: BootLevel = BootLevel.APP, **kwargs: t.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.boot_level = boot_level
+
     # overridden to support displaying args before the options metavar
     def collect_usage_pieces(self, ctx: click.Context) -> t.List[str]:
         rv: t.List[str] = []
@@ -1,18 +1,35 @@
 import inspect
+import os
+import sys
 import typing as t
 
 import click
-from ellar.app import AppFactory
-from ellar.common.constants import MODULE_METADATA
-from ellar.core import ModuleBase, ModuleSetup, reflector
-from ellar.threading import run_as_sync
 
-from ellar_cli.constants import ELLAR_META
-from ellar_cli.service import EllarCLIService, EllarCLIServiceWithPyProject
+from ellar_cli.constants import (
+    ELLAR_COMMAND_MANIFEST_ENV,
+    ELLAR_META,
+    ELLAR_STATIC_DISCOVERY_ENV,
+    PY_PROJECT_TOML,
+    BootLevel,
+)
+from ellar_cli.daemon_paths import has_daemon_sockets
+from ellar_cli.profiling import cli_phase
 
 from .command import Command
+from .lazy import LazyCommand, command_from_spec, command_to_spec, import_string_loader
 from .util import with_injector_context
 
+if t.TYPE_CHECKING:  # pragma: no cover
+    from ellar.core import ModuleBase
+
+    from ellar_cli.service import EllarCLIService, EllarCLIServiceWithPyProject
+
+# NB: ellar and `ellar_cli.service` are imported where they are used. Importing them
+# costs far more than listing the builtin commands, which should not pay for it.
+
+# `ctx.meta` key set once the commands registered by the project modules are loaded
+_COMMANDS_LOADED = "ELLAR_COMMANDS_LOADED"
+
 
 class AppContextGroup(click.Group):
     """This works similar to a regular click.Group, but it
@@ -22,6 +39,12 @@ class AppContextGroup(click.Group):
 
     command_class = Command
 
+    def __init__(
+        self, *args: t.Any, boot_level: BootLevel = BootLevel.APP, **kwargs: t.Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.boot_level = boot_level
+
     def command(  # type:ignore[override]
         self, *args: t.Any, **kwargs: t.Any
     ) -> t.Union[t.Callable[[t.Callable[..., t.Any]], click.Command], click.Command]:
@@ -33,6 +56,8 @@ class AppContextGroup(click.Group):
 
         def decorator(f: t.Callable) -> t.Any:
             if inspect.iscoroutinefunction(f):
+                from ellar_cli.event_loop import run_as_sync
+
                 f = run_as_sync(f)
 
             if wrap_for_ctx:
@@ -61,58 +86,323 @@ class EllarCommandGroup(AppContextGroup):
         meta = None
 
         if app_import_string:
+            from ellar_cli.service import EllarCLIServiceWithPyProject
+
             meta = EllarCLIServiceWithPyProject(app_import_string=app_import_string)
 
-        self._cli_meta: t.Optional[EllarCLIServiceWithPyProject] = meta
+        self._app_import_string = app_import_string
+        self._cli_meta: t.Optional["EllarCLIServiceWithPyProject"] = meta
+        self._preloaded_meta: t.Dict[t.Optional[str], "EllarCLIService"] = {}
 
-    def _load_application_commands(self, ctx: click.Context) -> None:
-        # get project option from cli
-        module_configs: t.Any
+    @property
+    def app_import_string(self) -> t.Optional[str]:
+        return self._app_import_string
+
+    def main(
+        self,
+        args: t.Optional[t.Sequence[str]] = None,
+        prog_name: t.Optional[str] = None,
+        complete_var: t.Optional[str] = None,
+        standalone_mode: bool = True,
+        **extra: t.Any,
+    ) -> t.Any:
+        """Runs the invocation in `ellar daemon` if one is serving the current directory."""
+        cli_args = list(sys.argv[1:] if args is None else args)
+        if (
+            standalone_mode
+            and not extra
+            and has_daemon_sockets()
+            and self._get_command_name(cli_args) != "daemon"
+        ):
+            # `ellar_cli.daemon` is imported only when a daemon may be running
+            from ellar_cli import daemon
+
+            if not daemon.is_daemon_process():
+                socket_path, _ = daemon.get_daemon_paths(self._app_import_string)
+                exit_code = daemon.forward_to_daemon(
+                    socket_path,
+                    cli_args,
+                    prog_name or os.path.basename(sys.argv[0]),
+                )
+                if exit_code is not None:
+                    sys.exit(exit_code)
+
+        return super().main(
+            args=args,
+            prog_name=prog_name,
+            complete_var=complete_var,
+            standalone_mode=standalone_mode,
+            **extra,
+        )
+
+    def _get_command_name(self, args: t.Sequence[str]) -> t.Optional[str]:
+        """Name of the command `args` invoke, skipping the options of this group"""
+        takes_value = {
+            opt
+            for param in self.params
+            if isinstance(param, click.Option) and not param.is_flag and not param.count
+            for opt in param.opts
+        }
+        remaining = iter(args)
+        for arg in remaining:
+            if arg == "--":
+                return next(remaining, None)
+            if arg in takes_value:
+                next(remaining, None)
+            elif not arg.startswith("-"):
+                return arg
+        return None
+
+    def preload(self, project: t.Optional[str]) -> t.Optional["EllarCLIService"]:
+        """
+        Boots the application and loads its commands ahead of any invocation.
+        Invocations for `project` then reuse them. Used by `ellar daemon`.
+        """
         if self._cli_meta:
-            application = self._cli_meta.import_application()
+            self._load_commands_from_modules(self._cli_meta)
+            return self._cli_meta
 
-            module_configs = (
-                i for i in application.injector.tree_manager.modules.keys()
-            )
+        from ellar_cli.service import EllarCLIService
+
+        meta_ = EllarCLIService.import_project_meta(project)
+        if meta_ and meta_.has_meta:
+            self._load_commands_from_modules(meta_)
+            meta_.boot(BootLevel.APP)
+
+            self._preloaded_meta[project] = meta_
+            self._preloaded_meta[meta_.app] = meta_
+            if meta_.ellar_py_projects.default_project == meta_.app:
+                self._preloaded_meta["default"] = meta_
+        return meta_
+
+    def is_preloaded(self, project: t.Optional[str]) -> bool:
+        return self._cli_meta is not None or project in self._preloaded_meta
+
+    def get_command_sources(self) -> t.Set[str]:
+        """Source files of the registered commands"""
+        return self._get_command_sources(self.commands.values())
 
-            ctx.meta[ELLAR_META] = self._cli_meta
-        else:
-            module_configs = ()
+    def add_lazy_command(
+        self,
+        import_string: str,
+        name: str,
+        help: t.Optional[str] = None,
+        hidden: bool = False,
+        boot_level: BootLevel = BootLevel.APP,
+    ) -> None:
+        """
+        Registers a command by its `module:attribute` import string.
+        The command is imported only when it is invoked or its help is requested;
+        `help` is used to describe it in this group's command listing.
+        `boot_level` must match the boot level of the command.
+        """
+        self.add_command(
+            LazyCommand(
+                name,
+                import_string_loader(import_string),
+                serve_help=False,
+                help=help,
+                hidden=hidden,
+                boot_level=boot_level,
+            ),
+            name,
+        )
+
+    def _load_project_meta(self, ctx: click.Context) -> t.Optional["EllarCLIService"]:
+        """Sets `ctx.meta[ELLAR_META]`. Only reads project metadata, nothing is imported."""
+        if ELLAR_META not in ctx.meta:
+            # get project option from cli
             app_name = ctx.params.get("project")
 
-            # loads project metadata from pyproject.toml
-            meta_: t.Optional[EllarCLIService] = EllarCLIService.import_project_meta(
-                app_name
+            if self._cli_meta:
+                ctx.meta[ELLAR_META] = self._cli_meta
+            elif app_name in self._preloaded_meta:
+                ctx.meta[ELLAR_META] = self._preloaded_meta[app_name]
+            elif not os.path.exists(os.path.join(os.getcwd(), PY_PROJECT_TOML)):
+                ctx.meta[ELLAR_META] = None
+            else:
+                with cli_phase("import_ellar"):
+                    from ellar_cli.service import EllarCLIService
+
+                # loads project metadata from pyproject.toml
+                with cli_phase("import_project_meta"):
+                    ctx.meta[ELLAR_META] = EllarCLIService.import_project_meta(app_name)
+        return t.cast(t.Optional["EllarCLIService"], ctx.meta[ELLAR_META])
+
+    def _load_application_commands(self, ctx: click.Context) -> None:
+        ctx.meta[_COMMANDS_LOADED] = True
+        meta_ = self._load_project_meta(ctx)
+
+        if (
+            not meta_
+            or not meta_.has_meta
+            or ctx.params.get("project") in self._preloaded_meta
+        ):
+            return
+
+        if self._cli_meta:
+            self._load_commands_from_modules(meta_)
+            return
+
+        from ellar_cli.service import CommandManifest, StaticCommandDiscovery
+
+        manifest = CommandManifest(meta_) if self._use_command_manifest() else None
+        with cli_phase("load_command_manifest"):
+            command_specs = manifest.load() if manifest else None
+
+        if command_specs is None and self._use_static_discovery():
+            discovery = StaticCommandDiscovery(meta_)
+            with cli_phase("static_command_discovery"):
+                command_specs = discovery.discover()
+            if command_specs is not None and manifest:
+                manifest.save(command_specs, discovery.source_files)
+
+        if command_specs is not None:
+            self._add_commands_from_manifest(command_specs, meta_)
+            return
+
+        commands = self._load_commands_from_modules(meta_)
+        if manifest:
+            manifest.save(
+                [
+                    command_to_spec(command)
+                    for command in {c.name: c for c in commands}.values()
+                ],
+                self._get_command_sources(commands),
             )
 
-            ctx.meta[ELLAR_META] = meta_
+    @classmethod
+    def _use_command_manifest(cls) -> bool:
+        return os.environ.get(ELLAR_COMMAND_MANIFEST_ENV, "1").lower() not in (
+            "0",
+            "false",
+            "no",
+            "off",
+        )
 
-            if meta_ and meta_.has_meta:
-                tree_manager = AppFactory.read_all_module(
-                    ModuleSetup(meta_.import_root_module())
-                )
-                module_configs = tree_manager.modules.keys()
-        self._find_commands_from_modules(module_configs)
+    @classmethod
+    def _use_static_discovery(cls) -> bool:
+        return os.environ.get(ELLAR_STATIC_DISCOVERY_ENV, "0").lower() in (
+            "1",
+            "true",
+            "yes",
+            "on",
+        )
+
+    def _load_commands_from_modules(
+        self, meta_: "EllarCLIService"
+    ) -> t.List[click.Command]:
+        module_configs: t.Any = meta_.get_module_tree().modules.keys()
+        with cli_phase("find_commands_from_modules"):
+            return self._find_commands_from_modules(module_configs)
+
+    def _add_commands_from_manifest(
+        self, command_specs: t.List[t.Dict[str, t.Any]], meta_: "EllarCLIService"
+    ) -> None:
+        for spec in command_specs:
+
+            def _loader(
+                ctx: t.Optional[click.Context],
+                name: str = spec["name"],
+                import_string: t.Optional[str] = spec["import"],
+            ) -> click.Command:
+                if import_string:
+                    from ellar.utils.importer import import_from_string
+
+                    command = import_from_string(import_string)
+                    if isinstance(command, click.Command):
+                        return command
+                # command location is unknown. Fall back to reading the modules
+                self._load_commands_from_modules(meta_)
+                return self.commands[name]
+
+            self.add_command(command_from_spec(spec, _loader), spec["name"])
+
+    @classmethod
+    def _get_command_sources(cls, commands: t.Iterable[click.Command]) -> t.Set[str]:
+        sources: t.Set[str] = set()
+        for command in commands:
+            module = sys.modules.get(getattr(command.callback, "__module__", ""))
+            module_file = getattr(module, "__file__", None)
+            if module_file:
+                sources.add(module_file)
+            if isinstance(command, click.Group):
+                sources.update(cls._get_command_sources(command.commands.values()))
+        return sources
 
     def _find_commands_from_modules(
         self,
-        modules: t.Union[t.Sequence[ModuleBase], t.Iterator[ModuleBase], t.Generator],
-    ) -> None:
+        modules: t.Union[
+            t.Sequence["ModuleBase"], t.Iterator["ModuleBase"], t.Generator
+        ],
+    ) -> t.List[click.Command]:
+        from ellar.common.constants import MODULE_METADATA
+        from ellar.core import reflector
+
+        commands = []
         for module in modules:
             click_commands = reflector.get(MODULE_METADATA.COMMANDS, module) or []
 
             for click_command in click_commands:
                 if isinstance(click_command, click.Command):
                     self.add_command(click_command, click_command.name)
+                    commands.append(click_command)
+        return commands
+
+    def invoke(self, ctx: click.Context) -> t.Any:
+        if ctx.params.get("all_projects") or ctx.params.get("projects"):
+            self._invoke_in_projects(ctx)
+        return super().invoke(ctx)
+
+    def _invoke_in_projects(self, ctx: click.Context) -> None:
+        """Runs the invoked command on the projects selected with `--all-projects` or `--projects`"""
+        from ellar_cli.multi_project import parse_projects_option, run_in_projects
+        from ellar_cli.service import EllarCLIException, EllarPyProject
+
+        # `protected_args` became `_protected_args` in click 8.2
+        protected_args = getattr(ctx, "_protected_args", None)
+        if protected_args is None:  # pragma: no cover
+            protected_args = ctx.protected_args
+
+        args = [*protected_args, *ctx.args]
+        if not args:
+            return
+
+        py_project_path = os.path.join(os.getcwd(), PY_PROJECT_TOML)
+        if self._cli_meta or not os.path.exists(py_project_path):
+            raise EllarCLIException(
+                "Running a command on many projects requires projects in pyproject.toml"
+            )
+
+        ellar_py_projects = EllarPyProject.read(py_project_path)
+        projects = parse_projects_option(
+            ctx.params.get("projects"),
+            bool(ctx.params.get("all_projects")),
+            ellar_py_projects.get_projects().keys() if ellar_py_projects else [],
+        )
+        if not projects:
+            raise EllarCLIException("No project found in pyproject.toml")
+
+        ctx.exit(run_in_projects(projects, args, ctx.params.get("jobs")))
 
     def get_command(
         self, ctx: click.Context, cmd_name: str
     ) -> t.Optional[click.Command]:
-        if ELLAR_META not in ctx.meta:
+        command = self.commands.get(cmd_name)
+        if (
+            command is not None
+            and getattr(command, "boot_level", BootLevel.APP) < BootLevel.MODULE_TREE
+        ):
+            # The project modules are not read for commands that boot less than
+            # the module tree. So they can't be overridden by module commands.
+            self._load_project_meta(ctx)
+            return command
+
+        if _COMMANDS_LOADED not in ctx.meta:
             self._load_application_commands(ctx)
         return super().get_command(ctx, cmd_name)
 
     def list_commands(self, ctx: click.Context) -> t.List[str]:
-        if ELLAR_META not in ctx.meta:
+        if _COMMANDS_LOADED not in ctx.meta:
             self._load_application_commands(ctx)
         return super().list_commands(ctx)
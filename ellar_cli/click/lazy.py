@@ -0,0 +1,268 @@
+import json
+import sys
+import typing as t
+
+import click
+
+from .argument import Argument
+from .command import Command
+
+CommandLoader = t.Callable[[t.Optional[click.Context]], click.Command]
+
+
+class _LazyCommandMixin:
+    """
+    Stands in for a command that has not been imported yet.
+
+    Help output and shell completion are served from the description the proxy
+    was created with. The real command is only loaded, through `loader`,
+    when the proxy is about to be executed.
+
+    With `serve_help=False`, the proxy only describes the command in its parent's
+    command listing and the real command is loaded for help and completion too.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        loader: CommandLoader,
+        serve_help: bool = True,
+        **kwargs: t.Any,
+    ) -> None:
+        super().__init__(name, **kwargs)  # type:ignore[call-arg]
+        self._loader = loader
+        self._serve_help = serve_help
+        self._resolved: t.Optional[click.Command] = None
+
+    def resolve(self, ctx: t.Optional[click.Context] = None) -> click.Command:
+        if self._resolved is None:
+            self._resolved = self._loader(ctx)
+        return self._resolved
+
+    def _can_serve_without_import(
+        self, args: t.List[str], parent: t.Optional[click.Context], **extra: t.Any
+    ) -> bool:
+        if not self._serve_help:
+            return False
+
+        if extra.get("resilient_parsing") or (
+            parent is not None and parent.resilient_parsing
+        ):
+            # shell completion
+            return True
+
+        if not args:
+            return bool(getattr(self, "no_args_is_help", False))
+
+        help_option_names = self.context_settings.get(  # type:ignore[attr-defined]
+            "help_option_names",
+            parent.help_option_names if parent is not None else ["--help"],
+        )
+        return any(arg in help_option_names for arg in args)
+
+    def make_context(
+        self,
+        info_name: t.Optional[str],
+        args: t.List[str],
+        parent: t.Optional[click.Context] = None,
+        **extra: t.Any,
+    ) -> click.Context:
+        if self._resolved is None and self._can_serve_without_import(
+            args, parent, **extra
+        ):
+            return super().make_context(  # type:ignore[misc,no-any-return]
+                info_name, args, parent=parent, **extra
+            )
+        return self.resolve(parent).make_context(
+            info_name, args, parent=parent, **extra
+        )
+
+
+class LazyCommand(_LazyCommandMixin, Command):
+    """Lazy version of `ellar_cli.click.Command`"""
+
+
+class LazyGroup(_LazyCommandMixin, click.Group):
+    """Lazy version of `click.Group`. Its subcommands are also lazy."""
+
+    command_class = LazyCommand
+
+
+def import_string_loader(import_string: str) -> CommandLoader:
+    """Returns a loader that imports a command from a `module:attribute` string"""
+
+    def _loader(ctx: t.Optional[click.Context]) -> click.Command:
+        from ellar.utils.importer import import_from_string
+
+        command = import_from_string(import_string)
+        if not isinstance(command, click.Command):  # pragma: no cover
+            raise click.UsageError(f"{import_string!r} is not a click command.", ctx)
+        return command
+
+    return _loader
+
+
+def find_command_import_string(command: click.Command) -> t.Optional[str]:
+    """
+    Returns `module:attribute` that references `command` in the module that defined its callback.
+    """
+    if command.callback is None:
+        return None
+
+    module_name = getattr(command.callback, "__module__", None)
+    module = sys.modules.get(module_name) if module_name else None
+
+    if module is None:
+        return None
+
+    for attr, value in vars(module).items():
+        if value is command:
+            return f"{module_name}:{attr}"
+    return None
+
+
+def _json_safe(value: t.Any) -> t.Any:
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return None
+    return value
+
+
+def _param_to_spec(param: click.Parameter) -> t.Dict[str, t.Any]:
+    type_info = param.type.to_info_dict()
+    if "choices" in type_info:
+        type_info["choices"] = [str(choice) for choice in type_info["choices"]]
+
+    return {
+        "kind": param.param_type_name,
+        "name": param.name,
+        "opts": list(param.opts),
+        "secondary_opts": list(param.secondary_opts),
+        "type": _json_safe(type_info) or {"param_type": "String"},
+        "required": param.required,
+        "nargs": param.nargs,
+        "multiple": param.multiple,
+        "default": None if callable(param.default) else _json_safe(param.default),
+        "metavar": param.metavar,
+        "help": getattr(param, "help", None),
+        "hidden": bool(getattr(param, "hidden", False)),
+        "is_flag": bool(getattr(param, "is_flag", False)),
+        "count": bool(getattr(param, "count", False)),
+        "show_default": _json_safe(getattr(param, "show_default", None)),
+    }
+
+
+def command_to_spec(
+    command: click.Command, import_string: t.Optional[str] = None
+) -> t.Dict[str, t.Any]:
+    """
+    Returns a json serializable description of `command`.
+    It holds just enough information to print help and complete params without importing the command.
+    """
+    spec: t.Dict[str, t.Any] = {
+        "name": command.name,
+        "import": import_string or find_command_import_string(command),
+        "help": command.help,
+        "short_help": command.short_help,
+        "epilog": command.epilog,
+        "hidden": command.hidden,
+        "params": [_param_to_spec(param) for param in command.params],
+        "commands": None,
+    }
+    if isinstance(command, click.Group):
+        spec["commands"] = [
+            command_to_spec(sub_command) for sub_command in command.commands.values()
+        ]
+    return spec
+
+
+def _param_type_from_spec(type_info: t.Dict[str, t.Any]) -> click.ParamType:
+    param_type = type_info.get("param_type")
+
+    if param_type == "Choice":
+        return click.Choice(
+            type_info.get("choices", []),
+            case_sensitive=type_info.get("case_sensitive", True),
+        )
+    if param_type in ("Path", "File"):
+        return click.Path()
+
+    return {
+        "Int": click.INT,
+        "IntRange": click.INT,
+        "Float": click.FLOAT,
+        "FloatRange": click.FLOAT,
+        "Bool": click.BOOL,
+        "UUID": click.UUID,
+    }.get(param_type, click.STRING)  # type:ignore[arg-type]
+
+
+def _param_from_spec(spec: t.Dict[str, t.Any]) -> click.Parameter:
+    decls = [spec["name"], *spec["opts"]]
+    kwargs = {
+        "type": _param_type_from_spec(spec["type"]),
+        "required": spec["required"],
+        "nargs": spec["nargs"],
+        "default": spec["default"],
+        "metavar": spec["metavar"],
+        "help": spec["help"],
+        "hidden": spec["hidden"],
+    }
+
+    if spec["kind"] == "argument":
+        return Argument([spec["name"]], **kwargs)
+
+    kwargs["multiple"] = spec["multiple"]
+    if spec["secondary_opts"]:
+        decls[-1] = f"{decls[-1]}/{spec['secondary_opts'][0]}"
+        kwargs.pop("type")
+
+    if spec["is_flag"] or spec["count"]:
+        kwargs.pop("nargs")
+        kwargs.pop("metavar")
+
+    return click.Option(
+        decls,
+        is_flag=spec["is_flag"] or None,
+        count=spec["count"],
+        show_default=spec["show_default"],
+        **kwargs,
+    )
+
+
+def command_from_spec(
+    spec: t.Dict[str, t.Any], loader: CommandLoader
+) -> t.Union[LazyCommand, LazyGroup]:
+    """
+    Creates a lazy command from a `command_to_spec` description.
+    Its subcommands are loaded from the resolved version of the group.
+    """
+    kwargs = {
+        "help": spec["help"],
+        "short_help": spec["short_help"],
+        "epilog": spec["epilog"],
+        "hidden": spec["hidden"],
+        "params": [_param_from_spec(param) for param in spec["params"]],
+    }
+
+    if spec["commands"] is None:
+        return LazyCommand(spec["name"], loader, **kwargs)
+
+    group = LazyGroup(spec["name"], loader, **kwargs)
+
+    for sub_spec in spec["commands"]:
+
+        def _sub_command_loader(
+            ctx: t.Optional[click.Context], name: str = sub_spec["name"]
+        ) -> click.Command:
+            resolved = t.cast(
+                click.Group, group.resolve(ctx.parent if ctx is not None else None)
+            )
+            command = resolved.get_command(ctx, name)  # type:ignore[arg-type]
+            if command is None:  # pragma: no cover
+                raise click.UsageError(f"No such command {name!r}.", ctx)
+            return command
+
+        group.add_command(command_from_spec(sub_spec, _sub_command_loader))
+    return group
@@ -0,0 +1,316 @@
+import asyncio
+import functools
+import itertools
+import json
+import os
+import signal
+import time
+import typing as t
+
+import click
+
+__all__ = ["FanOutStats", "fan_out", "read_items", "run_fan_out"]
+
+_Item = t.TypeVar("_Item")
+ItemSource = t.Union[t.Iterable[_Item], t.AsyncIterable[_Item]]
+
+
+class FanOutStats:
+    """Progress of a `run_fan_out` run"""
+
+    def __init__(self) -> None:
+        self.succeeded = 0
+        self.failed = 0
+        self.started_at = time.perf_counter()
+
+    @property
+    def processed(self) -> int:
+        return self.succeeded + self.failed
+
+    @property
+    def rate(self) -> float:
+        """Processed items per second"""
+        elapsed = time.perf_counter() - self.started_at
+        return self.processed / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.processed} processed, {self.failed} failed, {self.rate:.1f} items/s"
+        )
+
+
+def read_items(path: str) -> t.Iterator[str]:
+    """Yields the non-blank lines of `path`, or of stdin for `-`"""
+    with click.open_file(path, mode="r") as fr:
+        for line in fr:
+            line = line.rstrip("\r\n")
+            if line.strip():
+                yield line
+
+
+async def _iterate(items: ItemSource[_Item]) -> t.AsyncIterator[_Item]:
+    if isinstance(items, t.AsyncIterable):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+def _serialize_item(item: t.Any) -> str:
+    return item if isinstance(item, str) else json.dumps(item, default=str)
+
+
+async def run_fan_out(
+    handler: t.Callable[[t.Any], t.Awaitable[t.Any]],
+    items: ItemSource[t.Any],
+    concurrency: int = 8,
+    batch_size: int = 1,
+    progress_interval: float = 5.0,
+    failed_file: t.Optional[str] = None,
+) -> FanOutStats:
+    """
+    Runs `handler` on every item of `items` with at most `concurrency` calls awaited at once.
+
+    With `batch_size` above 1, `handler` receives lists of up to `batch_size` items.
+    Items are read only as fast as they are processed, so large sources are never held in memory.
+    Progress is reported on stderr every `progress_interval` seconds.
+
+    Items of failed calls are written to `failed_file`, one per line, so that it can be the input
+    of the next run. Their errors are written to `<failed_file>.errors` as JSON lines.
+    Both are only replaced once the run ends, so `failed_file` can also be the file `items`
+    are read from. When the run is interrupted, by Ctrl-C or by cancelling it, the items not
+    processed yet are also written to `failed_file`, including the rest of an `items`
+    iterable. The rest of an async iterable is not read.
+    """
+    stats = FanOutStats()
+    queue: "asyncio.Queue[t.Optional[t.List[t.Any]]]" = asyncio.Queue(
+        maxsize=concurrency * 2
+    )
+    failed_items: t.Optional[t.TextIO] = None
+    failed_errors: t.Optional[t.TextIO] = None
+    if failed_file:
+        failed_items = open(f"{failed_file}.{os.getpid()}.tmp", mode="w")
+        failed_errors = open(f"{failed_file}.errors.{os.getpid()}.tmp", mode="w")
+
+    source = items if isinstance(items, t.AsyncIterable) else iter(items)
+    # items read from `source` but not queued yet, and the batch handled by each worker
+    unqueued: t.List[t.Any] = []
+    handling: t.Dict[int, t.List[t.Any]] = {}
+
+    async def _produce() -> None:
+        async for item in _iterate(source):
+            unqueued.append(item)
+            if len(unqueued) >= batch_size:
+                await queue.put(list(unqueued))
+                unqueued.clear()
+        if unqueued:
+            await queue.put(list(unqueued))
+            unqueued.clear()
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    def _write_failure(item: t.Any, error: str) -> None:
+        assert failed_items is not None and failed_errors is not None
+        failed_items.write(_serialize_item(item) + "\n")
+        failed_errors.write(
+            json.dumps({"item": item, "error": error}, default=str) + "\n"
+        )
+
+    def _record_failure(batch: t.List[t.Any], ex: Exception) -> None:
+        stats.failed += len(batch)
+        if failed_items is None:
+            click.echo(f"Failed {_serialize_item(batch)}: {ex!r}", err=True)
+            return
+        for item in batch:
+            _write_failure(item, repr(ex))
+
+    def _record_pending() -> None:
+        pending = [item for batch in handling.values() for item in batch]
+        while not queue.empty():
+            pending.extend(queue.get_nowait() or [])
+        pending.extend(unqueued)
+        if failed_items is None:
+            click.echo(f"Interrupted, {len(pending)} items not processed.", err=True)
+            return
+        for item in itertools.chain(
+            pending, () if isinstance(source, t.AsyncIterable) else source
+        ):
+            _write_failure(item, "not processed, the run was interrupted")
+        click.echo(f"Interrupted, items not processed are in {failed_file}", err=True)
+
+    async def _work(worker: int) -> None:
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                return
+            handling[worker] = batch
+            try:
+                await handler(batch if batch_size > 1 else batch[0])
+            except Exception as ex:
+                _record_failure(batch, ex)
+            else:
+                stats.succeeded += len(batch)
+            del handling[worker]
+
+    async def _report() -> None:
+        while True:
+            await asyncio.sleep(progress_interval)
+            click.echo(str(stats), err=True)
+
+    loop = asyncio.get_running_loop()
+    run_task = asyncio.current_task()
+    interrupted = False
+
+    def _interrupt() -> None:
+        nonlocal interrupted
+        interrupted = True
+        if run_task is not None:
+            run_task.cancel()
+
+    try:
+        # Ctrl-C cancels the run instead of stopping the loop with the run left pending
+        loop.add_signal_handler(signal.SIGINT, _interrupt)
+    except (NotImplementedError, RuntimeError, ValueError):
+        # not on the main thread, or not supported by the loop
+        handles_sigint = False
+    else:
+        handles_sigint = True
+
+    tasks = [asyncio.ensure_future(_work(worker)) for worker in range(concurrency)]
+    reporter = asyncio.ensure_future(_report()) if progress_interval > 0 else None
+    try:
+        await asyncio.gather(_produce(), *tasks)
+    except BaseException:
+        _record_pending()
+        if interrupted:
+            raise KeyboardInterrupt from None
+        raise
+    finally:
+        if handles_sigint:
+            loop.remove_signal_handler(signal.SIGINT)
+        for task in [*tasks, reporter]:
+            if task is not None and not task.done():
+                task.cancel()
+        for fw in (failed_items, failed_errors):
+            if fw is not None:
+                fw.close()
+        if failed_file:
+            os.replace(f"{failed_file}.{os.getpid()}.tmp", failed_file)
+            os.replace(
+                f"{failed_file}.errors.{os.getpid()}.tmp", f"{failed_file}.errors"
+            )
+    return stats
+
+
+def fan_out(
+    concurrency: int = 8,
+    batch_size: int = 1,
+    progress_interval: float = 5.0,
+    source: t.Optional[t.Callable[..., t.AsyncIterable[t.Any]]] = None,
+) -> t.Callable[[t.Callable[..., t.Awaitable[t.Any]]], t.Callable[..., None]]:
+    """
+    Turns an async function handling one item into a command callback that handles
+    a stream of items with `run_fan_out`. The arguments are defaults of the options it adds:
+
+        --input FILE          items, one per line. `-` reads stdin
+        --concurrency N
+        --batch-size N        the function receives lists of items when above 1
+        --progress-interval SECONDS
+        --failed-file FILE    failed items, to resume with `--input FILE`
+
+    With `source`, items come from the async generator it returns instead of `--input`.
+    It's called with the other parameters of the command, which are also passed to the function.
+
+    eg:
+    ```python
+        @app_cli.command()
+        @click.option("--index", default="records")
+        @click.fan_out(concurrency=32)
+        async def reindex(record_id: str, index: str):
+            await current_injector.get(SearchService).reindex(index, record_id)
+    ```
+    The command runs in its injector context, on the loop of the CLI.
+    """
+
+    def decorator(f: t.Callable[..., t.Awaitable[t.Any]]) -> t.Callable[..., None]:
+        assert asyncio.iscoroutinefunction(f), "Decorated function must be Coroutine"
+
+        def _command(
+            concurrency: int,
+            batch_size: int,
+            progress_interval: float,
+            failed_file: t.Optional[str],
+            input_path: str = "-",
+            **kwargs: t.Any,
+        ) -> None:
+            from ellar_cli.event_loop import run_coroutine
+
+            items: ItemSource[t.Any] = (
+                source(**kwargs) if source else read_items(input_path)
+            )
+            stats = run_coroutine(
+                run_fan_out(
+                    functools.partial(f, **kwargs),
+                    items,
+                    concurrency=concurrency,
+                    batch_size=batch_size,
+                    progress_interval=progress_interval,
+                    failed_file=failed_file,
+                )
+            )
+            click.echo(f"Done: {stats}", err=True)
+            if stats.failed:
+                raise click.exceptions.Exit(1)
+
+        functools.update_wrapper(_command, f)
+        # the wrapped function takes the item as first argument, it's not a command parameter
+        del _command.__wrapped__  # type:ignore[attr-defined]
+        _command.__click_params__ = list(  # type:ignore[attr-defined]
+            getattr(f, "__click_params__", [])
+        )
+
+        options = [
+            click.option(
+                "--failed-file",
+                type=click.Path(dir_okay=False, writable=True),
+                default=None,
+                help="Write failed items to this file, to resume with `--input`.",
+            ),
+            click.option(
+                "--progress-interval",
+                type=float,
+                default=progress_interval,
+                show_default=True,
+                help="Seconds between progress reports. 0 disables them.",
+            ),
+            click.option(
+                "--batch-size",
+                type=click.IntRange(min=1),
+                default=batch_size,
+                show_default=True,
+                help="Number of items handled per call.",
+            ),
+            click.option(
+                "--concurrency",
+                type=click.IntRange(min=1),
+                default=concurrency,
+                show_default=True,
+                help="Max number of calls running at once.",
+            ),
+        ]
+        if source is None:
+            options.append(
+                click.option(
+                    "--input",
+                    "input_path",
+                    default="-",
+                    show_default=True,
+                    help="File with one item per line. `-` reads stdin.",
+                )
+            )
+        for option in options:
+            option(_command)
+        return _command
+
+    return decorator
@@ -0,0 +1,168 @@
+import functools
+import gc
+import inspect
+import multiprocessing
+import os
+import sys
+import typing as t
+
+import click
+
+from .pipeline import read_items
+
+__all__ = ["parallel", "run_in_processes"]
+
+_Item = t.TypeVar("_Item")
+_Result = t.TypeVar("_Result")
+
+# set in each worker by the initializer of its pool. Arguments of forked processes are
+# inherited, so the handler is not pickled
+_worker_handler: t.Optional[t.Callable[[t.Any], t.Any]] = None
+
+
+def _set_worker_handler(handler: t.Callable[[t.Any], t.Any]) -> None:
+    global _worker_handler
+    _worker_handler = handler
+
+
+def _call_worker_handler(item: t.Any) -> t.Any:
+    assert _worker_handler is not None
+    return _worker_handler(item)
+
+
+def _can_fork() -> bool:
+    return "fork" in multiprocessing.get_all_start_methods()
+
+
+def run_in_processes(
+    handler: t.Callable[[_Item], _Result],
+    items: t.Iterable[_Item],
+    workers: t.Optional[int] = None,
+    chunk_size: int = 16,
+) -> t.Iterator[_Result]:
+    """
+    Runs `handler` on every item of `items` in `workers` forked processes and yields the results
+    in the order of the items.
+
+    Workers are forked from the current process, so they inherit the booted application and
+    its injector context instead of importing it again. `handler` can be any callable, only
+    the items and the results are pickled. Items are sent to workers in chunks of `chunk_size`.
+    Without `fork` (Windows) or with a single worker, the items are handled in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or not _can_fork():
+        yield from map(handler, items)
+        return
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    # objects created before the fork are not tracked by the gc of workers,
+    # else a collection touches them all and copies the memory pages they are in.
+    # Objects frozen already, like by `runserver --gc-freeze`, are left frozen
+    freeze = gc.get_freeze_count() == 0
+    if freeze:
+        gc.freeze()
+    try:
+        with multiprocessing.get_context("fork").Pool(
+            workers, initializer=_set_worker_handler, initargs=(handler,)
+        ) as pool:
+            yield from pool.imap(_call_worker_handler, items, chunksize=chunk_size)
+    finally:
+        if freeze:
+            gc.unfreeze()
+
+
+def _echo_results(results: t.Iterable[t.Any], **kwargs: t.Any) -> None:
+    for result in results:
+        if result is not None:
+            click.echo(result)
+
+
+def parallel(
+    workers: t.Optional[int] = None,
+    chunk_size: int = 16,
+    source: t.Optional[t.Callable[..., t.Iterable[t.Any]]] = None,
+    merge: t.Optional[t.Callable[..., t.Any]] = None,
+) -> t.Callable[[t.Callable[..., t.Any]], t.Callable[..., t.Any]]:
+    """
+    Turns a function handling one item into a command callback that handles a stream of items
+    with `run_in_processes`, for CPU bound commands. The arguments are defaults of the options it adds:
+
+        --input FILE      items, one per line. `-` reads stdin
+        --workers N       defaults to the number of CPUs
+        --chunk-size N    number of items sent to a worker at once
+
+    With `source`, items come from the iterable it returns instead of `--input`.
+    The results are passed to `merge`, in the order of the items, and its return value is the
+    return value of the command. By default, results that are not None are printed.
+    `source` and `merge` are called with the other parameters of the command, which are also
+    passed to the function.
+
+    eg:
+    ```python
+        @app_cli.command()
+        @click.option("--size", type=int, default=128)
+        @click.parallel(chunk_size=4)
+        def thumbnails(path: str, size: int):
+            return current_injector.get(ImageService).thumbnail(path, size)
+    ```
+    The application is booted and its injector context entered before the workers are forked.
+    """
+
+    def decorator(f: t.Callable[..., t.Any]) -> t.Callable[..., t.Any]:
+        assert not inspect.iscoroutinefunction(f), (
+            "Use `fan_out` for coroutines, `parallel` is for CPU bound functions"
+        )
+
+        def _command(
+            workers: t.Optional[int],
+            chunk_size: int,
+            input_path: str = "-",
+            **kwargs: t.Any,
+        ) -> t.Any:
+            items = source(**kwargs) if source else read_items(input_path)
+            results = run_in_processes(
+                functools.partial(f, **kwargs),
+                items,
+                workers=workers,
+                chunk_size=chunk_size,
+            )
+            return (merge or _echo_results)(results, **kwargs)
+
+        functools.update_wrapper(_command, f)
+        # the wrapped function takes the item as first argument, it's not a command parameter
+        del _command.__wrapped__  # type:ignore[attr-defined]
+        _command.__click_params__ = list(  # type:ignore[attr-defined]
+            getattr(f, "__click_params__", [])
+        )
+
+        options = [
+            click.option(
+                "--chunk-size",
+                type=click.IntRange(min=1),
+                default=chunk_size,
+                show_default=True,
+                help="Number of items sent to a worker at once.",
+            ),
+            click.option(
+                "--workers",
+                type=click.IntRange(min=1),
+                default=workers,
+                help="Number of worker processes. Defaults to the number of CPUs.",
+            ),
+        ]
+        if source is None:
+            options.append(
+                click.option(
+                    "--input",
+                    "input_path",
+                    default="-",
+                    show_default=True,
+                    help="File with one item per line. `-` reads stdin.",
+                )
+            )
+        for option in options:
+            option(_command)
+        return _command
+
+    return decorator
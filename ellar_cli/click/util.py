@@ -2,28 +2,53 @@ import typing as t
 from functools import update_wrapper
 
 import click
-from ellar.threading.sync_worker import (
-    execute_async_context_manager,
-)
 
-from ellar_cli.constants import ELLAR_META
-from ellar_cli.service import EllarCLIService
+from ellar_cli.constants import ELLAR_META, BootLevel
+from ellar_cli.profiling import cli_phase, cli_timed_context
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from ellar_cli.service import EllarCLIService
+
+# `ctx.meta` key set while the application injector context is entered.
+# `ctx.meta` is shared by nested contexts, so commands invoked inside another
+# command, like in `ellar batch`, run in the context entered first.
+INJECTOR_CONTEXT_ACTIVE = "ELLAR_INJECTOR_CONTEXT_ACTIVE"
 
 
 def with_injector_context(f: t.Callable) -> t.Any:
     """
     Wraps a callback so that it's guaranteed to be executed with `ellar.core.with_injector_context` contextmanager.
+    The project is booted only up to the `boot_level` of the invoked command, and
+    the injector context is entered for `BootLevel.APP` only, unless it is already active.
     """
 
     @click.pass_context
     def decorator(__ctx: click.Context, *args: t.Any, **kwargs: t.Any) -> t.Any:
-        meta_: t.Optional[EllarCLIService] = __ctx.meta.get(ELLAR_META)
+        meta_: t.Optional["EllarCLIService"] = __ctx.meta.get(ELLAR_META)
+        boot_level = getattr(__ctx.command, "boot_level", BootLevel.APP)
 
         if meta_ and meta_.has_meta:
+            meta_.boot(boot_level)
+
+        if (
+            meta_
+            and meta_.has_meta
+            and boot_level >= BootLevel.APP
+            and not __ctx.meta.get(INJECTOR_CONTEXT_ACTIVE)
+        ):
+            from ellar_cli.event_loop import enter_async_context
+
             __ctx.with_resource(
-                execute_async_context_manager(meta_.get_application_context())
+                cli_timed_context(
+                    enter_async_context(meta_.get_application_context()),
+                    "injector_context",
+                    "teardown",
+                )
             )
+            __ctx.meta[INJECTOR_CONTEXT_ACTIVE] = True
+            __ctx.call_on_close(lambda: __ctx.meta.pop(INJECTOR_CONTEXT_ACTIVE, None))
 
-        return __ctx.invoke(f, *args, **kwargs)
+        with cli_phase("command"):
+            return __ctx.invoke(f, *args, **kwargs)
 
     return update_wrapper(decorator, f)
@@ -1,3 +1,40 @@
+import enum
+
 ELLAR_META = "ELLAR_META"
 ELLAR_PY_PROJECT = "ellar"
 ELLAR_PROJECT_NAME = "project_name"
+PY_PROJECT_TOML = "pyproject.toml"
+
+# Set to `0` to disable reading and writing of `.ellar/commands.<project>.json`
+ELLAR_COMMAND_MANIFEST_ENV = "ELLAR_COMMAND_MANIFEST"
+
+# Set to `1` to find project commands by parsing module sources instead of importing them
+ELLAR_STATIC_DISCOVERY_ENV = "ELLAR_STATIC_DISCOVERY"
+
+# Set to `1`, `table` or `json` to print the duration of the CLI phases, like `--timings`
+ELLAR_TIMINGS_ENV = "ELLAR_TIMINGS"
+
+# Event loop of async commands and the injector context: `asyncio` (default), `uvloop` or `auto` (uvloop if installed)
+ELLAR_EVENT_LOOP_ENV = "ELLAR_EVENT_LOOP"
+
+# Set to `0` to stop forwarding invocations to a running `ellar daemon`
+ELLAR_DAEMON_ENV = "ELLAR_DAEMON"
+
+# Same as `ellar.common.constants.ELLAR_CONFIG_MODULE`.
+# Importing `ellar.common` is too slow for code that runs on every CLI invocation
+ELLAR_CONFIG_MODULE = "ELLAR_CONFIG_MODULE"
+
+
+class BootLevel(enum.IntEnum):
+    """
+    How much of an Ellar project a command needs before it runs. Each level includes the ones below it.
+    """
+
+    #: project metadata from pyproject.toml only
+    NONE = 0
+    #: `ELLAR_CONFIG_MODULE` exported and the project `Config` loaded
+    CONFIG = 1
+    #: modules read with `AppFactory.read_all_module`, without building the application
+    MODULE_TREE = 2
+    #: application built and the command running in its injector context
+    APP = 3
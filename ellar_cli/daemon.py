@@ -0,0 +1,433 @@
+"""
+Resident CLI daemon.
+
+`ellar daemon start` boots the application once and keeps it in a zygote process listening
+on a UNIX socket. Every `ellar` invocation in the same directory is then forwarded to the
+zygote, together with its arguments, environment, working directory and stdio file
+descriptors, and runs in a child forked from the preloaded zygote.
+"""
+
+import array
+import json
+import os
+import signal
+import socket
+import stat
+import sys
+import time
+import typing as t
+
+from ellar_cli.constants import ELLAR_CONFIG_MODULE, ELLAR_DAEMON_ENV
+from ellar_cli.daemon_paths import get_daemon_paths
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from ellar_cli.click import EllarCommandGroup
+
+__all__ = [
+    "CLIDaemon",
+    "ensure_daemon_dir",
+    "forward_to_daemon",
+    "get_daemon_paths",
+    "is_daemon_process",
+    "send_daemon_request",
+]
+
+_MAX_MESSAGE_SIZE = 4 * 1024 * 1024
+_STDIO_FDS = (0, 1, 2)
+# environment the preloaded application was booted with. Invocations that set it
+# differently are rejected and run locally
+_BOOT_ENV = (ELLAR_CONFIG_MODULE, "PYTHONPATH")
+
+_is_daemon_process = False
+
+
+def is_daemon_process() -> bool:
+    """True in the zygote and in the children it forks"""
+    return _is_daemon_process
+
+
+def _is_private(path: str, is_kind: t.Callable[[int], bool]) -> bool:
+    """Whether `path` is of the expected kind, owned by and only accessible to this user"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return (
+        is_kind(st.st_mode)
+        and st.st_uid == os.getuid()
+        and not stat.S_IMODE(st.st_mode) & 0o077
+    )
+
+
+def _is_daemon_socket(socket_path: str) -> bool:
+    # the invocation sends its environment and its terminal, never to another user
+    return _is_private(os.path.dirname(socket_path), stat.S_ISDIR) and _is_private(
+        socket_path, stat.S_ISSOCK
+    )
+
+
+def ensure_daemon_dir(socket_path: str) -> None:
+    """
+    Creates the directory of the daemon files at `socket_path`, only accessible to the
+    current user. Raises PermissionError when it exists and is not.
+    """
+    path = os.path.dirname(socket_path)
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    if not _is_private(path, stat.S_ISDIR):
+        raise PermissionError(
+            f"{path} must be a directory owned by and only accessible to the current user."
+        )
+
+
+def _send_message(
+    sock: socket.socket, payload: t.Dict[str, t.Any], fds: t.Sequence[int] = ()
+) -> None:
+    data = json.dumps(payload).encode() + b"\n"
+    if fds:
+        ancillary = [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array.array("i", fds))]
+        sent = sock.sendmsg([data], ancillary)
+        data = data[sent:]
+    if data:
+        sock.sendall(data)
+
+
+def _recv_message(
+    sock: socket.socket, buffer: bytearray, max_fds: int = 0
+) -> t.Tuple[t.Optional[t.Dict[str, t.Any]], t.List[int]]:
+    """Reads one newline delimited json message. `buffer` keeps data received past it."""
+    fds: t.List[int] = []
+    while b"\n" not in buffer:
+        if max_fds and not fds:
+            fds_array = array.array("i")
+            data, ancillary, _, _ = sock.recvmsg(
+                65536, socket.CMSG_SPACE(max_fds * fds_array.itemsize)
+            )
+            for level, kind, cmsg_data in ancillary:
+                if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                    fds_array.frombytes(
+                        cmsg_data[
+                            : len(cmsg_data) - (len(cmsg_data) % fds_array.itemsize)
+                        ]
+                    )
+            fds.extend(fds_array)
+        else:
+            data = sock.recv(65536)
+
+        if not data:
+            return None, fds
+        buffer.extend(data)
+        if len(buffer) > _MAX_MESSAGE_SIZE:
+            raise ValueError("Daemon message is too large.")
+
+    line, _, rest = bytes(buffer).partition(b"\n")
+    buffer[:] = rest
+    return json.loads(line), fds
+
+
+def send_daemon_request(
+    socket_path: str, payload: t.Dict[str, t.Any], timeout: float = 5.0
+) -> t.Optional[t.Dict[str, t.Any]]:
+    """Sends a control request (`status`, `stop`) to a daemon. Returns None if it is not running."""
+    if not _is_daemon_socket(socket_path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(socket_path)
+            _send_message(sock, payload)
+            response, _ = _recv_message(sock, bytearray())
+            return response
+    except OSError:
+        return None
+
+
+def _can_forward_stdio() -> bool:
+    # stdio replaced by in-memory streams, like in click's CliRunner, can't be forwarded
+    try:
+        return all(
+            stream is not None and stream.fileno() == fd
+            for stream, fd in zip((sys.stdin, sys.stdout, sys.stderr), _STDIO_FDS)
+        )
+    except (AttributeError, OSError, ValueError):
+        return False
+
+
+def forward_to_daemon(
+    socket_path: str, args: t.Sequence[str], prog_name: str
+) -> t.Optional[int]:
+    """
+    Runs a CLI invocation in the daemon listening on `socket_path`.
+    Returns the exit code, or None when no daemon could serve it and the command should run locally.
+    """
+    if (
+        os.environ.get(ELLAR_DAEMON_ENV, "1").lower() in ("0", "false", "no", "off")
+        or not _is_daemon_socket(socket_path)
+        or not _can_forward_stdio()
+    ):
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(socket_path)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            _send_message(
+                sock,
+                {
+                    "command": "run",
+                    "args": list(args),
+                    "prog_name": prog_name,
+                    "cwd": os.getcwd(),
+                    "env": dict(os.environ),
+                },
+                fds=_STDIO_FDS,
+            )
+            buffer = bytearray()
+            response, _ = _recv_message(sock, buffer)
+        except (OSError, ValueError):
+            return None
+
+        if not response or response.get("status") != "accepted":
+            if response and response.get("status") == "stale":
+                sys.stderr.write(
+                    "Ellar CLI daemon stopped: project files changed since it started.\n"
+                )
+            return None
+
+        while True:
+            try:
+                result, _ = _recv_message(sock, buffer)
+            except KeyboardInterrupt:
+                # the command runs in another process group, so Ctrl+C is forwarded
+                os.kill(response["pid"], signal.SIGINT)
+                continue
+            except (OSError, ValueError):
+                result = None
+            return int(result["exit_code"]) if result else 1
+    finally:
+        sock.close()
+
+
+class CLIDaemon:
+    """
+    Zygote process of `ellar daemon`.
+    It preloads `group` for `project` and forks a child per forwarded invocation.
+    """
+
+    def __init__(
+        self,
+        group: "EllarCommandGroup",
+        project: t.Optional[str],
+        socket_path: str,
+        pid_path: str,
+    ) -> None:
+        self.group = group
+        self.project = project
+        self.socket_path = socket_path
+        self.pid_path = pid_path
+        self.served = 0
+        self.started_at = time.time()
+        self._fingerprint: t.Optional[t.Callable[[], str]] = None
+        self._initial_fingerprint: t.Optional[str] = None
+        self._running = False
+        # config of the project, loaded by invocations that don't select one
+        self._default_config: t.Optional[str] = None
+        self._boot_env = self._get_boot_env(os.environ)
+
+    def preload(self) -> None:
+        from ellar_cli.service import CommandManifest
+
+        meta_ = self.group.preload(self.project)
+
+        if meta_ is not None and meta_.project_meta is not None:
+            config = meta_.project_meta.config
+            self._default_config = config if config and config != "null" else None
+        self._boot_env = self._get_boot_env(os.environ)
+
+        if meta_ is not None and meta_.has_meta and meta_.py_project_path != "null":
+            manifest = CommandManifest(meta_)
+            self._fingerprint = lambda: manifest.compute_fingerprint(
+                sorted(self.group.get_command_sources())
+            )
+            self._initial_fingerprint = self._fingerprint()
+
+    def _get_boot_env(self, env: t.Mapping[str, str]) -> t.Dict[str, t.Optional[str]]:
+        """The `_BOOT_ENV` values an invocation with `env` boots the application with"""
+        boot_env = {name: env.get(name) or None for name in _BOOT_ENV}
+        boot_env[ELLAR_CONFIG_MODULE] = (
+            boot_env[ELLAR_CONFIG_MODULE] or self._default_config
+        )
+        return boot_env
+
+    def _is_stale(self) -> bool:
+        return (
+            self._fingerprint is not None
+            and self._fingerprint() != self._initial_fingerprint
+        )
+
+    def serve_forever(self) -> None:
+        global _is_daemon_process
+        _is_daemon_process = True
+
+        ensure_daemon_dir(self.socket_path)
+        if os.path.lexists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        # never accessible to other users, not even between bind and chmod
+        umask = os.umask(0o077)
+        try:
+            server.bind(self.socket_path)
+        finally:
+            os.umask(umask)
+        server.listen(128)
+        server.settimeout(0.5)
+
+        with open(self.pid_path, mode="w") as fw:
+            fw.write(str(os.getpid()))
+
+        self._running = True
+        signal.signal(signal.SIGTERM, self._handle_stop_signal)
+        signal.signal(signal.SIGINT, self._handle_stop_signal)
+
+        try:
+            while self._running:
+                self._reap_children()
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                except InterruptedError:  # pragma: no cover
+                    continue
+
+                try:
+                    self._handle_connection(server, conn)
+                finally:
+                    conn.close()
+        finally:
+            server.close()
+            for path in (self.socket_path, self.pid_path):
+                if os.path.exists(path):
+                    os.unlink(path)
+
+    def _handle_stop_signal(self, *args: t.Any) -> None:
+        self._running = False
+
+    @classmethod
+    def _reap_children(cls) -> None:
+        try:
+            while os.waitpid(-1, os.WNOHANG)[0]:
+                pass
+        except ChildProcessError:
+            pass
+
+    def _handle_connection(self, server: socket.socket, conn: socket.socket) -> None:
+        conn.settimeout(5.0)
+        try:
+            request, fds = _recv_message(conn, bytearray(), max_fds=len(_STDIO_FDS))
+        except (OSError, ValueError):
+            return
+
+        try:
+            if not request:
+                return
+
+            if request.get("command") == "status":
+                _send_message(conn, self.status())
+            elif request.get("command") == "stop":
+                self._running = False
+                _send_message(conn, {"status": "stopping"})
+            elif request.get("command") == "run" and len(fds) == len(_STDIO_FDS):
+                if self._is_stale():
+                    self._running = False
+                    _send_message(conn, {"status": "stale"})
+                elif (
+                    not self.group.is_preloaded(self._get_requested_project(request))
+                    or self._get_boot_env(request.get("env") or {}) != self._boot_env
+                ):
+                    _send_message(conn, {"status": "rejected"})
+                else:
+                    self.served += 1
+                    if os.fork() == 0:  # pragma: no cover
+                        server.close()
+                        self._run_in_child(conn, request, fds)
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    @classmethod
+    def _get_requested_project(cls, request: t.Dict[str, t.Any]) -> str:
+        args = request["args"]
+        for index, arg in enumerate(args):
+            if arg == "--project" and index + 1 < len(args):
+                return str(args[index + 1])
+            if arg.startswith("--project="):
+                return str(arg.partition("=")[2])
+            if not arg.startswith("-"):
+                break
+        return "default"
+
+    def _run_in_child(  # pragma: no cover
+        self, conn: socket.socket, request: t.Dict[str, t.Any], fds: t.List[int]
+    ) -> t.NoReturn:
+        """Runs a forwarded invocation. Executed in the forked child, never returns."""
+        exit_code = 1
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            os.setsid()
+            conn.settimeout(None)
+            _send_message(conn, {"status": "accepted", "pid": os.getpid()})
+
+            for fd, target in zip(fds, _STDIO_FDS):
+                os.dup2(fd, target)
+            sys.stdin = open(0, mode="r", closefd=False)
+            sys.stdout = open(1, mode="w", buffering=1, closefd=False)
+            sys.stderr = open(2, mode="w", buffering=1, closefd=False)
+
+            config_module = os.environ.get(ELLAR_CONFIG_MODULE)
+            os.environ.clear()
+            os.environ.update(request["env"])
+            if config_module:
+                # the preloaded application was configured with it
+                os.environ.setdefault(ELLAR_CONFIG_MODULE, config_module)
+            os.chdir(request["cwd"])
+
+            try:
+                self.group.main(
+                    args=request["args"],
+                    prog_name=request["prog_name"],
+                    standalone_mode=True,
+                )
+                exit_code = 0
+            except SystemExit as ex:
+                exit_code = (
+                    ex.code
+                    if isinstance(ex.code, int)
+                    else (0 if ex.code is None else 1)
+                )
+            except BaseException:
+                import traceback
+
+                traceback.print_exc()
+                exit_code = 1
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                _send_message(conn, {"exit_code": exit_code})
+            finally:
+                os._exit(exit_code)
+
+    def status(self) -> t.Dict[str, t.Any]:
+        return {
+            "status": "running",
+            "pid": os.getpid(),
+            "project": self.project,
+            "served": self.served,
+            "uptime": round(time.time() - self.started_at, 3),
+        }
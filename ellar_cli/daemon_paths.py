@@ -0,0 +1,42 @@
+"""
+Paths of the files of `ellar daemon`.
+
+Kept apart from `ellar_cli.daemon` so that every CLI invocation can check whether a daemon
+may be running without importing its client, which costs more than most commands.
+"""
+
+import os
+import typing as t
+
+__all__ = ["get_daemon_dir", "get_daemon_paths", "has_daemon_sockets"]
+
+
+def get_daemon_dir() -> str:
+    """
+    Directory of the daemon files of the current user: in `$XDG_RUNTIME_DIR`, else in
+    `$TMPDIR` or `/tmp`, because UNIX socket paths are limited to ~100 characters.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isabs(runtime_dir):
+        return os.path.join(runtime_dir, "ellar-cli")
+    temp_dir = os.environ.get("TMPDIR")
+    if not temp_dir or not os.path.isabs(temp_dir):
+        temp_dir = "/tmp"
+    return os.path.join(temp_dir, f"ellar-cli-{os.getuid()}")
+
+
+def get_daemon_paths(app_import_string: t.Optional[str] = None) -> t.Tuple[str, str]:
+    """Returns the socket and pid file paths of the daemon serving the current directory"""
+    import hashlib
+
+    key = f"{os.getcwd()}:{app_import_string or ''}".encode()
+    base = os.path.join(get_daemon_dir(), hashlib.sha1(key).hexdigest()[:16])
+    return f"{base}.sock", f"{base}.pid"
+
+
+def has_daemon_sockets() -> bool:
+    """Whether a daemon of the current user may be running, in any directory"""
+    try:
+        return any(name.endswith(".sock") for name in os.listdir(get_daemon_dir()))
+    except OSError:
+        return False
@@ -0,0 +1,184 @@
+"""
+The event loop of the CLI process.
+
+Async commands, the application injector context and the async resources created in it,
+like database pools, all run on one event loop owned by the main thread, instead of a new
+loop on a worker thread per coroutine. The loop is created on first use and closed at exit.
+"""
+
+import asyncio
+import atexit
+import contextlib
+import contextvars
+import functools
+import os
+import threading
+import typing as t
+
+from ellar_cli.constants import ELLAR_EVENT_LOOP_ENV
+
+__all__ = [
+    "enter_async_context",
+    "get_event_loop",
+    "run_as_sync",
+    "run_coroutine",
+]
+
+_T = t.TypeVar("_T")
+_MISSING = object()
+
+_loop: t.Optional[asyncio.AbstractEventLoop] = None
+# the loop can't be used by a forked child or another thread
+_loop_owner: t.Tuple[int, int] = (0, 0)
+
+
+def _new_event_loop() -> asyncio.AbstractEventLoop:
+    loop_type = os.environ.get(ELLAR_EVENT_LOOP_ENV, "asyncio").lower()
+    if loop_type not in ("auto", "asyncio", "uvloop"):
+        from ellar_cli.service import EllarCLIException
+
+        raise EllarCLIException(
+            f"Invalid {ELLAR_EVENT_LOOP_ENV} value {loop_type!r}. Use auto, asyncio or uvloop."
+        )
+
+    if loop_type != "asyncio":
+        try:
+            import uvloop
+        except ImportError:
+            if loop_type == "uvloop":
+                from ellar_cli.service import EllarCLIException
+
+                raise EllarCLIException(
+                    f"{ELLAR_EVENT_LOOP_ENV}=uvloop requires uvloop. `pip install uvloop`"
+                ) from None
+        else:
+            return t.cast(asyncio.AbstractEventLoop, uvloop.new_event_loop())
+    return asyncio.new_event_loop()
+
+
+def _close_event_loop() -> None:
+    global _loop
+    loop, _loop = _loop, None
+    if loop is None or loop.is_closed() or _loop_owner[0] != os.getpid():
+        return
+    try:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        loop.close()
+
+
+atexit.register(_close_event_loop)
+
+
+def _is_owner() -> bool:
+    return _loop_owner == (os.getpid(), threading.get_ident())
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """
+    Returns the event loop of the CLI. It's created on first use in the main thread.
+    `ELLAR_EVENT_LOOP` selects the loop: `asyncio` (default), `uvloop` or `auto` (uvloop if installed).
+    uvloop isn't the default because importing it costs more than most commands save with it.
+    """
+    global _loop, _loop_owner
+
+    if _loop is None or _loop.is_closed() or _loop_owner[0] != os.getpid():
+        _loop = _new_event_loop()
+        _loop_owner = (os.getpid(), threading.get_ident())
+    return _loop
+
+
+def _can_run_on_cli_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        # called from a coroutine, the loop can't be re-entered
+        return False
+
+    if _loop is not None and _loop_owner[0] == os.getpid():
+        return _is_owner()
+    return threading.current_thread() is threading.main_thread()
+
+
+def run_coroutine(coro: t.Coroutine[t.Any, t.Any, _T]) -> _T:
+    """
+    Runs `coro` to completion on the CLI event loop.
+    From another thread, or from inside a running loop, it runs on a sync worker thread instead.
+    """
+    if not _can_run_on_cli_loop():
+        from ellar.threading.sync_worker import execute_coroutine
+
+        return t.cast(_T, execute_coroutine(coro))
+    return get_event_loop().run_until_complete(coro)
+
+
+def run_as_sync(
+    f: t.Callable[..., t.Coroutine[t.Any, t.Any, _T]],
+) -> t.Callable[..., _T]:
+    """Turns a coroutine function into a function that runs it on the CLI event loop"""
+    assert asyncio.iscoroutinefunction(f), "Decorated function must be Coroutine"
+
+    @functools.wraps(f)
+    def _decorator(*args: t.Any, **kwargs: t.Any) -> _T:
+        return run_coroutine(f(*args, **kwargs))
+
+    return _decorator
+
+
+@contextlib.contextmanager
+def enter_async_context(
+    async_context_manager: t.AsyncContextManager[_T],
+) -> t.Iterator[_T]:
+    """
+    Enters `async_context_manager` on the CLI event loop.
+    Context variables it sets on enter, like the current injector, are set in the calling
+    context too, and restored when it exits.
+    """
+    if not _can_run_on_cli_loop():
+        from ellar.threading.sync_worker import execute_async_context_manager
+
+        worker_value: t.Any
+        with execute_async_context_manager(async_context_manager) as worker_value:
+            yield worker_value
+        return
+
+    loop = get_event_loop()
+    original_context = contextvars.copy_context()
+    entered: "asyncio.Future[t.Tuple[_T, contextvars.Context]]" = loop.create_future()
+    exit_requested: "asyncio.Future[t.Optional[BaseException]]" = loop.create_future()
+
+    async def _hold() -> None:
+        # enter and exit run in one task, context variable tokens are only valid in their context
+        async with async_context_manager as entered_value:
+            entered.set_result((entered_value, contextvars.copy_context()))
+            ex = await exit_requested
+            if ex is not None:
+                raise ex
+
+    holder = loop.create_task(_hold())
+    pending: t.List["asyncio.Future[t.Any]"] = [entered, holder]
+    loop.run_until_complete(asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED))
+    if not entered.done():
+        # entering failed
+        holder.result()
+
+    value, entered_context = entered.result()
+    tokens = [
+        var.set(var_value)
+        for var, var_value in entered_context.items()
+        if original_context.get(var, _MISSING) is not var_value
+    ]
+    try:
+        yield value
+    except BaseException as ex:
+        exit_requested.set_result(ex)
+        # raises `ex` again, unless the context manager suppressed it
+        loop.run_until_complete(holder)
+    else:
+        exit_requested.set_result(None)
+        loop.run_until_complete(holder)
+    finally:
+        for token in reversed(tokens):
+            token.var.reset(token)
@@ -0,0 +1,328 @@
+"""
+HTTP load generator of `ellar loadtest`.
+
+Requests are sent over a pool of keep-alive HTTP/1.1 connections to a TCP port or a unix
+socket, so the whole server is measured, protocol implementation and event loop included.
+
+- closed loop: every connection sends its next request as soon as the previous response
+  arrived. Latencies are corrected for coordinated omission with an expected interval.
+- open loop: requests are scheduled at a constant rate whether or not the server keeps up,
+  and latencies are measured from the time each request was scheduled.
+"""
+
+import asyncio
+import time
+import typing as t
+
+from ellar_cli.benchmarking import LatencyHistogram
+
+__all__ = [
+    "HTTPConnection",
+    "LoadTestResult",
+    "LoadTestTarget",
+    "build_request",
+    "read_response",
+    "run_closed_loop",
+    "run_open_loop",
+]
+
+
+class LoadTestTarget(t.NamedTuple):
+    host: str
+    port: int
+    uds: t.Optional[str] = None
+
+    @property
+    def url(self) -> str:
+        if self.uds:
+            return f"unix:{self.uds}"
+        host = f"[{self.host}]" if ":" in self.host else self.host
+        return f"http://{host}:{self.port}"
+
+    @property
+    def host_header(self) -> str:
+        if self.uds:
+            return "localhost"
+        return f"{self.host}:{self.port}"
+
+
+class LoadTestResult:
+    """Responses, errors and latencies of a load test"""
+
+    def __init__(self) -> None:
+        self.duration = 0.0
+        self.statuses: t.Dict[str, int] = {}
+        self.errors: t.Dict[str, int] = {}
+        # from the time the request was sent
+        self.service_time = LatencyHistogram()
+        # from the time the request should have been sent
+        self.response_time = LatencyHistogram()
+        self.expected_interval = 0.0
+
+    @property
+    def requests(self) -> int:
+        return sum(self.statuses.values())
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests / self.duration if self.duration else 0.0
+
+    def record_status(self, status: int) -> None:
+        self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+
+    def record_error(self, ex: BaseException) -> None:
+        name = type(ex).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+
+def build_request(
+    method: str,
+    path: str,
+    host_header: str,
+    headers: t.Sequence[t.Tuple[str, str]] = (),
+    body: bytes = b"",
+) -> bytes:
+    """An HTTP/1.1 keep-alive request"""
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host_header}"]
+    lines.extend(f"{name}: {value}" for name, value in headers)
+    if body or method in ("POST", "PUT", "PATCH"):
+        lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+async def read_response(
+    reader: asyncio.StreamReader, method: str
+) -> t.Tuple[int, bool]:
+    """
+    Reads a response and discards its body.
+    Returns its status and whether the connection can be used again.
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    version, status_code, *_ = status_line.split(" ", 2)
+    status = int(status_code)
+    headers = {}
+    for line in header_lines:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip().lower()
+
+    keep_alive = version == "HTTP/1.1" and headers.get("connection") != "close"
+    if method == "HEAD" or status in (204, 304) or 100 <= status < 200:
+        return status, keep_alive
+
+    if "chunked" in headers.get("transfer-encoding", ""):
+        while True:
+            size_line = await reader.readuntil(b"\r\n")
+            size = int(size_line.split(b";", 1)[0], 16)
+            if size == 0:
+                # trailers, up to an empty line
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                break
+            await reader.readexactly(size + 2)
+    elif "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    else:
+        await reader.read()
+        keep_alive = False
+    return status, keep_alive
+
+
+class HTTPConnection:
+    """Keep-alive connection to the target, opened again when the server closed it"""
+
+    def __init__(self, target: LoadTestTarget) -> None:
+        self.target = target
+        self._reader: t.Optional[asyncio.StreamReader] = None
+        self._writer: t.Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self) -> t.Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        if self.target.uds:
+            return await asyncio.open_unix_connection(self.target.uds)
+        return await asyncio.open_connection(self.target.host, self.target.port)
+
+    async def request(self, payload: bytes, method: str) -> int:
+        if self._reader is None or self._writer is None:
+            self._reader, self._writer = await self._connect()
+        try:
+            self._writer.write(payload)
+            await self._writer.drain()
+            status, keep_alive = await read_response(self._reader, method)
+        except BaseException:
+            self.close()
+            raise
+        if not keep_alive:
+            self.close()
+        return status
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def aclose(self) -> None:
+        """Closes the connection and waits until it's closed"""
+        writer = self._writer
+        self.close()
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+# failures of a single request. The connection is closed and opened again for the next one
+_REQUEST_ERRORS = (
+    OSError,
+    EOFError,
+    ValueError,
+    asyncio.LimitOverrunError,
+    asyncio.TimeoutError,
+)
+
+
+class _Requests:
+    """The requests to send, in turn"""
+
+    def __init__(self, requests: t.Sequence[t.Tuple[str, bytes]]) -> None:
+        self._requests = requests
+        self._counter = 0
+
+    def next(self) -> t.Tuple[str, bytes]:
+        request = self._requests[self._counter % len(self._requests)]
+        self._counter += 1
+        return request
+
+
+async def _send(
+    connection: HTTPConnection,
+    method: str,
+    payload: bytes,
+    timeout: float,
+    result: t.Optional[LoadTestResult],
+) -> bool:
+    try:
+        status = await asyncio.wait_for(connection.request(payload, method), timeout)
+    except _REQUEST_ERRORS as ex:
+        if result is not None:
+            result.record_error(ex)
+        return False
+    if result is not None:
+        result.record_status(status)
+    return True
+
+
+async def run_closed_loop(
+    target: LoadTestTarget,
+    requests: t.Sequence[t.Tuple[str, bytes]],
+    connections: int,
+    duration: float,
+    warmup: float = 0.0,
+    timeout: float = 30.0,
+    expected_interval: t.Optional[float] = None,
+) -> LoadTestResult:
+    """
+    Sends `requests` in turn on `connections` connections, each sending the next request
+    once the previous response arrived, for `duration` seconds after `warmup` seconds.
+
+    The response times are corrected for coordinated omission: a response that took longer
+    than `expected_interval` (in microseconds, the median service time by default) stalled
+    requests that would have been sent meanwhile, and their latencies are added.
+    """
+    result = LoadTestResult()
+    pending = _Requests(requests)
+    pool = [HTTPConnection(target) for _ in range(connections)]
+
+    async def _client(
+        connection: HTTPConnection, until: float, record: t.Optional[LoadTestResult]
+    ) -> None:
+        clock = time.perf_counter
+        while clock() < until:
+            method, payload = pending.next()
+            start = clock()
+            if await _send(connection, method, payload, timeout, record):
+                if record is not None:
+                    record.service_time.record((clock() - start) * 1_000_000)
+            else:
+                # don't spin on a server that refuses connections
+                await asyncio.sleep(0.01)
+
+    try:
+        if warmup > 0:
+            until = time.perf_counter() + warmup
+            await asyncio.gather(*(_client(conn, until, None) for conn in pool))
+
+        start = time.perf_counter()
+        await asyncio.gather(
+            *(_client(conn, start + duration, result) for conn in pool)
+        )
+        result.duration = time.perf_counter() - start
+    finally:
+        await asyncio.gather(*(connection.aclose() for connection in pool))
+
+    if expected_interval is None:
+        expected_interval = result.service_time.value_at_percentile(50)
+    result.expected_interval = expected_interval
+    result.response_time = result.service_time.corrected(expected_interval)
+    return result
+
+
+async def run_open_loop(
+    target: LoadTestTarget,
+    requests: t.Sequence[t.Tuple[str, bytes]],
+    rate: float,
+    connections: int,
+    duration: float,
+    warmup: float = 0.0,
+    timeout: float = 30.0,
+) -> LoadTestResult:
+    """
+    Schedules `rate` requests per second for `duration` seconds after `warmup` seconds, sent
+    on the first free connection of `connections`. Response times are measured from the
+    time each request was scheduled, so time spent waiting for a connection, because the
+    server falls behind, counts.
+    """
+    result = LoadTestResult()
+    result.expected_interval = 1_000_000 / rate
+    pending = _Requests(requests)
+    pool: "asyncio.Queue[HTTPConnection]" = asyncio.Queue()
+    for _ in range(connections):
+        pool.put_nowait(HTTPConnection(target))
+
+    async def _request(scheduled_at: float, record: t.Optional[LoadTestResult]) -> None:
+        method, payload = pending.next()
+        connection = await pool.get()
+        try:
+            start = time.perf_counter()
+            if await _send(connection, method, payload, timeout, record):
+                end = time.perf_counter()
+                if record is not None:
+                    record.service_time.record((end - start) * 1_000_000)
+                    record.response_time.record((end - scheduled_at) * 1_000_000)
+        finally:
+            pool.put_nowait(connection)
+
+    async def _schedule(period: float, record: t.Optional[LoadTestResult]) -> float:
+        # only the requests in flight are kept, not every request of the period
+        in_flight: t.Set["asyncio.Future[None]"] = set()
+        start = time.perf_counter()
+        for index in range(int(period * rate)):
+            scheduled_at = start + index / rate
+            delay = scheduled_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.ensure_future(_request(scheduled_at, record))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        await asyncio.gather(*in_flight)
+        return time.perf_counter() - start
+
+    try:
+        if warmup > 0:
+            await _schedule(warmup, None)
+        result.duration = await _schedule(duration, result)
+    finally:
+        while not pool.empty():
+            await pool.get_nowait().aclose()
+    return result
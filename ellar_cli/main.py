@@ -1,20 +1,21 @@
+import json
+import os
 import typing as t
 
-import ellar
-import uvicorn
-
 import ellar_cli
 import ellar_cli.click as click
-from ellar_cli.constants import ELLAR_PROJECT_NAME
+from ellar_cli.constants import ELLAR_PROJECT_NAME, ELLAR_TIMINGS_ENV
 
 from .click import EllarCommandGroup
-from .manage_commands import create_module, create_project, new_command, runserver
 
 __all__ = ["app_cli", "create_ellar_cli"]
 
 
 def version_callback(ctx: click.Context, _: t.Any, value: bool) -> None:
     if value:
+        import ellar
+        import uvicorn
+
         click.echo("<===========================================================>")
         click.echo(f"        Ellar CLI Version: {ellar_cli.__version__}        ")
         click.echo("    ---------------------------------------------------    ")
@@ -25,6 +26,29 @@ def version_callback(ctx: click.Context, _: t.Any, value: bool) -> None:
         raise click.Exit(0)
 
 
+def timings_callback(ctx: click.Context, _: t.Any, value: bool) -> None:
+    env_value = os.environ.get(ELLAR_TIMINGS_ENV, "").lower()
+    if not value and env_value in ("", "0", "false", "no", "off"):
+        return
+
+    from ellar_cli.profiling import format_phases, start_cli_timings
+
+    timings = start_cli_timings()
+
+    def _report() -> None:
+        output_format = ctx.params.get("timings_format") or (
+            "json" if env_value == "json" else "table"
+        )
+        phases, total_ms = timings.to_list(), timings.elapsed_ms
+        if output_format == "json":
+            click.echo(json.dumps({"phases": phases, "total_ms": total_ms}), err=True)
+        else:
+            click.echo(format_phases(phases, total_ms), err=True)
+
+    # the root context is closed last, after the command context and its resources
+    ctx.call_on_close(_report)
+
+
 def create_ellar_cli(app_import_string: t.Optional[str] = None) -> EllarCommandGroup:
     @click.group(
         name="Ellar CLI Tool... ",
@@ -47,16 +71,106 @@ def create_ellar_cli(app_import_string: t.Optional[str] = None) -> EllarCommandG
         expose_value=False,
         is_eager=True,
     )
+    @click.option(
+        "--timings",
+        callback=timings_callback,
+        help=f"Print the duration of the CLI phases to stderr. Also enabled with {ELLAR_TIMINGS_ENV}=1",
+        is_flag=True,
+        expose_value=False,
+        is_eager=True,
+    )
+    @click.option(
+        "--timings-format",
+        type=click.Choice(["table", "json"]),
+        default=None,
+        help="Format of `--timings`. Defaults to table",
+    )
     @click.pass_context
     def _app_cli(ctx: click.Context, **kwargs: t.Any) -> None:
         ctx.meta[ELLAR_PROJECT_NAME] = kwargs["project"]
 
     if not app_import_string:
-        _app_cli.add_command(new_command)
-        _app_cli.add_command(create_project)
+        _app_cli.params.extend(
+            [
+                click.Option(
+                    ["--projects"],
+                    default=None,
+                    help="Run Command on these comma separated projects in parallel",
+                ),
+                click.Option(
+                    ["--all-projects"],
+                    is_flag=True,
+                    default=False,
+                    help="Run Command on all projects in parallel",
+                ),
+                click.Option(
+                    ["--jobs"],
+                    type=click.IntRange(min=1),
+                    default=None,
+                    help="Max number of projects running at once. Defaults to the CPU count",
+                ),
+            ]
+        )
+        _app_cli.add_lazy_command(
+            "ellar_cli.manage_commands.new:new_command",
+            "new",
+            help="- Runs a complete Ellar project scaffold and creates all files required for managing you application  -",
+            boot_level=click.BootLevel.NONE,
+        )
+        _app_cli.add_lazy_command(
+            "ellar_cli.manage_commands.create_project:create_project",
+            "create-project",
+            help="- Scaffolds Ellar Application -",
+            boot_level=click.BootLevel.NONE,
+        )
 
-    _app_cli.add_command(runserver)
-    _app_cli.add_command(create_module)
+    _app_cli.add_lazy_command(
+        "ellar_cli.manage_commands.runserver:runserver",
+        "runserver",
+        help="- Starts Uvicorn Server -",
+        boot_level=click.BootLevel.CONFIG,
+    )
+    _app_cli.add_lazy_command(
+        "ellar_cli.manage_commands.create_module:create_module",
+        "create-module",
+        help="- Scaffolds Ellar Application Module -",
+        boot_level=click.BootLevel.NONE,
+    )
+    _app_cli.add_lazy_command(
+        "ellar_cli.manage_commands.profile_startup:profile_startup",
+        "profile-startup",
+        help="- Profiles Project Startup Phases -",
+        boot_level=click.BootLevel.NONE,
+    )
+    _app_cli.add_lazy_command(
+        "ellar_cli.manage_commands.bench:bench",
+        "bench",
+        help="- Benchmarks the routes of the application in-process -",
+        boot_level=click.BootLevel.CONFIG,
+    )
+    _app_cli.add_lazy_command(
+        "ellar_cli.manage_commands.loadtest:loadtest",
+        "loadtest",
+        help="- Load tests a running server over HTTP -",
+        boot_level=click.BootLevel.NONE,
+    )
+    _app_cli.add_lazy_command(
+        "ellar_cli.manage_commands.top:top",
+        "top",
+        help="- Shows live statistics of server workers -",
+        boot_level=click.BootLevel.NONE,
+    )
+    _app_cli.add_lazy_command(
+        "ellar_cli.manage_commands.batch:batch",
+        "batch",
+        help="- Runs many commands under a single application boot -",
+    )
+    _app_cli.add_lazy_command(
+        "ellar_cli.manage_commands.daemon:daemon",
+        "daemon",
+        help="- Manages Ellar CLI Daemon -",
+        boot_level=click.BootLevel.NONE,
+    )
 
     return _app_cli  # type:ignore[no-any-return]
 
@@ -1,6 +1,41 @@
-from .create_module import create_module
-from .create_project import create_project
-from .new import new_command
-from .runserver import runserver
+import importlib
+import typing as t
 
-__all__ = ["runserver", "create_project", "create_module", "new_command"]
+__all__ = [
+    "runserver",
+    "create_project",
+    "create_module",
+    "new_command",
+    "profile_startup",
+    "daemon",
+    "batch",
+    "bench",
+    "loadtest",
+    "top",
+]
+
+# command name -> (module, attribute). Loaded on first access so that importing
+# one command does not import the dependencies of every other command
+_COMMANDS = {
+    "runserver": (".runserver", "runserver"),
+    "create_project": (".create_project", "create_project"),
+    "create_module": (".create_module", "create_module"),
+    "new_command": (".new", "new_command"),
+    "profile_startup": (".profile_startup", "profile_startup"),
+    "daemon": (".daemon", "daemon"),
+    "batch": (".batch", "batch"),
+    "bench": (".bench", "bench"),
+    "loadtest": (".loadtest", "loadtest"),
+    "top": (".top", "top"),
+}
+
+
+def __getattr__(name: str) -> t.Any:
+    if name in _COMMANDS:
+        module_name, attr = _COMMANDS[name]
+        return getattr(importlib.import_module(module_name, __name__), attr)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> t.List[str]:
+    return sorted(__all__)  # pragma: no cover
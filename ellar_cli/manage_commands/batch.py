@@ -0,0 +1,160 @@
+import json
+import os
+import shlex
+import sys
+import time
+import traceback
+import typing as t
+
+import click
+
+import ellar_cli.click as eClick
+from ellar_cli.service import EllarCLIException
+
+__all__ = ["batch"]
+
+
+class BatchResult(t.NamedTuple):
+    command_line: str
+    exit_code: int
+    duration_ms: float
+
+
+def _to_args(item: t.Any) -> t.List[str]:
+    if isinstance(item, str):
+        return shlex.split(item, comments=True)
+    if isinstance(item, (list, tuple)) and all(isinstance(arg, str) for arg in item):
+        return list(item)
+    raise EllarCLIException(
+        f"Invalid batch entry {item!r}. Expected a command line string or a list of arguments."
+    )
+
+
+def parse_batch(content: str, file_name: str, input_format: str) -> t.List[t.List[str]]:
+    """
+    Returns the arguments of each command in `content`.
+    `auto` reads a JSON list if the content starts with `[`, YAML for `.yml` and `.yaml` files
+    and one command line per line otherwise. Blank lines and `#` comments are ignored.
+    """
+    if input_format == "auto":
+        if content.lstrip().startswith("["):
+            input_format = "json"
+        elif os.path.splitext(file_name)[1].lower() in (".yml", ".yaml"):
+            input_format = "yaml"
+        else:
+            input_format = "lines"
+
+    items: t.Any
+    if input_format == "lines":
+        items = content.splitlines()
+    elif input_format == "json":
+        try:
+            items = json.loads(content)
+        except ValueError as ex:
+            raise EllarCLIException(f"Invalid JSON batch file: {ex}") from ex
+    else:
+        try:
+            import yaml
+        except ImportError as ex:  # pragma: no cover
+            raise EllarCLIException(
+                "Reading YAML batch files requires PyYAML. `pip install pyyaml`"
+            ) from ex
+        try:
+            items = yaml.safe_load(content)
+        except yaml.YAMLError as ex:
+            raise EllarCLIException(f"Invalid YAML batch file: {ex}") from ex
+
+    if not isinstance(items, list):
+        raise EllarCLIException("A batch file must contain a list of commands.")
+
+    return [args for args in (_to_args(item) for item in items) if args]
+
+
+def _run_command(
+    root_ctx: click.Context, command: click.Command, args: t.List[str]
+) -> int:
+    """Runs `command` as a subcommand of the root group, in the same process and context"""
+    try:
+        with command.make_context(args[0], args[1:], parent=root_ctx) as sub_ctx:
+            sub_ctx.command.invoke(sub_ctx)
+        return 0
+    except click.exceptions.Exit as ex:
+        return ex.exit_code
+    except click.ClickException as ex:
+        ex.show()
+        return ex.exit_code
+    except click.Abort:
+        eClick.echo("Aborted!", err=True)
+        return 1
+    except SystemExit as ex:
+        return ex.code if isinstance(ex.code, int) else (0 if ex.code is None else 1)
+    except Exception:
+        traceback.print_exc()
+        return 1
+
+
+@eClick.command(name="batch")
+@eClick.argument("file", type=eClick.File("r"), help="Batch file or `-` for stdin")
+@eClick.option(
+    "--format",
+    "input_format",
+    type=eClick.Choice(["auto", "lines", "json", "yaml"]),
+    default="auto",
+    show_default=True,
+    help="Format of the batch file.",
+)
+@eClick.option(
+    "--continue-on-failure/--stop-on-failure",
+    default=False,
+    show_default=True,
+    help="Run the remaining commands after a command fails.",
+)
+@eClick.with_injector_context
+@eClick.pass_context
+def batch(
+    ctx: eClick.Context,
+    file: t.TextIO,
+    input_format: str,
+    continue_on_failure: bool,
+):
+    """- Runs many commands under a single application boot -"""
+    commands = parse_batch(file.read(), getattr(file, "name", ""), input_format)
+    root_ctx = ctx.find_root()
+    group = t.cast(click.Group, root_ctx.command)
+
+    # every command is resolved before any runs, so that a typo doesn't leave a half applied batch
+    resolved = []
+    for args in commands:
+        command = group.get_command(root_ctx, args[0])
+        if command is None:
+            raise EllarCLIException(f"No such command '{args[0]}' in batch file.")
+        resolved.append((command, args))
+
+    results: t.List[BatchResult] = []
+    for command, args in resolved:
+        command_line = shlex.join(args)
+        sys.stdout.flush()
+        eClick.echo(f"==> {command_line}", err=True)
+
+        start = time.perf_counter()
+        exit_code = _run_command(root_ctx, command, args)
+        results.append(
+            BatchResult(command_line, exit_code, (time.perf_counter() - start) * 1000)
+        )
+        if exit_code != 0 and not continue_on_failure:
+            break
+
+    sys.stdout.flush()
+    eClick.echo(f"\n{'status':<8}{'ms':>10}  command", err=True)
+    for result in results:
+        status = "ok" if result.exit_code == 0 else f"exit {result.exit_code}"
+        eClick.echo(
+            f"{status:<8}{result.duration_ms:>10.1f}  {result.command_line}", err=True
+        )
+    skipped = len(resolved) - len(results)
+    if skipped:
+        eClick.echo(f"skipped {skipped} command(s) after a failure", err=True)
+
+    failed = [result for result in results if result.exit_code != 0]
+    if failed:
+        ctx.exit(failed[-1].exit_code)
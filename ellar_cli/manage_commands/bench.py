@@ -0,0 +1,216 @@
+import fnmatch
+import json
+import os
+import typing as t
+
+import ellar_cli.click as eClick
+from ellar_cli.constants import ELLAR_META
+from ellar_cli.service import EllarCLIException, EllarCLIService
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from ellar_cli.benchmarking import BenchRoute, RouteResult
+
+__all__ = ["bench"]
+
+
+def parse_fixtures(
+    content: str, file_name: str
+) -> t.Dict[str, t.List[t.Dict[str, t.Any]]]:
+    """
+    Returns the payload fixtures of each route pattern in `content`, a JSON or, for `.yml`
+    and `.yaml` files, YAML mapping of `METHOD /path` glob patterns to a fixture or a list
+    of fixtures sent in turn.
+    """
+    data: t.Any
+    if os.path.splitext(file_name)[1].lower() in (".yml", ".yaml"):
+        try:
+            import yaml
+        except ImportError as ex:  # pragma: no cover
+            raise EllarCLIException(
+                "Reading YAML fixtures requires PyYAML. `pip install pyyaml`"
+            ) from ex
+        try:
+            data = yaml.safe_load(content)
+        except yaml.YAMLError as ex:
+            raise EllarCLIException(f"Invalid YAML fixtures file: {ex}") from ex
+    else:
+        try:
+            data = json.loads(content)
+        except ValueError as ex:
+            raise EllarCLIException(f"Invalid JSON fixtures file: {ex}") from ex
+
+    if not isinstance(data, dict):
+        raise EllarCLIException(
+            "A fixtures file must map `METHOD /path` patterns to fixtures."
+        )
+
+    fixtures = {}
+    for pattern, value in data.items():
+        items = value if isinstance(value, list) else [value]
+        if not all(isinstance(item, dict) for item in items):
+            raise EllarCLIException(
+                f"Invalid fixture for {pattern!r}. Expected a mapping or a list of mappings."
+            )
+        fixtures[str(pattern)] = items
+    return fixtures
+
+
+def _get_route_fixtures(
+    route: "BenchRoute", fixtures: t.Dict[str, t.List[t.Dict[str, t.Any]]]
+) -> t.List[t.Dict[str, t.Any]]:
+    if route.key in fixtures:
+        return fixtures[route.key]
+    for pattern, items in fixtures.items():
+        if fnmatch.fnmatchcase(route.key, pattern):
+            return items
+    return []
+
+
+async def _run_benchmarks(
+    app: t.Any,
+    routes: t.List["BenchRoute"],
+    fixtures: t.Dict[str, t.List[t.Dict[str, t.Any]]],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+) -> t.List["RouteResult"]:
+    from ellar_cli.benchmarking import benchmark_route, build_requests, lifespan
+
+    results = []
+    async with lifespan(app) as state:
+        for route in routes:
+            requests = build_requests(route, _get_route_fixtures(route, fixtures))
+            results.append(
+                await benchmark_route(
+                    app,
+                    route,
+                    requests,
+                    concurrency=concurrency,
+                    duration=duration,
+                    warmup=warmup,
+                    state=state,
+                )
+            )
+    return results
+
+
+def _format_statuses(statuses: t.Dict[str, int]) -> str:
+    return " ".join(f"{status}:{count}" for status, count in sorted(statuses.items()))
+
+
+@eClick.command(name="bench", boot_level=eClick.BootLevel.CONFIG)
+@eClick.option(
+    "--route",
+    "route_patterns",
+    multiple=True,
+    help="Benchmark only the routes matching this glob, e.g. `GET /items/*`. Repeatable.",
+)
+@eClick.option(
+    "--concurrency",
+    type=eClick.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="Number of concurrent clients per route.",
+)
+@eClick.option(
+    "--duration",
+    type=eClick.FloatRange(min=0, min_open=True),
+    default=5.0,
+    show_default=True,
+    help="Seconds to benchmark each route for.",
+)
+@eClick.option(
+    "--warmup",
+    type=eClick.FloatRange(min=0),
+    default=1.0,
+    show_default=True,
+    help="Seconds of unrecorded requests sent to each route first.",
+)
+@eClick.option(
+    "--fixtures",
+    "fixtures_file",
+    type=eClick.File("r"),
+    default=None,
+    help="JSON or YAML file of the path parameters, query, headers and body sent to each route.",
+)
+@eClick.option(
+    "--json",
+    "as_json",
+    is_flag=True,
+    default=False,
+    help="Print the results as JSON.",
+)
+@eClick.pass_context
+def bench(
+    ctx: eClick.Context,
+    route_patterns: t.Tuple[str, ...],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    fixtures_file: t.Optional[t.TextIO],
+    as_json: bool,
+):
+    """- Benchmarks the routes of the application in-process -"""
+    # requests are sent straight to the ASGI application, without a server or sockets.
+    # A route that raised or answered with a server error fails the command, for CI
+    from ellar_cli.benchmarking import (
+        LATENCY_PERCENTILES,
+        filter_routes,
+        get_routes,
+        percentile,
+    )
+    from ellar_cli.event_loop import run_coroutine
+
+    ellar_project_meta = t.cast(t.Optional[EllarCLIService], ctx.meta.get(ELLAR_META))
+    if not ellar_project_meta or not ellar_project_meta.has_meta:
+        raise EllarCLIException(
+            "No available project found. please create ellar project with `ellar create-project 'project-name'`"
+        )
+
+    fixtures = (
+        parse_fixtures(fixtures_file.read(), getattr(fixtures_file, "name", ""))
+        if fixtures_file
+        else {}
+    )
+    app = ellar_project_meta.import_application()
+    routes = filter_routes(get_routes(app.routes), route_patterns)
+    if not routes:
+        raise EllarCLIException("No routes to benchmark.")
+
+    results = run_coroutine(
+        _run_benchmarks(app, routes, fixtures, concurrency, duration, warmup)
+    )
+
+    if as_json:
+        eClick.echo(
+            json.dumps(
+                {
+                    "concurrency": concurrency,
+                    "duration_s": duration,
+                    "warmup_s": warmup,
+                    "routes": [result.to_dict() for result in results],
+                },
+                indent=2,
+            )
+        )
+    else:
+        percentile_names = [f"p{p:g}" for p in LATENCY_PERCENTILES]
+        width = max(len(result.route.key) for result in results)
+        eClick.echo(
+            f"{'route':<{width}} {'requests':>9} {'req/s':>10} "
+            + " ".join(f"{name + ' ms':>9}" for name in percentile_names)
+            + "  statuses"
+        )
+        for result in results:
+            eClick.echo(
+                f"{result.route.key:<{width}} {result.requests:>9} "
+                f"{result.requests_per_second:>10.1f} "
+                + " ".join(
+                    f"{percentile(result.latencies, p) * 1000:>9.3f}"
+                    for p in LATENCY_PERCENTILES
+                )
+                + f"  {_format_statuses(result.statuses)}"
+            )
+
+    if any(result.failed for result in results):
+        ctx.exit(1)
@@ -71,14 +71,13 @@ class ModuleTemplateScaffold(FileTemplateScaffold):
         return template_context
 
 
-@eClick.command(name="create-module")
+@eClick.command(name="create-module", boot_level=eClick.BootLevel.NONE)
 @eClick.argument("module_name")
 @eClick.argument(
     "directory",
     help="The name of a new directory to scaffold the module into.",
     required=False,
 )
-@eClick.with_injector_context
 def create_module(module_name: str, directory: t.Optional[str]):
     """- Scaffolds Ellar Application Module -"""
 
@@ -0,0 +1,139 @@
+import json
+import os
+import signal
+import sys
+import time
+import typing as t
+
+import ellar_cli.click as eClick
+from ellar_cli.daemon import (
+    CLIDaemon,
+    ensure_daemon_dir,
+    get_daemon_paths,
+    send_daemon_request,
+)
+from ellar_cli.service import EllarCLIException
+
+__all__ = ["daemon"]
+
+
+def _get_root_group(ctx: eClick.Context) -> t.Tuple[eClick.EllarCommandGroup, str]:
+    root_ctx = ctx.find_root()
+    group = t.cast(eClick.EllarCommandGroup, root_ctx.command)
+    return group, root_ctx.params.get("project") or "default"
+
+
+def _detach(log_path: str) -> bool:
+    """Double forks into a session-less process. Returns True in the detached process."""
+    if os.fork() != 0:
+        return False
+
+    os.setsid()
+    if os.fork() != 0:  # pragma: no cover
+        os._exit(0)
+
+    log_fd = os.open(
+        log_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600
+    )  # pragma: no cover
+    null_fd = os.open(os.devnull, os.O_RDONLY)  # pragma: no cover
+    os.dup2(null_fd, 0)  # pragma: no cover
+    os.dup2(log_fd, 1)  # pragma: no cover
+    os.dup2(log_fd, 2)  # pragma: no cover
+    return True  # pragma: no cover
+
+
+@eClick.group(name="daemon", boot_level=eClick.BootLevel.NONE)
+def daemon():
+    """- Manages Ellar CLI Daemon -"""
+
+
+@daemon.command(name="start", with_injector_context=False)
+@eClick.option(
+    "--foreground",
+    is_flag=True,
+    default=False,
+    help="Serve in the current process instead of detaching.",
+)
+@eClick.option(
+    "--timeout",
+    type=float,
+    default=30.0,
+    show_default=True,
+    help="Seconds to wait for a detached daemon to start serving.",
+)
+@eClick.pass_context
+def start(ctx: eClick.Context, foreground: bool, timeout: float):
+    """Boots the application once and serves every following `ellar` invocation in this directory"""
+    group, project = _get_root_group(ctx)
+    socket_path, pid_path = get_daemon_paths(group.app_import_string)
+
+    if send_daemon_request(socket_path, {"command": "status"}):
+        raise EllarCLIException(f"Ellar CLI daemon is already running at {socket_path}")
+    try:
+        ensure_daemon_dir(socket_path)
+    except OSError as ex:
+        raise EllarCLIException(f"Can't start the Ellar CLI daemon: {ex}") from ex
+
+    cli_daemon = CLIDaemon(group, project, socket_path, pid_path)
+    # preloaded before detaching, so that import errors are reported here
+    cli_daemon.preload()
+
+    if foreground:
+        eClick.echo(f"Ellar CLI daemon serving at {socket_path}")
+        sys.stdout.flush()
+        cli_daemon.serve_forever()
+        return
+
+    log_path = f"{os.path.splitext(socket_path)[0]}.log"
+    if _detach(log_path):  # pragma: no cover
+        try:
+            cli_daemon.serve_forever()
+        finally:
+            os._exit(0)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = send_daemon_request(socket_path, {"command": "status"})
+        if status:
+            eClick.echo(
+                f"Ellar CLI daemon started. pid={status['pid']} socket={socket_path}"
+            )
+            return
+        time.sleep(0.05)
+    raise EllarCLIException(
+        f"Ellar CLI daemon did not start within {timeout} seconds. See {log_path}"
+    )
+
+
+@daemon.command(name="stop", with_injector_context=False)
+@eClick.pass_context
+def stop(ctx: eClick.Context):
+    """Stops the daemon serving this directory"""
+    group, _ = _get_root_group(ctx)
+    socket_path, pid_path = get_daemon_paths(group.app_import_string)
+
+    if send_daemon_request(socket_path, {"command": "stop"}):
+        eClick.echo("Ellar CLI daemon stopped.")
+        return
+
+    try:
+        with open(pid_path) as fp:
+            os.kill(int(fp.read().strip()), signal.SIGTERM)
+    except (OSError, ValueError):
+        eClick.echo("Ellar CLI daemon is not running.")
+    else:
+        eClick.echo("Ellar CLI daemon stopped.")
+
+
+@daemon.command(name="status", with_injector_context=False)
+@eClick.pass_context
+def status(ctx: eClick.Context):
+    """Shows the state of the daemon serving this directory"""
+    group, _ = _get_root_group(ctx)
+    socket_path, _ = get_daemon_paths(group.app_import_string)
+
+    daemon_status = send_daemon_request(socket_path, {"command": "status"})
+    if not daemon_status:
+        eClick.echo("Ellar CLI daemon is not running.")
+        return
+    eClick.echo(json.dumps(daemon_status, indent=2))
@@ -0,0 +1,223 @@
+import json
+import platform
+import typing as t
+
+import ellar_cli.click as eClick
+from ellar_cli.service import EllarCLIException
+
+__all__ = ["loadtest"]
+
+HISTOGRAM_PERCENTILES = (50.0, 75.0, 90.0, 99.0, 99.9, 99.99, 100.0)
+
+
+def _parse_header(header: str) -> t.Tuple[str, str]:
+    name, sep, value = header.partition(":")
+    if not sep or not name.strip():
+        raise EllarCLIException(f"Invalid header {header!r}. Expected `Name: value`.")
+    return name.strip(), value.strip()
+
+
+@eClick.command(name="loadtest", boot_level=eClick.BootLevel.NONE)
+@eClick.option(
+    "--host",
+    type=str,
+    default="127.0.0.1",
+    show_default=True,
+    help="Host of the server.",
+)
+@eClick.option(
+    "--port", type=int, default=8000, show_default=True, help="Port of the server."
+)
+@eClick.option(
+    "--uds",
+    type=str,
+    default=None,
+    help="Unix socket of the server, like `runserver --uds`.",
+)
+@eClick.option(
+    "--path",
+    "paths",
+    multiple=True,
+    default=["/"],
+    show_default=True,
+    help="Path to request. Repeat to request several paths in turn.",
+)
+@eClick.option(
+    "--method", type=str, default="GET", show_default=True, help="HTTP method."
+)
+@eClick.option(
+    "--header",
+    "headers",
+    multiple=True,
+    help="Request header as `Name: value`. Repeatable.",
+)
+@eClick.option(
+    "--data",
+    type=str,
+    default=None,
+    help="Request body, or `@file` to read it from a file.",
+)
+@eClick.option(
+    "--connections",
+    type=eClick.IntRange(min=1),
+    default=10,
+    show_default=True,
+    help="Number of keep-alive connections.",
+)
+@eClick.option(
+    "--rate",
+    type=eClick.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Send this many requests per second whether or not the server keeps up (open "
+    "loop). By default, each connection sends its next request once the previous one "
+    "completed (closed loop).",
+)
+@eClick.option(
+    "--duration",
+    type=eClick.FloatRange(min=0, min_open=True),
+    default=10.0,
+    show_default=True,
+    help="Seconds to send requests for.",
+)
+@eClick.option(
+    "--warmup",
+    type=eClick.FloatRange(min=0),
+    default=1.0,
+    show_default=True,
+    help="Seconds of unrecorded requests sent first.",
+)
+@eClick.option(
+    "--timeout",
+    type=eClick.FloatRange(min=0, min_open=True),
+    default=30.0,
+    show_default=True,
+    help="Seconds to wait for a response.",
+)
+@eClick.option(
+    "--expected-interval",
+    type=eClick.FloatRange(min=0),
+    default=None,
+    help="Expected milliseconds between requests of a connection, used to correct closed "
+    "loop latencies for coordinated omission. Defaults to the median service time.",
+)
+@eClick.option(
+    "--output",
+    type=eClick.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write the JSON results to this file instead of stdout.",
+)
+def loadtest(
+    host: str,
+    port: int,
+    uds: t.Optional[str],
+    paths: t.Tuple[str, ...],
+    method: str,
+    headers: t.Tuple[str, ...],
+    data: t.Optional[str],
+    connections: int,
+    rate: t.Optional[float],
+    duration: float,
+    warmup: float,
+    timeout: float,
+    expected_interval: t.Optional[float],
+    output: t.Optional[str],
+):
+    """- Load tests a running server over HTTP -"""
+    import ellar_cli
+    from ellar_cli.event_loop import run_coroutine
+    from ellar_cli.loadtest import (
+        LoadTestTarget,
+        build_request,
+        run_closed_loop,
+        run_open_loop,
+    )
+
+    if rate is not None and expected_interval is not None:
+        raise EllarCLIException(
+            "--expected-interval only applies to closed loop load tests, without --rate."
+        )
+
+    body = b""
+    if data is not None and data.startswith("@"):
+        try:
+            with open(data[1:], mode="rb") as file:
+                body = file.read()
+        except OSError as ex:
+            raise EllarCLIException(f"Can't read the request body: {ex}") from ex
+    elif data is not None:
+        body = data.encode()
+
+    method = method.upper()
+    target = LoadTestTarget(host, port, uds)
+    request_headers = [_parse_header(header) for header in headers]
+    requests = [
+        (method, build_request(method, path, target.host_header, request_headers, body))
+        for path in paths
+    ]
+
+    eClick.echo(
+        f"Load testing {target.url} with {connections} connection(s) for {duration:g}s"
+        + (f" at {rate:g} requests/s" if rate else ""),
+        err=True,
+    )
+    if rate:
+        result = run_coroutine(
+            run_open_loop(
+                target, requests, rate, connections, duration, warmup, timeout
+            )
+        )
+    else:
+        result = run_coroutine(
+            run_closed_loop(
+                target,
+                requests,
+                connections,
+                duration,
+                warmup,
+                timeout,
+                expected_interval * 1000 if expected_interval is not None else None,
+            )
+        )
+
+    report = {
+        "target": target.url,
+        "mode": "open" if rate else "closed",
+        "method": method,
+        "paths": list(paths),
+        "connections": connections,
+        "rate": rate,
+        "duration_s": duration,
+        "warmup_s": warmup,
+        "requests": result.requests,
+        "requests_per_second": round(result.requests_per_second, 1),
+        "statuses": dict(sorted(result.statuses.items())),
+        "errors": dict(sorted(result.errors.items())),
+        "expected_interval_ms": round(result.expected_interval / 1000, 3),
+        "latency_ms": {
+            # corrected for coordinated omission
+            "response_time": result.response_time.to_dict(HISTOGRAM_PERCENTILES),
+            "service_time": result.service_time.to_dict(HISTOGRAM_PERCENTILES),
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "ellar_cli": ellar_cli.__version__,
+        },
+    }
+    content = json.dumps(report, indent=2)
+    if output:
+        with open(output, mode="w") as fw:
+            fw.write(content + "\n")
+    else:
+        eClick.echo(content)
+
+    response_time = result.response_time
+    eClick.echo(
+        f"{result.requests} requests, {result.requests_per_second:.1f} requests/s, "
+        f"{sum(result.errors.values())} errors. Response time p50 "
+        f"{response_time.value_at_percentile(50) / 1000:.3f}ms, p99 "
+        f"{response_time.value_at_percentile(99) / 1000:.3f}ms, p99.9 "
+        f"{response_time.value_at_percentile(99.9) / 1000:.3f}ms",
+        err=True,
+    )
+    if not result.requests:
+        raise EllarCLIException("No request got a response.")
@@ -0,0 +1,137 @@
+import json
+import os
+import subprocess
+import sys
+import typing as t
+
+import ellar_cli.click as eClick
+from ellar_cli.constants import ELLAR_META
+from ellar_cli.profiling import (
+    PHASES_OUTPUT_PREFIX,
+    ImportNode,
+    parse_importtime,
+)
+from ellar_cli.service import (
+    EllarCLIException,
+    EllarCLIService,
+    EllarCLIServiceWithPyProject,
+)
+
+__all__ = ["profile_startup"]
+
+
+def _run_profiled_interpreter(
+    ellar_project_meta: EllarCLIService,
+) -> t.Tuple[t.List[t.Dict[str, t.Any]], t.List[ImportNode]]:
+    args = [sys.executable, "-X", "importtime", "-m", "ellar_cli.profiling"]
+    if isinstance(ellar_project_meta, EllarCLIServiceWithPyProject):
+        args.extend(["--application", ellar_project_meta.project_meta.application])
+    else:
+        args.extend(["--project", ellar_project_meta.app])
+
+    result = subprocess.run(
+        args,
+        cwd=os.getcwd(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    phases_output = [
+        line[len(PHASES_OUTPUT_PREFIX) :]
+        for line in result.stdout.splitlines()
+        if line.startswith(PHASES_OUTPUT_PREFIX)
+    ]
+    if result.returncode != 0 or not phases_output:
+        errors = "\n".join(
+            line
+            for line in result.stderr.splitlines()
+            if not line.startswith("import time:")
+        )
+        raise EllarCLIException(f"Profiling interpreter failed.\n{errors}")
+
+    return json.loads(phases_output[-1]), parse_importtime(result.stderr)
+
+
+def _import_tree_lines(
+    nodes: t.List[ImportNode], limit: int, depth: int, min_ms: float, level: int = 0
+) -> t.Iterator[str]:
+    nodes = sorted(nodes, key=lambda node: node.cumulative_us, reverse=True)
+    for node in nodes[:limit]:
+        cumulative_ms = node.cumulative_us / 1000
+        if cumulative_ms < min_ms:
+            break
+
+        yield (
+            f"{cumulative_ms:>10.1f} {node.self_us / 1000:>8.1f}  "
+            f"{'  ' * level}{node.name}"
+        )
+        if level + 1 < depth:
+            yield from _import_tree_lines(
+                node.children, limit, depth, min_ms, level=level + 1
+            )
+
+
+@eClick.command(name="profile-startup", boot_level=eClick.BootLevel.NONE)
+@eClick.option(
+    "--limit",
+    type=int,
+    default=20,
+    show_default=True,
+    help="Number of most expensive imports to show per level of the import tree.",
+)
+@eClick.option(
+    "--depth",
+    type=int,
+    default=3,
+    show_default=True,
+    help="Depth of the import tree to show.",
+)
+@eClick.option(
+    "--min-ms",
+    type=float,
+    default=1.0,
+    show_default=True,
+    help="Hide imports that took less than this many milliseconds.",
+)
+@eClick.option(
+    "--json",
+    "as_json",
+    is_flag=True,
+    default=False,
+    help="Print the complete phase and import data as JSON.",
+)
+@eClick.pass_context
+def profile_startup(
+    ctx: eClick.Context, limit: int, depth: int, min_ms: float, as_json: bool
+):
+    """- Profiles Project Startup Phases -"""
+    ellar_project_meta = t.cast(t.Optional[EllarCLIService], ctx.meta.get(ELLAR_META))
+
+    if not ellar_project_meta or not ellar_project_meta.has_meta:
+        raise EllarCLIException(
+            "No available project found. please create ellar project with `ellar create-project 'project-name'`"
+        )
+
+    phases, import_tree = _run_profiled_interpreter(ellar_project_meta)
+
+    if as_json:
+        eClick.echo(
+            json.dumps(
+                {
+                    "phases": phases,
+                    "imports": [node.to_dict() for node in import_tree],
+                },
+                indent=2,
+            )
+        )
+        return
+
+    eClick.echo("Startup phases")
+    eClick.echo(f"{'total ms':>10}  phase")
+    for phase in sorted(phases, key=lambda item: item["duration_ms"], reverse=True):
+        eClick.echo(f"{phase['duration_ms']:>10.1f}  {phase['name']}")
+
+    eClick.echo("\nMost expensive imports")
+    eClick.echo(f"{'total ms':>10} {'self ms':>8}  module")
+    for line in _import_tree_lines(import_tree, limit, depth, min_ms):
+        eClick.echo(line)
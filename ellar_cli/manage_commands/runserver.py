@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import os
+import socket
 import ssl
 import typing as t
 from datetime import datetime
@@ -37,7 +39,38 @@ LOOP_CHOICES = eClick.Choice([key for key in LOOP_FACTORIES.keys() if key != "no
 INTERFACE_CHOICES = eClick.Choice(INTERFACES)
 
 
-@eClick.command(name="runserver", context_settings={"auto_envvar_prefix": "UVICORN"})
+class WorkersCount(eClick.ParamType):
+    """A number of workers, or `auto` for one worker per CPU available to the server"""
+
+    name = "integer|auto"
+
+    def convert(
+        self,
+        value: t.Any,
+        param: eClick.Parameter | None,
+        ctx: eClick.Context | None,
+    ) -> t.Any:
+        if isinstance(value, int) or value == "auto":
+            return value
+        if str(value).strip().lower() == "auto":
+            return "auto"
+        try:
+            count = int(value)
+        except ValueError:
+            self.fail(f"{value!r} is not a valid integer or 'auto'.", param, ctx)
+        if count < 1:
+            self.fail(f"{value!r} is not a positive integer.", param, ctx)
+        return count
+
+
+WORKERS_COUNT = WorkersCount()
+
+
+@eClick.command(
+    name="runserver",
+    context_settings={"auto_envvar_prefix": "UVICORN"},
+    boot_level=eClick.BootLevel.CONFIG,
+)
 @eClick.option(
     "--host",
     type=str,
@@ -93,10 +126,75 @@ INTERFACE_CHOICES = eClick.Choice(INTERFACES)
 @eClick.option(
     "--workers",
     default=None,
-    type=int,
-    help="Number of worker processes. Defaults to the $WEB_CONCURRENCY environment"
+    type=WORKERS_COUNT,
+    help="Number of worker processes, or 'auto' for one per CPU available to the server"
+    " (CPU affinity and cgroup CPU quota). Defaults to the $WEB_CONCURRENCY environment"
     " variable if available, or 1. Not valid with --reload.",
 )
+@eClick.option(
+    "--pin-workers",
+    is_flag=True,
+    default=False,
+    help="Pin each worker process to its own CPU. Linux only. Not valid with --reload.",
+)
+@eClick.option(
+    "--reuse-port",
+    is_flag=True,
+    default=False,
+    help="Let each worker process listen on its own socket bound with SO_REUSEPORT, so"
+    " that the kernel balances connections between workers. Requires --host and --port."
+    " Not valid with --reload.",
+)
+@eClick.option(
+    "--prefork",
+    is_flag=True,
+    default=False,
+    help="Serve with Ellar's prefork supervisor instead of uvicorn's. It forks the worker"
+    " processes and replaces them one at a time, without downtime, on SIGHUP. Workers"
+    " publish their statistics, shown by `ellar top`. Implied by"
+    " --preload, --pin-workers, --reuse-port, --limit-max-requests-jitter,"
+    " --limit-max-rss, --profile and --loop-lag-threshold. Not valid with --reload.",
+)
+@eClick.option(
+    "--preload",
+    is_flag=True,
+    default=False,
+    help="Build the application once in the parent process and fork the workers from it,"
+    " sharing its memory copy-on-write. Workers replaced on SIGHUP are also forked from"
+    " it, so they don't pick up code deployed since: restart the server instead."
+    " Not valid with --reload.",
+)
+@eClick.option(
+    "--gc-freeze",
+    is_flag=True,
+    default=False,
+    help="Freeze the objects of the preloaded application in the garbage collector before"
+    " forking, so workers don't copy the memory they share. Requires --preload.",
+)
+@eClick.option(
+    "--profile",
+    "profile_dir",
+    is_flag=False,
+    flag_value="ellar-profiles",
+    help="Profile each worker process with a stack sampler, and write the samples as"
+    " collapsed stacks (flame graph input) to this directory, 'ellar-profiles' by default,"
+    " when the worker stops or on SIGUSR2. Not valid with --reload.",
+)
+@eClick.option(
+    "--profile-frequency",
+    type=eClick.IntRange(min=1, max=1000),
+    default=100,
+    show_default=True,
+    help="Stack samples per second of CPU time used by a worker, with --profile.",
+)
+@eClick.option(
+    "--loop-lag-threshold",
+    type=eClick.IntRange(min=1),
+    default=None,
+    help="Monitor the event loop of each worker process: log the stack of the code"
+    " blocking it for longer than this many milliseconds, and the event loop lag"
+    " percentiles every minute and when the worker stops. Not valid with --reload.",
+)
 @eClick.option(
     "--loop",
     type=LOOP_CHOICES,
@@ -244,6 +342,21 @@ INTERFACE_CHOICES = eClick.Choice(INTERFACES)
     default=None,
     help="Maximum number of requests to service before terminating the process.",
 )
+@eClick.option(
+    "--limit-max-requests-jitter",
+    type=eClick.IntRange(min=0),
+    default=0,
+    help="Add a random number of requests up to this one to --limit-max-requests of each"
+    " worker, so that workers are not all replaced at the same time. Workers reaching"
+    " their limit are replaced without downtime, one at a time.",
+)
+@eClick.option(
+    "--limit-max-rss",
+    type=eClick.IntRange(min=1),
+    default=None,
+    help="Maximum resident memory of a worker process in MiB. Checked periodically, workers"
+    " above it are replaced without downtime, one at a time.",
+)
 @eClick.option(
     "--timeout-keep-alive",
     type=int,
@@ -344,7 +457,15 @@ def runserver(
     reload_includes: list[str],
     reload_excludes: list[str],
     reload_delay: float,
-    workers: int,
+    workers: int | str | None,
+    pin_workers: bool,
+    reuse_port: bool,
+    prefork: bool,
+    preload: bool,
+    gc_freeze: bool,
+    profile_dir: str | None,
+    profile_frequency: int,
+    loop_lag_threshold: int | None,
     env_file: str,
     log_level: str,
     access_log: bool,
@@ -356,6 +477,8 @@ def runserver(
     limit_concurrency: int,
     backlog: int,
     limit_max_requests: int,
+    limit_max_requests_jitter: int,
+    limit_max_rss: int | None,
     timeout_keep_alive: int,
     timeout_graceful_shutdown: int | None,
     ssl_keyfile: str,
@@ -382,6 +505,7 @@ def runserver(
         )
 
     application_import_string = ellar_project_meta.project_meta.application
+    # Only the Config is loaded. The application is built once, by whoever serves it
     current_config = ellar_project_meta.get_application_config()
 
     log_config = current_config.LOGGING_CONFIG
@@ -389,6 +513,65 @@ def runserver(
 
     _log_level = log_level if log_level else _log_level or LOG_LEVELS.info
 
+    if reload:
+        for flag, enabled in (
+            ("--prefork", prefork),
+            ("--preload", preload),
+            ("--pin-workers", pin_workers),
+            ("--reuse-port", reuse_port),
+            ("--limit-max-requests-jitter", bool(limit_max_requests_jitter)),
+            ("--limit-max-rss", limit_max_rss is not None),
+            ("--profile", profile_dir is not None),
+            ("--loop-lag-threshold", loop_lag_threshold is not None),
+        ):
+            if enabled:
+                raise EllarCLIException(f"{flag} is not valid with --reload.")
+    if reuse_port:
+        if uds or fd is not None:
+            raise EllarCLIException("--reuse-port is not valid with --uds or --fd.")
+        if not port:
+            raise EllarCLIException("--reuse-port requires a fixed --port.")
+        if not hasattr(socket, "SO_REUSEPORT"):
+            raise EllarCLIException("SO_REUSEPORT is not supported on this platform.")
+    if gc_freeze and not preload:
+        raise EllarCLIException("--gc-freeze requires --preload.")
+    if limit_max_requests_jitter and limit_max_requests is None:
+        raise EllarCLIException(
+            "--limit-max-requests-jitter requires --limit-max-requests."
+        )
+
+    # same default as uvicorn
+    if workers is None:
+        workers = WORKERS_COUNT.convert(os.environ.get("WEB_CONCURRENCY", 1), None, ctx)
+    _workers, workers_layout, worker_hooks = _get_workers_layout(workers, pin_workers)
+    if profile_dir is not None:
+        from ellar_cli.server import SamplingProfilerHook
+
+        worker_hooks.append(SamplingProfilerHook(profile_dir, profile_frequency))
+    if loop_lag_threshold is not None:
+        from ellar_cli.server import LoopLagHook
+
+        worker_hooks.append(LoopLagHook(loop_lag_threshold / 1000))
+    # uvicorn's supervisor has none of these features
+    use_supervisor = (
+        prefork
+        or preload
+        or reuse_port
+        or bool(worker_hooks)
+        or bool(limit_max_requests_jitter)
+        or limit_max_rss is not None
+    )
+
+    application: t.Any = application_import_string
+    is_factory = False
+    if preload or (_workers <= 1 and not reload and not use_supervisor):
+        # served in this process or forked from it, so the application is built here
+        application = ellar_project_meta.import_application()
+    else:
+        # each server process imports the application. Workers started by the prefork
+        # supervisor on SIGHUP run the code deployed since
+        is_factory = ellar_project_meta.is_app_callable()
+
     init_kwargs = {
         "host": host,
         "ws_max_queue": ws_max_queue,
@@ -414,7 +597,7 @@ def runserver(
         "reload_includes": reload_includes or None,
         "reload_excludes": reload_excludes or None,
         "reload_delay": reload_delay,
-        "workers": workers,
+        "workers": _workers,
         "proxy_headers": proxy_headers,
         "server_header": server_header,
         "date_header": date_header,
@@ -434,15 +617,133 @@ def runserver(
         "ssl_ciphers": ssl_ciphers,
         "headers": [header.split(":", 1) for header in headers],
         "use_colors": use_colors,
-        "factory": ellar_project_meta.is_app_callable(),
+        "factory": is_factory,
         # "app_dir": application_import_string.split(':')[0].replace('.', '/'),
     }
 
     now = datetime.now().strftime("%B %d, %Y - %X")
-    print(
+    banner = (
         f"\nStarting Uvicorn server...\n"
         f"{now}\n"
         f"Ellar version {ellar_version}, using settings {current_config.config_module!r}\n"
     )
+    if preload:
+        banner += f"Application preloaded, forking {_workers} worker(s)\n"
+    if reuse_port:
+        banner += "Each worker listens on its own SO_REUSEPORT socket\n"
+    banner += "".join(f"{line}\n" for line in workers_layout)
+    if profile_dir is not None:
+        banner += (
+            f"Profiling workers at {profile_frequency} Hz, stack samples written to"
+            f" {os.path.abspath(profile_dir)!r} on exit and on SIGUSR2\n"
+        )
+    if loop_lag_threshold is not None:
+        banner += (
+            f"Logging event loop stalls of workers longer than {loop_lag_threshold}ms\n"
+        )
+    print(banner)
+
+    if use_supervisor:
+        _run_prefork(
+            ctx,
+            application,
+            init_kwargs,
+            _workers,
+            gc_freeze=gc_freeze,
+            hooks=worker_hooks,
+            reuse_port=reuse_port,
+            max_rss=limit_max_rss * 2**20 if limit_max_rss else None,
+            max_requests_jitter=limit_max_requests_jitter,
+        )
+        return
+
+    uvicorn_run(application, **init_kwargs)
+
+
+def _get_workers_layout(
+    workers: int | str, pin_workers: bool
+) -> tuple[int, list[str], list[t.Any]]:
+    """
+    Resolves the number of workers, and how they are laid out on the CPUs.
+    Returns that number, the lines describing the layout in the banner and the worker hooks.
+    """
+    if workers != "auto" and not pin_workers:
+        return t.cast(int, workers), [], []
+    if pin_workers and not hasattr(os, "sched_setaffinity"):
+        raise EllarCLIException(
+            "--pin-workers is not supported on this platform, it requires Linux."
+        )
+
+    from ellar_cli.server import CPUAffinityHook
+    from ellar_cli.server.cpu import (
+        get_auto_workers_count,
+        get_available_cpus,
+        get_cgroup_cpu_quota,
+    )
+
+    lines: list[str] = []
+    hooks: list[t.Any] = []
+    cpus = get_available_cpus()
+
+    if workers == "auto":
+        cpu_quota = get_cgroup_cpu_quota()
+        count = get_auto_workers_count(cpus, cpu_quota)
+        source = f"{len(cpus)} available CPU(s)"
+        if cpu_quota is not None:
+            source += f", cgroup CPU quota {cpu_quota:g}"
+        lines.append(f"Workers: {count} (auto: {source})")
+    else:
+        count = t.cast(int, workers)
+        lines.append(f"Workers: {count}")
+
+    if pin_workers:
+        if count > len(cpus):
+            raise EllarCLIException(
+                f"--pin-workers requires a CPU per worker: {count} workers "
+                f"for {len(cpus)} available CPU(s)."
+            )
+        pinned = cpus[:count]
+        lines.append(
+            "Workers pinned to CPUs: "
+            + ", ".join(
+                f"worker {index} -> CPU {cpu}" for index, cpu in enumerate(pinned)
+            )
+        )
+        hooks.append(CPUAffinityHook(pinned))
 
-    uvicorn_run(application_import_string, **init_kwargs)
+    return count, lines, hooks
+
+
+def _run_prefork(
+    ctx: eClick.Context,
+    application: t.Any,
+    init_kwargs: dict[str, t.Any],
+    workers: int,
+    gc_freeze: bool,
+    hooks: t.Sequence[t.Any] = (),
+    reuse_port: bool = False,
+    max_rss: int | None = None,
+    max_requests_jitter: int = 0,
+) -> None:
+    from uvicorn import Config
+
+    from ellar_cli.server import PreforkSupervisor
+
+    config_kwargs = {
+        key: value
+        for key, value in init_kwargs.items()
+        if key not in ("reload", "workers")
+    }
+    config = Config(application, **config_kwargs)
+    supervisor = PreforkSupervisor(
+        config,
+        workers,
+        gc_freeze=gc_freeze,
+        hooks=hooks,
+        reuse_port=reuse_port,
+        max_rss=max_rss,
+        max_requests_jitter=max_requests_jitter,
+    )
+    exit_code = supervisor.run()
+    if exit_code:
+        ctx.exit(exit_code)
@@ -0,0 +1,189 @@
+import os
+import sys
+import time
+import typing as t
+
+import ellar_cli.click as eClick
+from ellar_cli.service import EllarCLIException
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from ellar_cli.server.stats import StatsTable, WorkerStats
+
+__all__ = ["top"]
+
+_COLUMNS = (
+    ("WORKER", 6),
+    ("PID", 8),
+    ("UPTIME", 10),
+    ("REQUESTS", 10),
+    ("REQ/S", 8),
+    ("IN-FLIGHT", 9),
+    ("RSS MIB", 8),
+    ("LAG MS", 8),
+    ("RESTARTS", 8),
+)
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(max(int(seconds), 0), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    duration = f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{days}d {duration}" if days else duration
+
+
+def _find_stats_file(pid: t.Optional[int]) -> str:
+    from ellar_cli.server.stats import find_stats_files, get_stats_path
+
+    if pid is not None:
+        path = get_stats_path(pid)
+        if not os.path.exists(path):
+            raise EllarCLIException(
+                f"No worker stats for pid {pid}. It must be the pid of `ellar runserver`"
+                " serving with the prefork supervisor."
+            )
+        return path
+
+    paths = find_stats_files()
+    if not paths:
+        raise EllarCLIException(
+            "No running prefork supervisor found. Serve with `ellar runserver --prefork`."
+        )
+    if len(paths) > 1:
+        pids = ", ".join(str(pid) for pid in paths)
+        raise EllarCLIException(
+            f"Several prefork supervisors are running ({pids}), choose one with --pid."
+        )
+    return next(iter(paths.values()))
+
+
+def _update_rates(
+    workers: t.Sequence["WorkerStats"],
+    previous: t.Dict[int, "WorkerStats"],
+    rates: t.Dict[int, float],
+) -> t.Dict[int, float]:
+    """Requests per second of `workers` by pid, since their `previous` stats"""
+    new_rates = {}
+    for stats in workers:
+        before = previous.get(stats.pid)
+        if before is not None and stats.updated_at > before.updated_at:
+            new_rates[stats.pid] = (stats.requests - before.requests) / (
+                stats.updated_at - before.updated_at
+            )
+        elif stats.pid in rates:
+            # not published again since
+            new_rates[stats.pid] = rates[stats.pid]
+    return new_rates
+
+
+def format_stats(
+    table: "StatsTable",
+    workers: t.Sequence["WorkerStats"],
+    rates: t.Dict[int, float],
+    now: float,
+) -> str:
+    """The view of `ellar top`. `rates` are the requests per second of workers by pid."""
+    total_rate = sum(rates.values())
+    lines = [
+        f"Supervisor [{table.supervisor_pid}], up {_format_duration(now - table.started_at)},"
+        f" {len(workers)} worker(s), {total_rate:.1f} requests/s",
+        "",
+        "  ".join(name.rjust(width) for name, width in _COLUMNS),
+    ]
+    for stats in workers:
+        rate = rates.get(stats.pid)
+        values = (
+            str(stats.slot),
+            str(stats.pid),
+            _format_duration(now - stats.started_at),
+            str(stats.requests),
+            "-" if rate is None else f"{rate:.1f}",
+            str(stats.in_flight),
+            f"{stats.rss / 2**20:.1f}",
+            f"{stats.loop_lag * 1000:.1f}",
+            str(stats.restarts),
+        )
+        lines.append(
+            "  ".join(value.rjust(width) for value, (_, width) in zip(values, _COLUMNS))
+        )
+    return "\n".join(lines)
+
+
+@eClick.command(name="top", boot_level=eClick.BootLevel.NONE)
+@eClick.option(
+    "--pid",
+    type=int,
+    default=None,
+    help="Pid of the `ellar runserver` serving with the prefork supervisor. Required when"
+    " several are running.",
+)
+@eClick.option(
+    "--interval",
+    type=eClick.FloatRange(min=0.1),
+    default=1.0,
+    show_default=True,
+    help="Seconds between refreshes. Workers publish their stats every second.",
+)
+@eClick.option(
+    "-n",
+    "--iterations",
+    type=eClick.IntRange(min=1),
+    default=None,
+    help="Exit after this many refreshes. Runs until interrupted by default.",
+)
+@eClick.option(
+    "--prometheus",
+    "prometheus_file",
+    type=eClick.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Also write the stats to this file at every refresh, in the Prometheus text"
+    " format read by the textfile collector of node exporter.",
+)
+def top(
+    pid: t.Optional[int],
+    interval: float,
+    iterations: t.Optional[int],
+    prometheus_file: t.Optional[str],
+):
+    """- Shows live statistics of server workers -"""
+    from ellar_cli.server.stats import StatsTable, write_prometheus_textfile
+
+    path = _find_stats_file(pid)
+    try:
+        table = StatsTable.open(path)
+    except (OSError, ValueError) as ex:
+        raise EllarCLIException(f"Can't read the worker stats: {ex}") from ex
+
+    clear = sys.stdout.isatty()
+    previous: t.Dict[int, "WorkerStats"] = {}
+    rates: t.Dict[int, float] = {}
+    refreshes = 0
+    try:
+        while True:
+            now = time.time()
+            workers = table.workers()
+            rates = _update_rates(workers, previous, rates)
+            previous = {stats.pid: stats for stats in workers if stats.updated_at}
+
+            if prometheus_file:
+                try:
+                    write_prometheus_textfile(prometheus_file, workers)
+                except OSError as ex:
+                    raise EllarCLIException(
+                        f"Can't write the Prometheus file: {ex}"
+                    ) from ex
+            if clear:
+                eClick.clear()
+            eClick.echo(format_stats(table, workers, rates, now))
+
+            refreshes += 1
+            if iterations is not None and refreshes >= iterations:
+                break
+            if not os.path.exists(path):
+                eClick.echo(f"Supervisor [{table.supervisor_pid}] stopped.")
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        table.close()
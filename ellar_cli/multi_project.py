@@ -0,0 +1,128 @@
+"""
+Runs one CLI invocation on several projects of `[tool.ellar.projects]` in parallel.
+
+Every project runs in its own `ellar --project <name>` process, so each one boots its own
+application with its own `ELLAR_CONFIG_MODULE`. Output lines are prefixed with the project name.
+"""
+
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+
+from ellar_cli.constants import ELLAR_CONFIG_MODULE
+
+__all__ = ["parse_projects_option", "run_in_projects"]
+
+_PREFIX_COLORS = ("cyan", "magenta", "yellow", "blue", "green", "red")
+
+
+def parse_projects_option(
+    value: t.Optional[str], all_projects: bool, available: t.Iterable[str]
+) -> t.List[str]:
+    """Returns the projects selected with `--projects a,b,c` or `--all-projects`"""
+    available = list(available)
+    if all_projects:
+        return available
+
+    projects = [name.strip() for name in (value or "").split(",") if name.strip()]
+    unknown = [name for name in projects if name not in available]
+    if unknown:
+        raise click.UsageError(
+            f"Unknown project(s): {', '.join(unknown)}. "
+            f"Available projects: {', '.join(available) or 'none'}"
+        )
+    return list(dict.fromkeys(projects))
+
+
+class _ProjectRunner:
+    def __init__(self, args: t.Sequence[str], prefix_width: int) -> None:
+        self.args = list(args)
+        self.prefix_width = prefix_width
+        self._output_lock = threading.Lock()
+
+    def _pump(self, stream: t.IO[str], prefix: str, err: bool) -> None:
+        for line in iter(stream.readline, ""):
+            with self._output_lock:
+                click.echo(f"{prefix} {line.rstrip(os.linesep)}", err=err)
+        stream.close()
+
+    def run(self, project: str, color: str) -> t.Tuple[int, float]:
+        env = dict(os.environ)
+        # the config module of one project must not leak into another
+        env.pop(ELLAR_CONFIG_MODULE, None)
+        env["PYTHONUNBUFFERED"] = "1"
+
+        prefix = click.style(f"[{project}]".ljust(self.prefix_width), fg=color)
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "ellar_cli.cli", "--project", project, *self.args],
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        assert process.stdout and process.stderr
+
+        stderr_pump = threading.Thread(
+            target=self._pump, args=(process.stderr, prefix, True), daemon=True
+        )
+        stderr_pump.start()
+        self._pump(process.stdout, prefix, False)
+        stderr_pump.join()
+
+        return process.wait(), time.perf_counter() - start
+
+
+def _exit_status(exit_code: int) -> int:
+    """Exit code of a run as a shell reports it: 128 + N for a process killed by signal N"""
+    return 128 - exit_code if exit_code < 0 else exit_code
+
+
+def _describe_failure(exit_code: int) -> str:
+    if exit_code < 0:
+        try:
+            return f"killed by {signal.Signals(-exit_code).name}"
+        except ValueError:  # pragma: no cover
+            return f"killed by signal {-exit_code}"
+    return f"failed ({exit_code})"
+
+
+def run_in_projects(
+    projects: t.Sequence[str], args: t.Sequence[str], jobs: t.Optional[int] = None
+) -> int:
+    """
+    Runs `ellar --project <project> *args` for every project, at most `jobs` at once.
+    Returns the highest exit code of all the runs, 128 + N for a run killed by signal N.
+    """
+    runner = _ProjectRunner(args, prefix_width=max(len(name) for name in projects) + 2)
+    max_workers = max(1, min(jobs or os.cpu_count() or 1, len(projects)))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                runner.run, project, _PREFIX_COLORS[index % len(_PREFIX_COLORS)]
+            )
+            for index, project in enumerate(projects)
+        ]
+        results = [future.result() for future in futures]
+
+    click.echo("", err=True)
+    for project, (exit_code, duration) in zip(projects, results):
+        status = (
+            click.style("ok", fg="green")
+            if exit_code == 0
+            else click.style(_describe_failure(exit_code), fg="red")
+        )
+        click.echo(
+            f"{project:<{runner.prefix_width}} {status} {duration:.2f}s", err=True
+        )
+
+    return max(_exit_status(exit_code) for exit_code, _ in results)
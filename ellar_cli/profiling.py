@@ -0,0 +1,231 @@
+"""
+Startup profiling helpers.
+
+Running this module (`python -X importtime -m ellar_cli.profiling`) boots an Ellar project
+phase by phase and prints the duration of each phase as JSON on the last line of stdout.
+
+`ellar --timings` records the phases of a regular CLI invocation through `cli_phase`,
+which does nothing unless timings were started with `start_cli_timings`.
+"""
+
+import contextlib
+import json
+import os
+import re
+import sys
+import time
+import typing as t
+
+import click
+
+__all__ = [
+    "PhaseTimings",
+    "ImportNode",
+    "cli_phase",
+    "cli_timed_context",
+    "format_phases",
+    "get_cli_timings",
+    "parse_importtime",
+    "run_startup_phases",
+    "start_cli_timings",
+]
+
+_T = t.TypeVar("_T")
+
+PHASES_OUTPUT_PREFIX = "ELLAR_STARTUP_PHASES="
+
+_IMPORT_TIME_LINE = re.compile(
+    r"^import time:\s+(?P<self>\d+)\s+\|\s+(?P<cumulative>\d+)\s+\|(?P<indent>\s*)(?P<name>\S+)\s*$"
+)
+
+
+class PhaseTimings:
+    """Records how long named phases of a CLI invocation took, in the order they finished."""
+
+    def __init__(self) -> None:
+        self._started_at = time.perf_counter()
+        self.phases: t.List[t.Dict[str, t.Any]] = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> t.Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.phases.append(
+                {
+                    "name": name,
+                    "start_ms": round((start - self._started_at) * 1000, 3),
+                    "duration_ms": round((end - start) * 1000, 3),
+                }
+            )
+
+    def to_list(self) -> t.List[t.Dict[str, t.Any]]:
+        return list(self.phases)
+
+    @property
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self._started_at) * 1000, 3)
+
+
+_cli_timings: t.Optional[PhaseTimings] = None
+_active_cli_phases: t.Set[str] = set()
+
+
+def start_cli_timings() -> PhaseTimings:
+    """Starts recording the phases of the current CLI invocation"""
+    global _cli_timings
+    _cli_timings = PhaseTimings()
+    return _cli_timings
+
+
+def get_cli_timings() -> t.Optional[PhaseTimings]:
+    return _cli_timings
+
+
+@contextlib.contextmanager
+def cli_phase(name: str) -> t.Iterator[None]:
+    """
+    Records `name` in the CLI invocation timings, if they were started.
+    A phase entered again while it's running, like a command callback wrapped twice, is recorded once.
+    """
+    if _cli_timings is None or name in _active_cli_phases:
+        yield
+        return
+
+    _active_cli_phases.add(name)
+    try:
+        with _cli_timings.phase(name):
+            yield
+    finally:
+        _active_cli_phases.discard(name)
+
+
+@contextlib.contextmanager
+def cli_timed_context(
+    context_manager: t.ContextManager[_T], enter_phase: str, exit_phase: str
+) -> t.Iterator[_T]:
+    """Enters `context_manager`, recording its enter and exit as separate phases"""
+    with cli_phase(enter_phase):
+        value = context_manager.__enter__()
+    try:
+        yield value
+    except BaseException:
+        with cli_phase(exit_phase):
+            if not context_manager.__exit__(*sys.exc_info()):
+                raise
+    else:
+        with cli_phase(exit_phase):
+            context_manager.__exit__(None, None, None)
+
+
+def format_phases(phases: t.List[t.Dict[str, t.Any]], total_ms: float) -> str:
+    """Formats phases as a table, in the order they started"""
+    lines = [f"{'start ms':>10} {'total ms':>10}  phase"]
+    for phase in sorted(phases, key=lambda item: item["start_ms"]):
+        lines.append(
+            f"{phase['start_ms']:>10.1f} {phase['duration_ms']:>10.1f}  {phase['name']}"
+        )
+    lines.append(f"{'':>10} {total_ms:>10.1f}  total")
+    return "\n".join(lines)
+
+
+class ImportNode(t.NamedTuple):
+    name: str
+    self_us: int
+    cumulative_us: int
+    children: t.List["ImportNode"]
+
+    def to_dict(self) -> t.Dict[str, t.Any]:
+        return {
+            "name": self.name,
+            "self_us": self.self_us,
+            "cumulative_us": self.cumulative_us,
+            "children": [child.to_dict() for child in self.children],
+        }
+
+
+def parse_importtime(output: str) -> t.List[ImportNode]:
+    """
+    Builds the import tree from `python -X importtime` output.
+    A module is reported after the modules it imported, one indentation level deeper.
+    """
+    pending: t.Dict[int, t.List[ImportNode]] = {}
+
+    for line in output.splitlines():
+        match = _IMPORT_TIME_LINE.match(line)
+        if not match:
+            continue
+
+        level = len(match.group("indent")) // 2
+        node = ImportNode(
+            name=match.group("name"),
+            self_us=int(match.group("self")),
+            cumulative_us=int(match.group("cumulative")),
+            children=pending.pop(level + 1, []),
+        )
+        pending.setdefault(level, []).append(node)
+
+    return pending.get(0, [])
+
+
+def run_startup_phases(
+    project: t.Optional[str] = None, application: t.Optional[str] = None
+) -> PhaseTimings:
+    """
+    Boots an Ellar project the way the CLI does, timing each phase.
+    `application` is an application import string used instead of pyproject.toml.
+    """
+    timings = PhaseTimings()
+
+    with timings.phase("import_ellar"):
+        from ellar.app import AppFactory
+        from ellar.core import ModuleSetup
+
+        from ellar_cli.event_loop import enter_async_context
+        from ellar_cli.service import (
+            EllarCLIException,
+            EllarCLIService,
+            EllarCLIServiceWithPyProject,
+        )
+
+    meta_: t.Optional[EllarCLIService]
+    if application:
+        with timings.phase("import_project_meta"):
+            meta_ = EllarCLIServiceWithPyProject(app_import_string=application)
+    else:
+        with timings.phase("import_project_meta"):
+            meta_ = EllarCLIService.import_project_meta(project)
+
+        if not meta_ or not meta_.has_meta:
+            raise EllarCLIException("No available project found.")
+
+        with timings.phase("import_root_module"):
+            root_module = meta_.import_root_module()
+
+        with timings.phase("read_all_module"):
+            AppFactory.read_all_module(ModuleSetup(root_module))
+
+    with timings.phase("import_application"):
+        meta_.import_application()
+
+    with contextlib.ExitStack() as stack:
+        with timings.phase("injector_context"):
+            stack.enter_context(enter_async_context(meta_.get_application_context()))
+    return timings
+
+
+@click.command(name="profiling")
+@click.option("--project", default=None)
+@click.option("--application", default=None)
+def main(project: t.Optional[str], application: t.Optional[str]) -> None:
+    if os.getcwd() not in sys.path:
+        sys.path.append(os.getcwd())
+
+    timings = run_startup_phases(project, application)
+    click.echo(PHASES_OUTPUT_PREFIX + json.dumps(timings.to_list()))
+
+
+if __name__ == "__main__":  # pragma: no cover
+    main()
@@ -4,6 +4,7 @@ from ellar.app import App
 from ellar.common.compatible import AttributeDict
 from ellar.common.serializer import Serializer
 from ellar.core import ModuleBase
+from ellar.di import ModuleTreeManager
 from ellar.pydantic import Field
 
 
@@ -12,6 +13,7 @@ class MetadataStore(AttributeDict):
     config_instance: t.Optional[App]
     is_app_reference_callable: bool
     root_module: t.Type[ModuleBase]
+    module_tree: t.Optional[ModuleTreeManager]
 
     def __missing__(self, name) -> None:
         return None
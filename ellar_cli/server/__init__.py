@@ -0,0 +1,24 @@
+"""
+Serving of Ellar applications by `ellar runserver` with features uvicorn has no support for.
+Imported only when one of them is requested.
+"""
+
+from .hooks import CPUAffinityHook, WorkerHook
+from .looplag import LoopLagHook, LoopLagMonitor
+from .profiler import SamplingProfilerHook, StackSampler
+from .stats import StatsTable, WorkerStats
+from .supervisor import PreforkSupervisor
+from .worker import Worker
+
+__all__ = [
+    "CPUAffinityHook",
+    "LoopLagHook",
+    "LoopLagMonitor",
+    "PreforkSupervisor",
+    "SamplingProfilerHook",
+    "StackSampler",
+    "StatsTable",
+    "Worker",
+    "WorkerHook",
+    "WorkerStats",
+]
@@ -0,0 +1,99 @@
+import math
+import os
+import typing as t
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def _read_first_line(path: str) -> t.Optional[str]:
+    try:
+        with open(path) as file:
+            return file.readline().strip()
+    except OSError:
+        return None
+
+
+def _read_proc_cgroups(path: str) -> t.List[t.Tuple[t.List[str], str]]:
+    """
+    Controllers and path of the cgroups of this process in each hierarchy, from a
+    `/proc/<pid>/cgroup` file. The controllers are empty for cgroup v2.
+    """
+    try:
+        with open(path) as file:
+            lines = file.read().splitlines()
+    except OSError:
+        return []
+
+    cgroups = []
+    for line in lines:
+        if line.count(":") < 2:
+            continue
+        _, controllers, cgroup = line.split(":", 2)
+        cgroups.append(([name for name in controllers.split(",") if name], cgroup))
+    return cgroups
+
+
+def _cgroup_dirs(root: str, cgroup: str) -> t.List[str]:
+    """
+    Directory of `cgroup` in the hierarchy mounted at `root`, then of its ancestors.
+    In a container, the cgroup of the process is often mounted as `root` itself.
+    """
+    parts = [part for part in cgroup.split("/") if part]
+    return [os.path.join(root, *parts[:index]) for index in range(len(parts), -1, -1)]
+
+
+def _cgroup_v2_quota(directory: str) -> t.Optional[float]:
+    # "<quota> <period>" or "max <period>"
+    line = _read_first_line(os.path.join(directory, "cpu.max"))
+    if not line:
+        return None
+    quota, _, period = line.partition(" ")
+    if quota == "max" or not period:
+        return None
+    return int(quota) / int(period)
+
+
+def _cgroup_v1_quota(directory: str) -> t.Optional[float]:
+    quota = _read_first_line(os.path.join(directory, "cpu.cfs_quota_us"))
+    period = _read_first_line(os.path.join(directory, "cpu.cfs_period_us"))
+    if not quota or not period or int(quota) <= 0:
+        return None
+    return int(quota) / int(period)
+
+
+def get_cgroup_cpu_quota(
+    root: str = CGROUP_ROOT, proc_cgroup: str = "/proc/self/cgroup"
+) -> t.Optional[float]:
+    """
+    CPUs the cgroup of this process may use, e.g. 1.5 for a quota of 150ms per 100ms period.
+    The smallest quota of the cgroup and its ancestors applies, with cgroup v2 or v1.
+    None when there is no quota.
+    """
+    quotas: t.List[t.Optional[float]] = []
+    for controllers, cgroup in _read_proc_cgroups(proc_cgroup):
+        if not controllers:
+            quotas.extend(map(_cgroup_v2_quota, _cgroup_dirs(root, cgroup)))
+        elif "cpu" in controllers:
+            for mount in ("cpu", "cpu,cpuacct", "cpuacct,cpu"):
+                mount_root = os.path.join(root, mount)
+                quotas.extend(map(_cgroup_v1_quota, _cgroup_dirs(mount_root, cgroup)))
+
+    limits = [quota for quota in quotas if quota is not None]
+    return min(limits) if limits else None
+
+
+def get_available_cpus() -> t.List[int]:
+    """CPUs this process may run on, as set by `taskset`, cpusets..."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))  # pragma: no cover
+
+
+def get_auto_workers_count(
+    available_cpus: t.Sequence[int], cpu_quota: t.Optional[float]
+) -> int:
+    """One worker per CPU this process can actually use, at least one"""
+    count = len(available_cpus)
+    if cpu_quota is not None:
+        count = min(count, math.ceil(cpu_quota))
+    return max(1, count)
@@ -0,0 +1,37 @@
+import os
+import typing as t
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from uvicorn import Server
+
+    from .supervisor import PreforkSupervisor
+    from .worker import Worker
+
+
+class WorkerHook:
+    """
+    Extension point of `PreforkSupervisor`. Subclasses override the methods they need.
+    Unless noted otherwise, methods are called in the worker process.
+    """
+
+    def before_fork(self, supervisor: "PreforkSupervisor") -> None:
+        """Called in the supervisor once, before the first worker is forked"""
+
+    def worker_init(self, worker: "Worker") -> None:
+        """Called right after the fork, before the server of the worker starts"""
+
+    def worker_started(self, worker: "Worker", server: "Server") -> None:
+        """Called in the event loop of the worker once its server started"""
+
+    def worker_exit(self, worker: "Worker", server: "Server") -> None:
+        """Called after the server of the worker stopped"""
+
+
+class CPUAffinityHook(WorkerHook):
+    """Pins each worker to its own CPU. The worker in slot `i` runs on `cpus[i]`"""
+
+    def __init__(self, cpus: t.Sequence[int]) -> None:
+        self.cpus = list(cpus)
+
+    def worker_init(self, worker: "Worker") -> None:
+        os.sched_setaffinity(0, {self.cpus[worker.index % len(self.cpus)]})
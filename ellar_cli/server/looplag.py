@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+import typing as t
+
+from ellar_cli.benchmarking import LatencyHistogram
+
+from .hooks import WorkerHook
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from uvicorn import Server
+
+    from .worker import Worker
+
+logger = logging.getLogger("uvicorn.error")
+
+#: percentiles of the event loop lag reported by `LoopLagMonitor`
+LAG_PERCENTILES = (50.0, 90.0, 99.0, 99.9, 100.0)
+
+
+class LoopLagMonitor:
+    """
+    Measures the lag of an event loop: how late it runs a callback scheduled every
+    `interval` seconds. While the loop is blocked for longer than `threshold` seconds, a
+    watchdog thread logs the stack of the code blocking it.
+
+    Lags are recorded in microseconds in `histogram` until the next `report`.
+    """
+
+    def __init__(
+        self, threshold: float, interval: t.Optional[float] = None, name: str = ""
+    ) -> None:
+        self.threshold = threshold
+        # often enough to measure stalls shorter than the threshold
+        self.interval = interval or max(min(threshold / 2, 0.1), 0.001)
+        self.name = name or "worker"
+        self.histogram = LatencyHistogram()
+        self.stalls = 0
+        self.last_lag = 0.0
+        self._loop: t.Optional[asyncio.AbstractEventLoop] = None
+        self._handle: t.Optional[asyncio.TimerHandle] = None
+        self._loop_thread_id: t.Optional[int] = None
+        self._last_beat = 0.0
+        self._stopped = threading.Event()
+        self._watchdog: t.Optional[threading.Thread] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Starts monitoring `loop`. Called from the thread running it."""
+        self._loop = loop
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._schedule()
+        self._watchdog = threading.Thread(
+            target=self._watch, name="ellar-loop-lag-watchdog", daemon=True
+        )
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+        if self._watchdog is not None:
+            self._watchdog.join()
+
+    def _schedule(self) -> None:
+        assert self._loop is not None
+        expected = self._loop.time() + self.interval
+        self._handle = self._loop.call_at(expected, self._probe, expected)
+
+    def _probe(self, expected: float) -> None:
+        assert self._loop is not None
+        lag = max(self._loop.time() - expected, 0.0)
+        self._last_beat = time.monotonic()
+        self.last_lag = lag
+        self.histogram.record(lag * 1_000_000)
+        if lag > self.threshold:
+            self.stalls += 1
+            logger.warning(
+                "Event loop of %s was blocked for %.1fms", self.name, lag * 1000
+            )
+        if not self._stopped.is_set():
+            self._schedule()
+
+    def _watch(self) -> None:
+        reported_beat = 0.0
+        # the watchdog takes the GIL from the loop thread whenever it wakes up
+        period = max(self.threshold / 2, 0.005)
+        while not self._stopped.wait(period):
+            beat = self._last_beat
+            blocked = time.monotonic() - beat - self.interval
+            if blocked <= self.threshold or beat == reported_beat:
+                continue
+            # once per stall, while the blocking code runs
+            reported_beat = beat
+            frame = sys._current_frames().get(t.cast(int, self._loop_thread_id))
+            if frame is None:  # pragma: no cover
+                continue
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning(
+                "Event loop of %s blocked for more than %.0fms, in:\n%s",
+                self.name,
+                self.threshold * 1000,
+                stack.rstrip(),
+            )
+
+    def report(self) -> None:
+        """Logs the lag percentiles since the last report, and starts over"""
+        histogram, self.histogram = self.histogram, LatencyHistogram()
+        if not histogram.total_count:
+            return
+        percentiles = ", ".join(
+            f"p{p:g} {histogram.value_at_percentile(p) / 1000:.1f}ms"
+            for p in LAG_PERCENTILES
+        )
+        logger.info(
+            "Event loop lag of %s over %d probes: %s, %d stall(s) over %.0fms",
+            self.name,
+            histogram.total_count,
+            percentiles,
+            self.stalls,
+            self.threshold * 1000,
+        )
+        self.stalls = 0
+
+
+class LoopLagHook(WorkerHook):
+    """
+    Monitors the event loop of every worker with a `LoopLagMonitor`. Stalls longer than
+    `threshold` seconds are logged with the stack of the blocking code, and the lag
+    percentiles are logged every `report_interval` seconds and when the worker stops.
+    """
+
+    def __init__(self, threshold: float, report_interval: float = 60.0) -> None:
+        self.threshold = threshold
+        self.report_interval = report_interval
+        self.monitor: t.Optional[LoopLagMonitor] = None
+        self._reporter: t.Optional[asyncio.TimerHandle] = None
+
+    def worker_started(self, worker: "Worker", server: "Server") -> None:
+        loop = asyncio.get_running_loop()
+        self.monitor = LoopLagMonitor(
+            self.threshold, name=f"worker {worker.index} [{worker.pid}]"
+        )
+        self.monitor.start(loop)
+        self._schedule_report(loop)
+
+    def _schedule_report(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._reporter = loop.call_later(self.report_interval, self._report, loop)
+
+    def _report(self, loop: asyncio.AbstractEventLoop) -> None:
+        assert self.monitor is not None
+        self.monitor.report()
+        self._schedule_report(loop)
+
+    def worker_exit(self, worker: "Worker", server: "Server") -> None:
+        if self._reporter is not None:
+            self._reporter.cancel()
+        if self.monitor is not None:
+            self.monitor.stop()
+            self.monitor.report()
@@ -0,0 +1,13 @@
+import os
+import typing as t
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def get_rss(pid: int) -> t.Optional[int]:
+    """Resident set size of process `pid` in bytes. None when it can't be read."""
+    try:
+        with open(f"/proc/{pid}/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
@@ -0,0 +1,136 @@
+import concurrent.futures.thread
+import logging
+import os
+import selectors
+import signal
+import sys
+import threading
+import types
+import typing as t
+
+from .hooks import WorkerHook
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from uvicorn import Server
+
+    from .worker import Worker
+
+logger = logging.getLogger("uvicorn.error")
+
+# innermost functions of threads waiting for work. Their samples would only show idle time
+_IDLE_CODES = frozenset(
+    [
+        threading.Condition.wait.__code__,
+        concurrent.futures.thread._worker.__code__,
+    ]
+    + [
+        selector.select.__code__
+        for selector in vars(selectors).values()
+        if isinstance(selector, type)
+        and issubclass(selector, selectors.BaseSelector)
+        and isinstance(getattr(selector, "select", None), types.FunctionType)
+    ]
+)
+
+
+def _code_label(code: types.CodeType) -> str:
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Statistical profiler. Every `interval` seconds of CPU time used by the process, a
+    SIGPROF handler records the stack of every thread that isn't waiting for work.
+    Samples are written as collapsed stacks, the input of flame graph tools.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.samples: t.Dict[t.Tuple[types.CodeType, ...], int] = {}
+        self._main_thread_id = threading.main_thread().ident
+        self._previous_handler: t.Any = None
+
+    def start(self) -> None:
+        self._previous_handler = signal.signal(signal.SIGPROF, self._sample)
+        # system calls interrupted by a sample are resumed
+        signal.siginterrupt(signal.SIGPROF, False)
+        signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+
+    def stop(self) -> None:
+        signal.setitimer(signal.ITIMER_PROF, 0, 0)
+        signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+
+    def _sample(self, signum: int, frame: t.Optional[types.FrameType]) -> None:
+        samples = self.samples
+        for thread_id, thread_frame in sys._current_frames().items():
+            if thread_id == self._main_thread_id:
+                # the current frame of the main thread is this handler
+                thread_frame = frame  # type: ignore[assignment]
+            if thread_frame is None or thread_frame.f_code in _IDLE_CODES:
+                continue
+            stack = []
+            current: t.Optional[types.FrameType] = thread_frame
+            while current is not None:
+                stack.append(current.f_code)
+                current = current.f_back
+            key = tuple(stack)
+            samples[key] = samples.get(key, 0) + 1
+
+    def dump(self, path: str) -> int:
+        """
+        Writes the samples recorded since the last dump to `path` as collapsed stacks, one
+        `outermost;...;innermost count` line per stack. Returns the number of samples.
+        """
+        # swapped first, samples taken while writing go to the next dump
+        samples, self.samples = self.samples, {}
+        lines: t.Dict[str, int] = {}
+        for stack, count in samples.items():
+            line = ";".join(_code_label(code) for code in reversed(stack))
+            lines[line] = lines.get(line, 0) + count
+
+        with open(path, mode="w") as file:
+            for line, count in sorted(lines.items()):
+                file.write(f"{line} {count}\n")
+        return sum(lines.values())
+
+
+class SamplingProfilerHook(WorkerHook):
+    """
+    Profiles every worker with a `StackSampler` sampling `frequency` times per second of CPU
+    time. Each worker writes its samples to `directory` when it stops, and the samples
+    since the last write on SIGUSR2.
+    """
+
+    def __init__(self, directory: str, frequency: int) -> None:
+        self.directory = os.path.abspath(directory)
+        self.frequency = frequency
+        self._sampler: t.Optional[StackSampler] = None
+        self._dumps = 0
+
+    def before_fork(self, supervisor: t.Any) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+    def worker_init(self, worker: "Worker") -> None:
+        self._sampler = StackSampler(1 / self.frequency)
+        signal.signal(signal.SIGUSR2, lambda *args: self.dump(worker))
+        self._sampler.start()
+
+    def worker_exit(self, worker: "Worker", server: "Server") -> None:
+        if self._sampler is not None:
+            self._sampler.stop()
+            self.dump(worker)
+
+    def dump(self, worker: "Worker") -> None:
+        assert self._sampler is not None
+        self._dumps += 1
+        path = os.path.join(
+            self.directory,
+            f"worker-{worker.index}-{worker.pid}-{self._dumps}.collapsed",
+        )
+        try:
+            count = self._sampler.dump(path)
+        except OSError as ex:
+            logger.error("Can't write the profile of worker %d: %s", worker.index, ex)
+        else:
+            logger.info("Wrote %d stack samples to %s", count, path)
@@ -0,0 +1,50 @@
+import logging
+import socket
+import sys
+
+import click
+from uvicorn import Config
+
+from .worker import STARTUP_FAILURE
+
+logger = logging.getLogger("uvicorn.error")
+
+
+def bind_reuse_port_socket(config: Config, log: bool = False) -> socket.socket:
+    """
+    Binds a socket to `config.host` and `config.port` with SO_REUSEPORT, so that every
+    worker can listen on its own socket and the kernel balances connections between them.
+    Exits like `uvicorn.Config.bind_socket` when the address can't be bound.
+    """
+    family = socket.AF_INET
+    addr_format = "%s://%s:%d"
+    if config.host and ":" in config.host:
+        family = socket.AF_INET6
+        addr_format = "%s://[%s]:%d"
+
+    sock = socket.socket(family=family)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    try:
+        sock.bind((config.host, config.port))
+    except OSError as exc:
+        sock.close()
+        logger.error(exc)
+        sys.exit(STARTUP_FAILURE)
+
+    if log:
+        message = f"Uvicorn running on {addr_format} (Press CTRL+C to quit)"
+        color_message = (
+            "Uvicorn running on "
+            + click.style(addr_format, bold=True)
+            + " (Press CTRL+C to quit)"
+        )
+        protocol_name = "https" if config.is_ssl else "http"
+        logger.info(
+            message,
+            protocol_name,
+            config.host,
+            config.port,
+            extra={"color_message": color_message},
+        )
+    return sock
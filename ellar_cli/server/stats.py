@@ -0,0 +1,223 @@
+import glob
+import mmap
+import os
+import struct
+import tempfile
+import typing as t
+
+# header: magic, version, rows, pid of the supervisor, start time of the supervisor
+_HEADER_FORMAT = "=8sIIid"
+_HEADER_SIZE = 64
+_MAGIC = b"ELLARTOP"
+_VERSION = 1
+
+# a row per worker process, one cache line: a sequence number, odd while the row is being
+# updated so that readers retry instead of reading a torn row, then the `WorkerStats` fields
+_ROW_SIZE = 64
+_SEQ = struct.Struct("=Q")
+_FIELDS = struct.Struct("=iiIIQQddd")
+# a reader gives up on a row left half written by a killed worker
+_READ_RETRIES = 1000
+
+STATS_FILE_PREFIX = "ellar-stats-"
+
+
+class WorkerStats(t.NamedTuple):
+    row: int
+    pid: int
+    #: `Worker.index` of the worker
+    slot: int
+    #: workers started in this slot before this one
+    restarts: int
+    in_flight: int
+    requests: int
+    rss: int
+    started_at: float
+    #: longest event loop lag in seconds over the last update interval
+    loop_lag: float
+    updated_at: float
+
+
+def get_stats_dir() -> str:
+    """Where stats tables are created: in memory on Linux"""
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def get_stats_path(supervisor_pid: int) -> str:
+    return os.path.join(get_stats_dir(), f"{STATS_FILE_PREFIX}{supervisor_pid}")
+
+
+def _is_running(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def find_stats_files() -> t.Dict[int, str]:
+    """
+    Stats tables of the running supervisors, by pid. A killed supervisor leaves its table
+    behind.
+    """
+    pattern = os.path.join(get_stats_dir(), STATS_FILE_PREFIX + "*")
+    paths = {}
+    for path in sorted(glob.glob(pattern)):
+        pid = path[len(pattern) - 1 :]
+        if pid.isdigit() and _is_running(int(pid)):
+            paths[int(pid)] = path
+    return paths
+
+
+class StatsTable:
+    """
+    Per-worker statistics of a `PreforkSupervisor`, in a memory-mapped file shared with its
+    workers and read by `ellar top`.
+
+    Each row has a single writer at a time, so no lock is taken: the worker using the row
+    updates it, and the supervisor assigns it before the worker starts and clears it once
+    the worker exited.
+    """
+
+    def __init__(self, path: str, buffer: mmap.mmap) -> None:
+        self.path = path
+        self._buffer = buffer
+        magic, version, rows, pid, started_at = struct.unpack_from(
+            _HEADER_FORMAT, buffer
+        )
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a worker stats table")
+        self.rows = rows
+        self.supervisor_pid = pid
+        self.started_at = started_at
+
+    @classmethod
+    def create(
+        cls, path: str, rows: int, supervisor_pid: int, started_at: float
+    ) -> "StatsTable":
+        """
+        Creates the table at `path`, only readable by the current user. The path is
+        predictable, in a directory shared with other users, so a file left there by a killed
+        supervisor is removed only if it's ours, and a new file is always created rather than
+        opening one, or a symlink, another user put there.
+        """
+        try:
+            if os.lstat(path).st_uid == os.getuid():
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+        fd = os.open(
+            path,
+            os.O_RDWR | os.O_CREAT | os.O_EXCL | getattr(os, "O_NOFOLLOW", 0),
+            0o600,
+        )
+        try:
+            size = _HEADER_SIZE + rows * _ROW_SIZE
+            os.ftruncate(fd, size)
+            buffer = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        struct.pack_into(
+            _HEADER_FORMAT,
+            buffer,
+            0,
+            _MAGIC,
+            _VERSION,
+            rows,
+            supervisor_pid,
+            started_at,
+        )
+        return cls(path, buffer)
+
+    @classmethod
+    def open(cls, path: str) -> "StatsTable":
+        """Opens the table at `path` to read it"""
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(path, buffer)
+        except (ValueError, struct.error):
+            buffer.close()
+            raise
+
+    def _offset(self, row: int) -> int:
+        return _HEADER_SIZE + row * _ROW_SIZE
+
+    def write(self, row: int, **values: t.Any) -> None:
+        """Updates fields of `row`, like `write(0, requests=10, in_flight=2)`"""
+        offset = self._offset(row)
+        # odd already when the previous writer was killed while writing
+        seq = _SEQ.unpack_from(self._buffer, offset)[0] | 1
+        _SEQ.pack_into(self._buffer, offset, seq)
+        fields = WorkerStats(row, *_FIELDS.unpack_from(self._buffer, offset + 8))
+        fields = fields._replace(**values)
+        _FIELDS.pack_into(self._buffer, offset + 8, *fields[1:])
+        _SEQ.pack_into(self._buffer, offset, seq + 1)
+
+    def clear(self, row: int) -> None:
+        self.write(row, **dict.fromkeys(WorkerStats._fields[1:], 0))
+
+    def read(self, row: int) -> WorkerStats:
+        offset = self._offset(row)
+        for _ in range(_READ_RETRIES):
+            seq = _SEQ.unpack_from(self._buffer, offset)[0]
+            fields = _FIELDS.unpack_from(self._buffer, offset + 8)
+            if not seq % 2 and _SEQ.unpack_from(self._buffer, offset)[0] == seq:
+                break
+        return WorkerStats(row, *fields)
+
+    def workers(self) -> t.List[WorkerStats]:
+        """Rows in use, by slot"""
+        rows = (self.read(row) for row in range(self.rows))
+        return sorted(
+            (stats for stats in rows if stats.pid),
+            key=lambda stats: (stats.slot, stats.started_at),
+        )
+
+    def close(self) -> None:
+        self._buffer.close()
+
+
+_PROMETHEUS_METRICS = (
+    ("requests_total", "counter", "Requests served by the worker.", "requests"),
+    ("in_flight_requests", "gauge", "Requests being served.", "in_flight"),
+    ("resident_memory_bytes", "gauge", "Resident set size.", "rss"),
+    (
+        "event_loop_lag_seconds",
+        "gauge",
+        "Longest event loop lag over the last second.",
+        "loop_lag",
+    ),
+    ("restarts_total", "counter", "Workers replaced in this slot.", "restarts"),
+    (
+        "start_time_seconds",
+        "gauge",
+        "Start time of the worker since the epoch.",
+        "started_at",
+    ),
+)
+
+
+def format_prometheus(workers: t.Sequence[WorkerStats]) -> str:
+    """The stats of `workers` in the Prometheus text exposition format"""
+    lines = []
+    for name, kind, help_text, field in _PROMETHEUS_METRICS:
+        lines.append(f"# HELP ellar_worker_{name} {help_text}")
+        lines.append(f"# TYPE ellar_worker_{name} {kind}")
+        for stats in workers:
+            labels = f'worker="{stats.slot}",pid="{stats.pid}"'
+            lines.append(f"ellar_worker_{name}{{{labels}}} {getattr(stats, field)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_textfile(path: str, workers: t.Sequence[WorkerStats]) -> None:
+    """
+    Writes the stats of `workers` to `path` for the textfile collector of node exporter,
+    atomically so that it never reads a partial file.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, mode="w") as file:
+        file.write(format_prometheus(workers))
+    os.replace(temp_path, path)
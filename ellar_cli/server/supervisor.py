@@ -0,0 +1,562 @@
+import errno
+import gc
+import logging
+import os
+import select
+import signal
+import socket
+import struct
+import time
+import typing as t
+
+import click
+from uvicorn import Config
+
+from .hooks import WorkerHook
+from .memory import get_rss
+from .sockets import bind_reuse_port_socket
+from .stats import StatsTable, get_stats_path
+from .worker import (
+    NOTIFY_FORMAT,
+    NOTIFY_READY,
+    NOTIFY_RECYCLE,
+    STARTUP_FAILURE,
+    Worker,
+    run_worker,
+)
+
+logger = logging.getLogger("uvicorn.error")
+
+_HANDLED_SIGNALS = (
+    signal.SIGINT,
+    signal.SIGTERM,
+    signal.SIGHUP,
+    signal.SIGUSR2,
+    signal.SIGCHLD,
+)
+
+# seconds to wait for workers to stop, on top of `--timeout-graceful-shutdown`
+_STOP_TIMEOUT_MARGIN = 5.0
+# workers exiting within this many seconds of their start are replaced after a delay,
+# doubled at each such exit in a row of the slot up to `_MAX_RESPAWN_DELAY`
+_CRASH_WINDOW = 10.0
+_RESPAWN_DELAY = 0.5
+_MAX_RESPAWN_DELAY = 30.0
+
+
+def _exit_code(status: int) -> int:
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+class PreforkSupervisor:
+    """
+    Serves an application with `workers` forked worker processes. An application given as an
+    import string is imported by each worker, otherwise it is built in this process.
+
+    Unlike uvicorn's multiprocess supervisor, which spawns workers that import the application
+    again, workers are forked after a built application, so they share its memory
+    copy-on-write. With `gc_freeze`, objects created before the fork are moved to the
+    permanent generation of the gc, so that collections in workers don't write to the shared
+    pages.
+
+    With `reuse_port`, each worker listens on its own SO_REUSEPORT socket instead of all of
+    them accepting from one shared socket, so the kernel balances connections between workers.
+
+    Dead workers are replaced, with an increasing delay when they keep exiting shortly after
+    they started. Workers are also replaced without downtime, one at a time: a new
+    worker is started, and the worker it replaces is stopped gracefully once the new one is
+    ready. This happens to every worker on SIGHUP, to workers whose RSS exceeds `max_rss`
+    bytes (checked every `rss_check_interval` seconds) and to workers that served
+    `config.limit_max_requests` requests, plus up to `max_requests_jitter` so that they don't
+    all reach it together. A new worker that isn't ready after `boot_timeout` seconds is
+    killed, and the workers in place keep serving.
+
+    The supervisor stops on SIGINT and SIGTERM, after its workers. SIGUSR2 is forwarded to the
+    workers, which ignore it unless a hook handles it.
+
+    Workers publish their statistics in a `StatsTable` at `stats_path`, by default named after
+    the pid of the supervisor, which `ellar top` reads.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        workers: int,
+        gc_freeze: bool = False,
+        hooks: t.Sequence[WorkerHook] = (),
+        reuse_port: bool = False,
+        max_rss: t.Optional[int] = None,
+        rss_check_interval: float = 5.0,
+        max_requests_jitter: int = 0,
+        stats_path: t.Optional[str] = None,
+        boot_timeout: float = 60.0,
+    ) -> None:
+        self.config = config
+        self.workers_count = workers
+        self.gc_freeze = gc_freeze
+        self.reuse_port = reuse_port
+        self.max_rss = max_rss
+        self.rss_check_interval = rss_check_interval
+        self.max_requests_jitter = max_requests_jitter
+        self.hooks = list(hooks)
+        self.stats_path = stats_path
+        self.boot_timeout = boot_timeout
+        self.stats: t.Optional[StatsTable] = None
+        # workers started in each slot
+        self._spawned: t.Dict[int, int] = {}
+        # exits in a row of workers shortly after their start by slot, and when to replace
+        # them
+        self._crashes: t.Dict[int, int] = {}
+        self._respawn_at: t.Dict[int, float] = {}
+        self.sockets: t.List[socket.socket] = []
+        self.workers: t.Dict[int, Worker] = {}
+        self.should_exit = False
+        self.exit_code = 0
+        self._signal_queue: t.List[int] = []
+        self._wakeup_read_fd = self._wakeup_write_fd = -1
+        self._notify_read_fd = self._notify_write_fd = -1
+
+        # replacements without downtime: workers left to replace and why, the worker
+        # booting to replace the current one, and the replaced worker until it stops.
+        # The deadline is the one of the replacement to boot, then of the replaced to stop
+        self._to_replace: t.List[t.Tuple[Worker, str]] = []
+        self._replacement: t.Optional[Worker] = None
+        self._replaced: t.Optional[Worker] = None
+        self._replace_deadline = 0.0
+        self._rolling_restart = False
+        self._next_rss_check = 0.0
+
+    @property
+    def stop_timeout(self) -> float:
+        """Seconds a worker is given to stop gracefully before it is killed"""
+        return (self.config.timeout_graceful_shutdown or 30) + _STOP_TIMEOUT_MARGIN
+
+    def run(self) -> int:
+        """Serves until stopped. Returns the exit code of the supervisor."""
+        if not isinstance(self.config.app, str) and not self.config.loaded:
+            # an import string is imported by each worker after the fork, like uvicorn does
+            self.config.load()
+        if self.reuse_port:
+            # checks the address is available. Workers bind their own socket
+            bind_reuse_port_socket(self.config, log=True).close()
+        else:
+            self.sockets = [self.config.bind_socket()]
+
+        message = "Started parent process [%d]"
+        color_message = (
+            "Started parent process [" + click.style("%d", fg="cyan", bold=True) + "]"
+        )
+        logger.info(message, os.getpid(), extra={"color_message": color_message})
+
+        self._install_signal_handlers()
+        try:
+            self._create_stats_table()
+            for hook in self.hooks:
+                hook.before_fork(self)
+
+            if self.gc_freeze:
+                gc.collect()
+                gc.freeze()
+
+            for index in range(self.workers_count):
+                self.spawn_worker(Worker(index))
+
+            while not self.should_exit:
+                self._wait(timeout=self._next_tick_timeout())
+                self.handle_signals()
+                self.reap_workers()
+                self._respawn_workers()
+                self._check_rss()
+                self._step_replacements()
+                self.on_tick()
+
+            self.stop_workers()
+        finally:
+            self._restore_signal_handlers()
+            self._remove_stats_table()
+            for sock in self.sockets:
+                sock.close()
+            if self.config.uds and os.path.exists(self.config.uds):
+                os.remove(self.config.uds)
+
+        message = "Stopping parent process [%d]"
+        color_message = (
+            "Stopping parent process [" + click.style("%d", fg="cyan", bold=True) + "]"
+        )
+        logger.info(message, os.getpid(), extra={"color_message": color_message})
+        return self.exit_code
+
+    def _create_stats_table(self) -> None:
+        path = self.stats_path or get_stats_path(os.getpid())
+        try:
+            # a replacement runs next to the worker it replaces
+            self.stats = StatsTable.create(
+                path, 2 * self.workers_count, os.getpid(), time.time()
+            )
+        except OSError as ex:
+            logger.warning("Can't create the worker stats table %s: %s", path, ex)
+            return
+        logger.info("Worker stats in %s, see `ellar top`", path)
+
+    def _remove_stats_table(self) -> None:
+        if self.stats is None:
+            return
+        self.stats.close()
+        try:
+            os.remove(self.stats.path)
+        except OSError:  # pragma: no cover
+            pass
+        self.stats = None
+
+    def _assign_stats_row(self, worker: Worker) -> None:
+        restarts = self._spawned.get(worker.index, 0)
+        self._spawned[worker.index] = restarts + 1
+        if self.stats is None:
+            return
+        in_use = {other.stats_row for other in self.workers.values()}
+        for row in range(self.stats.rows):
+            if row not in in_use:
+                worker.stats_row = row
+                self.stats.clear(row)
+                self.stats.write(row, slot=worker.index, restarts=restarts)
+                return
+
+    def spawn_worker(self, worker: Worker) -> Worker:
+        self._assign_stats_row(worker)
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            for fd in (
+                self._wakeup_read_fd,
+                self._wakeup_write_fd,
+                self._notify_read_fd,
+            ):
+                os.close(fd)
+            run_worker(
+                worker,
+                self.config,
+                self.sockets,
+                self.hooks,
+                reuse_port=self.reuse_port,
+                notify_fd=self._notify_write_fd,
+                max_requests_jitter=self.max_requests_jitter,
+                stats=self.stats,
+            )
+
+        worker.pid = pid
+        worker.started_at = time.time()
+        self.workers[pid] = worker
+        logger.info("Booted worker %d [%d]", worker.index, pid)
+        return worker
+
+    def on_tick(self) -> None:
+        """Called about once per second, and after every signal"""
+
+    def on_worker_ready(self, worker: Worker) -> None:
+        """Called when the lifespan startup of `worker` completed"""
+
+    def reap_workers(self) -> None:
+        """Collects exited workers and replaces them"""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if not pid:
+                return
+
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            if self.stats is not None and worker.stats_row >= 0:
+                self.stats.clear(worker.stats_row)
+
+            exit_code = _exit_code(status)
+            self.on_worker_exited(worker, exit_code)
+
+    def on_worker_exited(self, worker: Worker, exit_code: int) -> None:
+        if self.should_exit:
+            return
+
+        if worker.retiring:
+            logger.info("Worker %d [%d] stopped", worker.index, worker.pid)
+            return
+
+        if worker is self._replacement:
+            # the workers in place keep serving
+            logger.error(
+                "Worker %d [%d] failed to boot, replacement of workers aborted.",
+                worker.index,
+                worker.pid,
+            )
+            self._abort_replacements()
+            return
+
+        if exit_code == STARTUP_FAILURE:
+            # it would fail again, like every other worker
+            logger.error("Worker %d [%d] failed to boot.", worker.index, worker.pid)
+            self.exit_code = STARTUP_FAILURE
+            self.should_exit = True
+            return
+
+        if worker is self._replaced:
+            # the worker booting to replace it takes its slot
+            self._replaced = None
+            return
+
+        crashes = 0
+        if time.time() - worker.started_at < _CRASH_WINDOW:
+            crashes = self._crashes.get(worker.index, 0) + 1
+        self._crashes[worker.index] = crashes
+        if crashes <= 1:
+            logger.info(
+                "Worker %d [%d] exited with code %d, replacing it",
+                worker.index,
+                worker.pid,
+                exit_code,
+            )
+            self.spawn_worker(Worker(worker.index))
+            return
+
+        delay = min(_RESPAWN_DELAY * 2 ** (crashes - 2), _MAX_RESPAWN_DELAY)
+        logger.warning(
+            "Worker %d [%d] exited with code %d, %d times in a row after it started,"
+            " replacing it in %gs",
+            worker.index,
+            worker.pid,
+            exit_code,
+            crashes,
+            delay,
+        )
+        self._respawn_at[worker.index] = time.monotonic() + delay
+
+    def _respawn_workers(self) -> None:
+        """Replaces the workers whose replacement was delayed, once it's time"""
+        now = time.monotonic()
+        for index, respawn_at in sorted(self._respawn_at.items()):
+            if respawn_at <= now and not self.should_exit:
+                del self._respawn_at[index]
+                self.spawn_worker(Worker(index))
+
+    def _next_tick_timeout(self) -> float:
+        if not self._respawn_at:
+            return 1.0
+        next_respawn = min(self._respawn_at.values()) - time.monotonic()
+        return min(max(next_respawn, 0.0), 1.0)
+
+    def retire_worker(self, worker: Worker) -> None:
+        """Stops `worker` gracefully, without replacing it"""
+        worker.retiring = True
+        self._kill(worker.pid, signal.SIGTERM)
+
+    def replace_worker(self, worker: Worker, reason: str) -> None:
+        """
+        Replaces `worker` without downtime: a new worker is started in its slot, and `worker`
+        is stopped gracefully once the new one is ready. Workers are replaced one at a time.
+        """
+        if (
+            worker.retiring
+            or worker is self._replaced
+            or worker is self._replacement
+            or any(queued is worker for queued, _ in self._to_replace)
+        ):
+            return
+        self._to_replace.append((worker, reason))
+
+    def _abort_replacements(self) -> None:
+        self._to_replace.clear()
+        self._replacement = self._replaced = None
+        self._rolling_restart = False
+
+    def start_rolling_restart(self) -> None:
+        if self._rolling_restart:
+            logger.warning("Rolling restart already in progress")
+            return
+
+        self._rolling_restart = True
+        workers = sorted(self.workers.values(), key=lambda worker: worker.index)
+        logger.info("Rolling restart of %d worker(s)", len(workers))
+        for worker in workers:
+            self.replace_worker(worker, "rolling restart")
+
+    def _step_replacements(self) -> None:
+        while self._to_replace or self._replacement or self._replaced:
+            old = self._replaced
+            if old is not None and self._replacement is None:
+                if old.pid not in self.workers:
+                    self._replaced = None
+                elif time.monotonic() > self._replace_deadline:
+                    logger.warning(
+                        "Killing worker [%d], it didn't stop in time", old.pid
+                    )
+                    self._kill(old.pid, signal.SIGKILL)
+                    return
+                else:
+                    # one worker is replaced at a time
+                    return
+
+            new = self._replacement
+            if new is not None:
+                if not new.ready:
+                    if time.monotonic() > self._replace_deadline:
+                        # the workers in place keep serving
+                        logger.error(
+                            "Killing worker %d [%d], it didn't boot in %gs, replacement of"
+                            " workers aborted.",
+                            new.index,
+                            new.pid,
+                            self.boot_timeout,
+                        )
+                        new.retiring = True
+                        self._kill(new.pid, signal.SIGKILL)
+                        self._abort_replacements()
+                        break
+                    return
+                self._replacement = None
+                if old is not None:
+                    self.retire_worker(old)
+                    self._replace_deadline = time.monotonic() + self.stop_timeout
+                continue
+
+            if not self._to_replace:
+                break
+
+            old, reason = self._to_replace.pop(0)
+            if old.pid not in self.workers:
+                # already replaced
+                continue
+            logger.info("Replacing worker %d [%d]: %s", old.index, old.pid, reason)
+            self._replaced = old
+            self._replacement = self.spawn_worker(Worker(old.index))
+            self._replace_deadline = time.monotonic() + self.boot_timeout
+
+        if self._rolling_restart:
+            logger.info("Rolling restart complete")
+            self._rolling_restart = False
+
+    def _check_rss(self) -> None:
+        now = time.monotonic()
+        if self.max_rss is None or now < self._next_rss_check:
+            return
+        self._next_rss_check = now + self.rss_check_interval
+
+        for worker in list(self.workers.values()):
+            rss = get_rss(worker.pid)
+            if rss is not None and rss > self.max_rss and worker.ready:
+                self.replace_worker(
+                    worker,
+                    f"RSS of {rss // 2**20} MiB above the limit of "
+                    f"{self.max_rss // 2**20} MiB",
+                )
+
+    def stop_workers(self, timeout: t.Optional[float] = None) -> None:
+        """Stops all workers gracefully. Workers still running after `timeout` are killed."""
+        if timeout is None:
+            timeout = self.stop_timeout
+
+        for pid in list(self.workers):
+            self._kill(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + timeout
+        while self.workers and time.monotonic() < deadline:
+            self._wait(timeout=0.1)
+            self._signal_queue.clear()
+            self.reap_workers()
+
+        for pid in list(self.workers):
+            logger.warning("Killing worker [%d], it didn't stop in time", pid)
+            self._kill(pid, signal.SIGKILL)
+        while self.workers:
+            pid, _ = os.waitpid(-1, 0)
+            self.workers.pop(pid, None)
+
+    @classmethod
+    def _kill(cls, pid: int, sig: int) -> None:
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def handle_signals(self) -> None:
+        while self._signal_queue:
+            sig = self._signal_queue.pop(0)
+            if sig in (signal.SIGINT, signal.SIGTERM):
+                logger.info("Received %s, exiting.", signal.Signals(sig).name)
+                self.should_exit = True
+            elif sig == signal.SIGHUP:
+                logger.info("Received SIGHUP, restarting workers.")
+                self.start_rolling_restart()
+            elif sig == signal.SIGUSR2:
+                for pid in list(self.workers):
+                    self._kill(pid, signal.SIGUSR2)
+
+    def _install_signal_handlers(self) -> None:
+        self._wakeup_read_fd, self._wakeup_write_fd = os.pipe()
+        for fd in (self._wakeup_read_fd, self._wakeup_write_fd):
+            os.set_blocking(fd, False)
+        self._notify_read_fd, self._notify_write_fd = os.pipe()
+        os.set_blocking(self._notify_read_fd, False)
+
+        signal.set_wakeup_fd(self._wakeup_write_fd)
+        self._original_handlers = {
+            sig: signal.signal(sig, self._on_signal) for sig in self.handled_signals()
+        }
+
+    def handled_signals(self) -> t.Tuple[int, ...]:
+        return _HANDLED_SIGNALS
+
+    def _restore_signal_handlers(self) -> None:
+        for sig, handler in getattr(self, "_original_handlers", {}).items():
+            signal.signal(sig, handler)
+        signal.set_wakeup_fd(-1)
+        for fd in (
+            self._wakeup_read_fd,
+            self._wakeup_write_fd,
+            self._notify_read_fd,
+            self._notify_write_fd,
+        ):
+            if fd >= 0:
+                os.close(fd)
+        self._wakeup_read_fd = self._wakeup_write_fd = -1
+        self._notify_read_fd = self._notify_write_fd = -1
+
+    def _on_signal(self, sig: int, frame: t.Any) -> None:
+        if sig != signal.SIGCHLD:
+            self._signal_queue.append(sig)
+
+    def _wait(self, timeout: float) -> None:
+        """Waits for a signal or a message of a worker, at most `timeout` seconds"""
+        try:
+            ready, _, _ = select.select(
+                [self._wakeup_read_fd, self._notify_read_fd], [], [], timeout
+            )
+        except InterruptedError:  # pragma: no cover
+            return
+        if self._wakeup_read_fd in ready:
+            self._read_all(self._wakeup_read_fd)
+        if self._notify_read_fd in ready:
+            data = self._read_all(self._notify_read_fd)
+            for pid, event in struct.iter_unpack(NOTIFY_FORMAT, data):
+                worker = self.workers.get(pid)
+                if worker is None:
+                    continue
+                if event == NOTIFY_READY:
+                    worker.ready = True
+                    self.on_worker_ready(worker)
+                elif event == NOTIFY_RECYCLE:
+                    self.replace_worker(worker, "maximum request limit reached")
+
+    @classmethod
+    def _read_all(cls, fd: int) -> bytes:
+        data = b""
+        try:
+            while True:
+                chunk = os.read(fd, 4096)
+                if not chunk:
+                    break
+                data += chunk
+        except OSError as ex:
+            if ex.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):  # pragma: no cover
+                raise
+        return data
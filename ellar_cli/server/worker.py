@@ -0,0 +1,246 @@
+import asyncio
+import logging
+import os
+import random
+import signal
+import socket
+import struct
+import sys
+import time
+import traceback
+import typing as t
+
+from uvicorn import Config, Server
+
+from .hooks import WorkerHook
+from .memory import get_rss
+from .stats import StatsTable
+
+logger = logging.getLogger("uvicorn.error")
+
+# same exit code as uvicorn, for a server that could not start
+STARTUP_FAILURE = 3
+
+# message of a worker to the supervisor: its pid and one of the events below
+NOTIFY_FORMAT = "=ii"
+#: the lifespan startup of the worker completed, it serves requests
+NOTIFY_READY = 1
+#: the worker served `--limit-max-requests` requests and asks to be replaced
+NOTIFY_RECYCLE = 2
+
+# seconds given to connections accepted right before a shutdown to send their request
+_SHUTDOWN_ACCEPT_GRACE = 0.2
+
+# seconds uvicorn's main loop sleeps between ticks
+_TICK_INTERVAL = 0.1
+# the stats of a worker are published every 10 ticks
+_STATS_TICKS = 10
+
+
+class Worker:
+    """A worker process of `PreforkSupervisor`, as seen by the supervisor and by the worker itself"""
+
+    def __init__(self, index: int) -> None:
+        #: slot of the worker. A replacement worker takes the slot of the worker it replaces
+        self.index = index
+        self.pid = 0
+        self.started_at = 0.0
+        #: set by the supervisor once the lifespan startup of the worker completed
+        self.ready = False
+        #: set by the supervisor when it stops the worker without replacing it
+        self.retiring = False
+        #: row of the worker in the stats table of the supervisor, -1 for none
+        self.stats_row = -1
+
+    def __repr__(self) -> str:
+        return f"<Worker index={self.index} pid={self.pid}>"
+
+
+class _StopSignalHandler:
+    """
+    Handles SIGINT and SIGTERM outside of uvicorn's own handlers: exits while the worker boots,
+    asks the server to stop before it serves, and does nothing once it stopped.
+    """
+
+    def __init__(self) -> None:
+        self.server: t.Optional[Server] = None
+
+    def __call__(self, *args: t.Any) -> None:
+        if self.server is None:
+            raise SystemExit(0)
+        self.server.should_exit = True
+
+
+class WorkerServer(Server):
+    """
+    Tells the supervisor through `notify_fd` when it is ready to serve requests, after the
+    `worker_started` methods of `hooks` were called.
+
+    Once `config.limit_max_requests` requests are served, the worker asks the supervisor to
+    replace it and keeps serving until the supervisor stops it, instead of exiting at once.
+    The worker exits when the supervisor dies. Its statistics are published in `stats`, off the
+    request path, every second.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        notify_fd: int = -1,
+        worker: t.Optional[Worker] = None,
+        hooks: t.Sequence[WorkerHook] = (),
+        stats: t.Optional[StatsTable] = None,
+    ) -> None:
+        super().__init__(config)
+        self.notify_fd = notify_fd
+        self.worker = worker
+        self.hooks = hooks
+        self.stats = stats if worker is not None and worker.stats_row >= 0 else None
+        self._last_tick = 0.0
+        self._loop_lag = 0.0
+        self.max_requests: t.Optional[int] = None
+        if notify_fd >= 0:
+            self.max_requests = config.limit_max_requests
+            config.limit_max_requests = None
+        self.recycle_requested = False
+        self.parent_pid = os.getppid()
+
+    def notify(self, event: int) -> None:
+        # smaller than PIPE_BUF, so messages of workers don't interleave
+        os.write(self.notify_fd, struct.pack(NOTIFY_FORMAT, os.getpid(), event))
+
+    async def startup(self, sockets: t.Optional[t.List[socket.socket]] = None) -> None:
+        await super().startup(sockets=sockets)
+        if self.started and self.worker is not None:
+            for hook in self.hooks:
+                hook.worker_started(self.worker, self)
+        if self.started and self.notify_fd >= 0:
+            self.notify(NOTIFY_READY)
+
+    async def shutdown(self, sockets: t.Optional[t.List[socket.socket]] = None) -> None:
+        # uvicorn closes connections without a request in progress, including the ones just
+        # accepted whose request is not read yet. Accepting stops first, and they are given
+        # time to be read, so that they are served like the other requests in progress
+        for server in self.servers:
+            server.close()
+        await asyncio.sleep(_SHUTDOWN_ACCEPT_GRACE)
+        await super().shutdown(sockets=sockets)
+
+    async def on_tick(self, counter: int) -> bool:
+        should_exit = await super().on_tick(counter)
+        if not should_exit and os.getppid() != self.parent_pid:
+            logger.warning("Supervisor process died. Exiting.")
+            self.should_exit = True
+        if (
+            self.max_requests is not None
+            and not self.recycle_requested
+            and self.server_state.total_requests >= self.max_requests
+        ):
+            logger.warning(
+                "Maximum request limit of %d exceeded. Waiting for a replacement.",
+                self.max_requests,
+            )
+            self.recycle_requested = True
+            self.notify(NOTIFY_RECYCLE)
+        if self.stats is not None:
+            self._update_stats(counter)
+        return should_exit
+
+    def _update_stats(self, counter: int) -> None:
+        assert self.stats is not None and self.worker is not None
+        now = time.monotonic()
+        if self._last_tick:
+            lag = now - self._last_tick - _TICK_INTERVAL
+            self._loop_lag = max(self._loop_lag, lag)
+        self._last_tick = now
+        if counter % _STATS_TICKS:
+            return
+
+        self.stats.write(
+            self.worker.stats_row,
+            requests=self.server_state.total_requests,
+            in_flight=len(self.server_state.tasks),
+            rss=get_rss(os.getpid()) or 0,
+            loop_lag=self._loop_lag,
+            updated_at=time.time(),
+        )
+        self._loop_lag = 0.0
+
+
+def run_worker(
+    worker: Worker,
+    config: Config,
+    sockets: t.List[socket.socket],
+    hooks: t.Sequence[WorkerHook],
+    reuse_port: bool = False,
+    notify_fd: int = -1,
+    max_requests_jitter: int = 0,
+    stats: t.Optional[StatsTable] = None,
+) -> t.NoReturn:  # pragma: no cover
+    """
+    Serves `config.app` in a forked worker. Never returns.
+    With `reuse_port`, the worker listens on its own socket instead of `sockets`.
+    Up to `max_requests_jitter` requests are added to the `limit_max_requests` of the worker,
+    so that workers don't all reach it at the same time.
+    """
+    exit_code = 0
+    server: t.Optional[Server] = None
+    try:
+        worker.pid = os.getpid()
+        worker.started_at = time.time()
+        if stats is not None and worker.stats_row >= 0:
+            stats.write(worker.stats_row, pid=worker.pid, started_at=worker.started_at)
+
+        # the handlers of the supervisor don't apply to workers
+        signal.set_wakeup_fd(-1)
+        for sig in (signal.SIGCHLD, signal.SIGUSR1):
+            signal.signal(sig, signal.SIG_DFL)
+        # forwarded by the supervisor, for hooks like the profiler
+        signal.signal(signal.SIGUSR2, signal.SIG_IGN)
+        # a hangup of the terminal restarts the workers through the supervisor
+        signal.signal(signal.SIGHUP, signal.SIG_IGN)
+        # uvicorn installs its own handlers while serving, and raises the received signal
+        # again when done, so the worker exits cleanly on it
+        stop_handler = _StopSignalHandler()
+        signal.signal(signal.SIGINT, stop_handler)
+        signal.signal(signal.SIGTERM, stop_handler)
+
+        if config.limit_max_requests is not None and max_requests_jitter > 0:
+            # `random` is seeded again in forked processes
+            config.limit_max_requests += random.randint(0, max_requests_jitter)
+
+        for hook in hooks:
+            hook.worker_init(worker)
+
+        if reuse_port:
+            from .sockets import bind_reuse_port_socket
+
+            sockets = [bind_reuse_port_socket(config)]
+
+        server = WorkerServer(
+            config, notify_fd=notify_fd, worker=worker, hooks=hooks, stats=stats
+        )
+        stop_handler.server = server
+        server.run(sockets=sockets)
+        if not server.started:
+            exit_code = STARTUP_FAILURE
+    except SystemExit as ex:
+        exit_code = (
+            ex.code if isinstance(ex.code, int) else (0 if ex.code is None else 1)
+        )
+        if exit_code and (server is None or not server.started):
+            # e.g. uvicorn exits when the application can't be imported
+            exit_code = STARTUP_FAILURE
+    except BaseException:
+        traceback.print_exc()
+        # a failure before serving, like a raising application factory or hook, would
+        # happen again in every worker started in its place
+        exit_code = 1 if server is not None and server.started else STARTUP_FAILURE
+    finally:
+        try:
+            if server is not None:
+                for hook in hooks:
+                    hook.worker_exit(worker, server)
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(exit_code)
@@ -1,5 +1,7 @@
 from .cli import EllarCLIService, EllarCLIServiceWithPyProject
+from .discovery import StaticCommandDiscovery
 from .exceptions import EllarCLIException
+from .manifest import CommandManifest
 from .pyproject import EllarPyProject
 
 __all__ = [
@@ -7,4 +9,6 @@ __all__ = [
     "EllarCLIService",
     "EllarCLIServiceWithPyProject",
     "EllarCLIException",
+    "CommandManifest",
+    "StaticCommandDiscovery",
 ]
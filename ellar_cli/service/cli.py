@@ -4,22 +4,22 @@ import os
 import sys
 import typing as t
 
-from ellar.app import App
+from ellar.app import App, AppFactory
 from ellar.common.constants import ELLAR_CONFIG_MODULE
-from ellar.core import Config, ModuleBase, injector_context
-from ellar.di import EllarInjector
+from ellar.core import Config, ModuleBase, ModuleSetup, injector_context
+from ellar.di import EllarInjector, ModuleTreeManager
 from ellar.utils.importer import import_from_string, module_import
-from tomlkit import dumps as tomlkit_dumps
-from tomlkit import parse as tomlkit_parse
-from tomlkit import table
-from tomlkit.items import Table
 
-from ellar_cli.constants import ELLAR_PY_PROJECT
+from ellar_cli.constants import BootLevel
+from ellar_cli.profiling import cli_phase
 from ellar_cli.schema import EllarPyProjectSerializer, MetadataStore
 
 from .exceptions import EllarCLIException
 from .pyproject import PY_PROJECT_TOML, EllarPyProject
 
+if t.TYPE_CHECKING:  # pragma: no cover
+    from tomlkit.items import Table
+
 
 def _export_ellar_config_module(func: t.Callable) -> t.Callable:
     """Ensure Ellar Config Module is Exported"""
@@ -84,14 +84,11 @@ class EllarCLIService:
 
         py_project_file_path = os.path.join(cwd, PY_PROJECT_TOML)
         if os.path.exists(py_project_file_path):
-            pyproject_table = (
-                EllarCLIService.read_py_project(py_project_file_path) or table()
-            )
             _ellar_pyproject_serializer: t.Optional[EllarPyProjectSerializer] = None
-            tools = pyproject_table.get("tool", {})
+            # read only, `create_ellar_project_meta` re-reads the file with tomlkit to update it
+            ellar_py_projects = EllarPyProject.read(py_project_file_path)
 
-            if ELLAR_PY_PROJECT in tools:
-                ellar_py_projects = EllarPyProject(tools.get(ELLAR_PY_PROJECT))
+            if ellar_py_projects is not None:
                 if ellar_py_projects.has_project(
                     project
                 ) or ellar_py_projects.has_project(ellar_py_projects.default_project):
@@ -101,8 +98,8 @@ class EllarCLIService:
                         else ellar_py_projects.default_project
                     )
 
-                    _ellar_pyproject_serializer = cls.schema_cls.model_validate(
-                        ellar_py_projects.get_project(project_to_load)
+                    _ellar_pyproject_serializer = ellar_py_projects.get_project_meta(
+                        project_to_load, cls.schema_cls
                     )
 
             return cls(
@@ -151,7 +148,10 @@ class EllarCLIService:
         EllarCLIService.write_py_project(self.py_project_path, pyproject_table)
 
     @staticmethod
-    def read_py_project(path: str) -> t.Optional[Table]:
+    def read_py_project(path: str) -> t.Optional["Table"]:
+        """Reads pyproject.toml with tomlkit, which keeps its style when written back"""
+        from tomlkit import parse as tomlkit_parse
+
         if os.path.exists(path):
             with open(path, mode="r") as fp:
                 table_content = tomlkit_parse(fp.read())
@@ -159,7 +159,9 @@ class EllarCLIService:
         return None
 
     @staticmethod
-    def write_py_project(path: str, content: Table) -> None:
+    def write_py_project(path: str, content: "Table") -> None:
+        from tomlkit import dumps as tomlkit_dumps
+
         with open(path, mode="w") as fw:
             fw.writelines(tomlkit_dumps(content))
 
@@ -194,14 +196,17 @@ class EllarCLIService:
     def import_application(self) -> App:
         assert self._meta
         if not self._store.app_instance:
-            self._import_and_validate_application()
+            with cli_phase("import_application"):
+                self._import_and_validate_application()
 
         assert isinstance(self._store.app_instance, App)
         return self._store.app_instance
 
+    @_export_ellar_config_module
     def is_app_callable(self) -> bool:
-        if not self._store.is_app_reference_callable:
-            self._import_and_validate_application()
+        """Checks if the application reference is a factory, without calling it"""
+        if not self._store.app_instance:
+            return not isinstance(self._import_from_string(), App)
 
         return self._store.is_app_reference_callable
 
@@ -216,21 +221,43 @@ class EllarCLIService:
     @_export_ellar_config_module
     def get_application_config(self) -> "Config":
         assert self._meta
-        if not self._store.config_instance:  # pragma: no cover
-            self._store.config_instance = Config(
-                os.environ.get(ELLAR_CONFIG_MODULE, self._meta.config)
-            )
+        if not self._store.config_instance:
+            with cli_phase("load_config"):
+                self._store.config_instance = Config(
+                    os.environ.get(ELLAR_CONFIG_MODULE, self._meta.config)
+                )
         return self._store.config_instance
 
     @_export_ellar_config_module
     def import_root_module(self) -> t.Type["ModuleBase"]:
         assert self._meta
         if not self._store.root_module:
-            self._store.root_module = t.cast(
-                t.Type["ModuleBase"], import_from_string(self._meta.root_module)
-            )
+            with cli_phase("import_root_module"):
+                self._store.root_module = t.cast(
+                    t.Type["ModuleBase"], import_from_string(self._meta.root_module)
+                )
         return self._store.root_module
 
+    @_export_ellar_config_module
+    def get_module_tree(self) -> ModuleTreeManager:
+        """Reads the modules of the project without building the application"""
+        if not self._store.module_tree:
+            root_module = self.import_root_module()
+            with cli_phase("read_all_module"):
+                self._store.module_tree = AppFactory.read_all_module(
+                    ModuleSetup(root_module)
+                )
+        return self._store.module_tree
+
+    def boot(self, level: BootLevel) -> None:
+        """Does only as much work as commands of boot `level` need"""
+        if level >= BootLevel.APP:
+            self.import_application()
+        elif level >= BootLevel.MODULE_TREE:
+            self.get_module_tree()
+        elif level >= BootLevel.CONFIG:
+            self.get_application_config()
+
     @_export_ellar_config_module
     def get_application_context(self) -> t.AsyncGenerator[EllarInjector, t.Any]:
         app = t.cast(App, self.import_application())
@@ -312,3 +339,6 @@ class EllarCLIServiceWithPyProject(EllarCLIService):
 
     def import_root_module(self) -> t.Type[ModuleBase]:
         raise EllarCLIException("Not Available")
+
+    def get_module_tree(self) -> ModuleTreeManager:
+        return self.import_application().injector.tree_manager
@@ -0,0 +1,432 @@
+import ast
+import os
+import sys
+import typing as t
+from importlib.machinery import PathFinder
+
+import click
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from .cli import EllarCLIService
+
+_COMMAND_DECORATORS = ("command", "group")
+_PARAM_DECORATORS = ("option", "argument")
+_PARAM_TYPES = {
+    "int": "Int",
+    "INT": "Int",
+    "float": "Float",
+    "FLOAT": "Float",
+    "bool": "Bool",
+    "BOOL": "Bool",
+    "str": "String",
+    "STRING": "String",
+    "IntRange": "IntRange",
+    "FloatRange": "FloatRange",
+    "UUID": "UUID",
+    "Path": "Path",
+    "File": "File",
+}
+
+
+class _DiscoveryError(Exception):
+    """Raised when a declaration can't be understood without running it"""
+
+
+class _ParsedModule:
+    def __init__(self, name: str, path: str, is_package: bool) -> None:
+        self.name = name
+        self.path = path
+        self.package = name if is_package else name.rpartition(".")[0]
+
+        with open(path, mode="rb") as fp:
+            tree = ast.parse(fp.read(), filename=path)
+
+        self.body = tree.body
+        # top level name -> definition
+        self.definitions: t.Dict[str, ast.AST] = {}
+        # local name -> (module, attribute). attribute is None for `import module`
+        self.imports: t.Dict[str, t.Tuple[str, t.Optional[str]]] = {}
+
+        for node in tree.body:
+            if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.definitions[node.name] = node
+            elif isinstance(node, ast.ImportFrom):
+                module = self._absolute_module(node)
+                for alias in node.names:
+                    self.imports[alias.asname or alias.name] = (module, alias.name)
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname:
+                        self.imports[alias.asname] = (alias.name, None)
+                    else:
+                        top_level = alias.name.partition(".")[0]
+                        self.imports[top_level] = (top_level, None)
+
+    def _absolute_module(self, node: ast.ImportFrom) -> str:
+        if not node.level:
+            return node.module or ""
+
+        package = self.package.split(".")
+        if node.level > 1:
+            package = package[: -(node.level - 1)]
+        return ".".join([*package, *([node.module] if node.module else [])])
+
+
+class StaticCommandDiscovery:
+    """
+    Finds the commands registered by the modules of a project without importing them.
+
+    The sources of the modules reachable from `root-module` are parsed with `ast`, following
+    `@Module(modules=[...], commands=[...])` declarations and the click command definitions
+    they reference. Gives up, returning None, on declarations that need the code to run,
+    e.g. a `commands` list built by a function call or sub commands added to a group with
+    `add_command`.
+    """
+
+    def __init__(self, cli_service: "EllarCLIService") -> None:
+        assert cli_service.project_meta
+        self._root_module = cli_service.project_meta.root_module
+        self._search_path = [cli_service.cwd, *sys.path]
+        self._modules: t.Dict[str, t.Optional[_ParsedModule]] = {}
+        self.source_files: t.Set[str] = set()
+
+    def discover(self) -> t.Optional[t.List[t.Dict[str, t.Any]]]:
+        """Returns the commands as `command_to_spec` descriptions"""
+        module_name, _, attr = self._root_module.partition(":")
+        commands: t.Dict[str, t.Dict[str, t.Any]] = {}
+
+        try:
+            root = self._get_module(module_name)
+            if root is None:
+                raise _DiscoveryError(module_name)
+            self._visit_module_class(root, root.definitions.get(attr), commands, set())
+        except (_DiscoveryError, OSError, SyntaxError, ValueError):
+            return None
+        return list(commands.values())
+
+    def _find_source(self, module_name: str) -> t.Optional[t.Tuple[str, bool]]:
+        parts = module_name.split(".")
+        search_path: t.List[str] = self._search_path
+        spec = None
+
+        for index in range(len(parts)):
+            # finds parent packages without executing their `__init__.py`
+            spec = PathFinder.find_spec(".".join(parts[: index + 1]), search_path)
+            if spec is None:
+                return None
+            search_path = list(spec.submodule_search_locations or [])
+
+        if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+            return None
+        return spec.origin, spec.submodule_search_locations is not None
+
+    def _get_module(self, module_name: str) -> t.Optional[_ParsedModule]:
+        if module_name not in self._modules:
+            source = self._find_source(module_name)
+            parsed = None
+            if source is not None:
+                parsed = _ParsedModule(module_name, source[0], source[1])
+                self.source_files.add(os.path.abspath(source[0]))
+            self._modules[module_name] = parsed
+        return self._modules[module_name]
+
+    def _resolve(
+        self, module: _ParsedModule, node: ast.expr, seen: t.Optional[t.Set] = None
+    ) -> t.Tuple[_ParsedModule, ast.AST]:
+        """Returns the module and the top level definition `node` references"""
+        if isinstance(node, ast.Name):
+            return self._resolve_name(module, node.id, seen or set())
+
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            imported = module.imports.get(node.value.id)
+            if imported is not None and imported[1] is None:
+                target = self._get_module(imported[0])
+            elif imported is not None:
+                # `from package import module`
+                target = self._get_module(f"{imported[0]}.{imported[1]}")
+            else:
+                target = None
+            if target is not None:
+                return self._resolve_name(target, node.attr, seen or set())
+
+        raise _DiscoveryError(ast.dump(node))
+
+    def _resolve_name(
+        self, module: _ParsedModule, name: str, seen: t.Set
+    ) -> t.Tuple[_ParsedModule, ast.AST]:
+        if (module.name, name) in seen:
+            raise _DiscoveryError(name)
+        seen.add((module.name, name))
+
+        if name in module.definitions:
+            return module, module.definitions[name]
+
+        if name in module.imports:
+            imported_module, attr = module.imports[name]
+            target = self._get_module(imported_module)
+            if target is not None and attr is not None:
+                return self._resolve_name(target, attr, seen)
+
+        raise _DiscoveryError(f"{module.name}:{name}")
+
+    def _resolve_import_string(
+        self, import_string: str
+    ) -> t.Tuple[_ParsedModule, ast.AST]:
+        module_name, _, attr = import_string.partition(":")
+        module = self._get_module(module_name)
+        if module is None or not attr:
+            raise _DiscoveryError(import_string)
+        return self._resolve_name(module, attr, set())
+
+    def _visit_module_class(
+        self,
+        module: _ParsedModule,
+        node: t.Optional[ast.AST],
+        commands: t.Dict[str, t.Dict[str, t.Any]],
+        visited: t.Set[t.Tuple[str, str]],
+    ) -> None:
+        if not isinstance(node, ast.ClassDef):
+            raise _DiscoveryError(module.name)
+
+        if (module.name, node.name) in visited:
+            return
+        visited.add((module.name, node.name))
+
+        declaration = next(
+            (
+                decorator
+                for decorator in node.decorator_list
+                if isinstance(decorator, ast.Call)
+                and _get_name(decorator.func) == "Module"
+            ),
+            None,
+        )
+        if declaration is None:
+            return
+
+        for keyword in declaration.keywords:
+            if keyword.arg == "modules":
+                for item in _literal_list(keyword.value):
+                    sub_module, sub_node = self._resolve_module_reference(module, item)
+                    self._visit_module_class(sub_module, sub_node, commands, visited)
+            elif keyword.arg == "commands":
+                for item in _literal_list(keyword.value):
+                    command_module, command_node = self._resolve(module, item)
+                    spec = self._command_spec(command_module, command_node)
+                    commands[spec["name"]] = spec
+
+    def _resolve_module_reference(
+        self, module: _ParsedModule, node: ast.expr
+    ) -> t.Tuple[_ParsedModule, ast.AST]:
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Attribute):
+                # `SomeModule.setup(...)`, `SomeModule.register_setup(...)`
+                return self._resolve(module, node.func.value)
+
+            if node.args and isinstance(node.args[0], ast.Constant):
+                # `LazyModuleImport("package.module:SomeModule")`
+                return self._resolve_import_string(str(node.args[0].value))
+
+            if node.args:
+                # `ModuleSetup(SomeModule, ...)`
+                return self._resolve(module, node.args[0])
+
+        return self._resolve(module, node)
+
+    def _command_spec(
+        self, module: _ParsedModule, node: ast.AST, group: t.Optional[str] = None
+    ) -> t.Dict[str, t.Any]:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            raise _DiscoveryError(module.name)
+
+        decorator = next(
+            (
+                decorator
+                for decorator in node.decorator_list
+                if _get_name(_callee(decorator)) in _COMMAND_DECORATORS
+            ),
+            None,
+        )
+        if decorator is None:
+            raise _DiscoveryError(f"{module.name}:{node.name}")
+
+        options = _literal_kwargs(decorator)
+        args = decorator.args if isinstance(decorator, ast.Call) else []
+        name = _literal(args[0]) if args else options.get("name")
+
+        spec: t.Dict[str, t.Any] = {
+            "name": name or _default_command_name(node.name),
+            "import": None if group else f"{module.name}:{node.name}",
+            "help": options.get("help", ast.get_docstring(node)),
+            "short_help": options.get("short_help"),
+            "epilog": options.get("epilog"),
+            "hidden": bool(options.get("hidden", False)),
+            "params": [
+                _param_spec(param_decorator)
+                for param_decorator in node.decorator_list
+                if isinstance(param_decorator, ast.Call)
+                and _get_name(param_decorator.func) in _PARAM_DECORATORS
+            ],
+            "commands": None,
+        }
+
+        if _get_name(_callee(decorator)) == "group":
+            if self._has_added_commands(module, node.name):
+                raise _DiscoveryError(f"{module.name}:{node.name}")
+            spec["commands"] = [
+                self._command_spec(module, sub_command, group=node.name)
+                for sub_command in module.body
+                if isinstance(sub_command, (ast.FunctionDef, ast.AsyncFunctionDef))
+                and self._is_sub_command_of(sub_command, node.name)
+            ]
+        return spec
+
+    @classmethod
+    def _has_added_commands(cls, module: _ParsedModule, group: str) -> bool:
+        """Whether `module` calls `group.add_command(...)`, anywhere in it"""
+        for node in module.body:
+            for child in ast.walk(node):
+                if (
+                    isinstance(child, ast.Call)
+                    and isinstance(child.func, ast.Attribute)
+                    and child.func.attr == "add_command"
+                    and isinstance(child.func.value, ast.Name)
+                    and child.func.value.id == group
+                ):
+                    return True
+        return False
+
+    @classmethod
+    def _is_sub_command_of(cls, node: ast.AST, group: str) -> bool:
+        for decorator in getattr(node, "decorator_list", []):
+            callee = _callee(decorator)
+            if (
+                isinstance(callee, ast.Attribute)
+                and callee.attr in _COMMAND_DECORATORS
+                and isinstance(callee.value, ast.Name)
+                and callee.value.id == group
+            ):
+                return True
+        return False
+
+
+def _callee(node: ast.expr) -> ast.expr:
+    return node.func if isinstance(node, ast.Call) else node
+
+
+def _get_name(node: ast.expr) -> t.Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _literal(node: ast.expr) -> t.Any:
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        return None
+
+
+def _literal_list(node: ast.expr) -> t.List[ast.expr]:
+    if not isinstance(node, (ast.List, ast.Tuple)):
+        raise _DiscoveryError(ast.dump(node))
+    return list(node.elts)
+
+
+def _literal_kwargs(node: ast.expr) -> t.Dict[str, t.Any]:
+    if not isinstance(node, ast.Call):
+        return {}
+
+    kwargs = {}
+    for keyword in node.keywords:
+        if keyword.arg is not None:
+            try:
+                kwargs[keyword.arg] = ast.literal_eval(keyword.value)
+            except ValueError:
+                # not needed to describe the command. e.g. `callback=`
+                continue
+    return kwargs
+
+
+def _default_command_name(function_name: str) -> str:
+    """Name click gives to a command defined by a function named `function_name`"""
+
+    def _callback() -> None:  # pragma: no cover
+        pass
+
+    _callback.__name__ = function_name
+    return t.cast(str, click.command()(_callback).name)
+
+
+def _param_type(node: t.Optional[ast.expr]) -> t.Dict[str, t.Any]:
+    if node is None:
+        return {"param_type": "String"}
+
+    type_name = _get_name(_callee(node))
+    if type_name == "Choice" and isinstance(node, ast.Call) and node.args:
+        return {
+            "param_type": "Choice",
+            "choices": [str(choice) for choice in _literal(node.args[0]) or []],
+            "case_sensitive": _literal_kwargs(node).get("case_sensitive", True),
+        }
+    return {"param_type": _PARAM_TYPES.get(type_name or "", "String")}
+
+
+def _param_spec(node: ast.Call) -> t.Dict[str, t.Any]:
+    kind = _get_name(node.func)
+    decls = [str(_literal(arg)) for arg in node.args]
+    kwargs = _literal_kwargs(node)
+    type_node = next(
+        (keyword.value for keyword in node.keywords if keyword.arg == "type"), None
+    )
+
+    opts: t.List[str] = []
+    secondary_opts: t.List[str] = []
+    name = None
+    for decl in decls:
+        if decl.isidentifier():
+            name = decl
+            continue
+        first, _, second = decl.partition("/")
+        opts.append(first.strip())
+        if second:
+            secondary_opts.append(second.strip())
+
+    if kind == "argument":
+        name = name or (decls[0] if decls else None)
+        opts = [name] if name else []
+    elif name is None and opts:
+        # same as click, the longest option without its prefix
+        name = (
+            sorted(opts, key=lambda opt: -len(opt) + len(opt.lstrip("-/")))[0]
+            .lstrip("-/")
+            .replace("-", "_")
+            .lower()
+        )
+
+    default = kwargs.get("default")
+    nargs = kwargs.get("nargs", 1)
+    is_flag = bool(kwargs.get("is_flag", secondary_opts or isinstance(default, bool)))
+    required = kwargs.get(
+        "required", kind == "argument" and "default" not in kwargs and nargs > 0
+    )
+
+    return {
+        "kind": kind,
+        "name": name,
+        "opts": opts,
+        "secondary_opts": secondary_opts,
+        "type": {"param_type": "Bool"} if is_flag else _param_type(type_node),
+        "required": required,
+        "nargs": nargs,
+        "multiple": kwargs.get("multiple", False),
+        "default": default,
+        "metavar": kwargs.get("metavar"),
+        "help": kwargs.get("help"),
+        "hidden": kwargs.get("hidden", False),
+        "is_flag": is_flag,
+        "count": kwargs.get("count", False),
+        "show_default": kwargs.get("show_default"),
+    }
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import sys
+import typing as t
+from importlib.machinery import PathFinder
+
+from ellar.common.constants import ELLAR_CONFIG_MODULE
+
+import ellar_cli
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from .cli import EllarCLIService
+
+ELLAR_CLI_DIR = ".ellar"
+MANIFEST_VERSION = 1
+
+
+class CommandManifest:
+    """
+    On-disk record of the commands an Ellar project registers through its modules.
+
+    The manifest is stored in `.ellar/` next to `pyproject.toml` and is only valid
+    as long as pyproject.toml, the project's package source files, the selected
+    config module and the source files of the recorded commands are unchanged.
+    """
+
+    def __init__(self, cli_service: "EllarCLIService") -> None:
+        assert cli_service.project_meta
+        self._cli_service = cli_service
+        self._project_meta = cli_service.project_meta
+        self.path = os.path.join(
+            cli_service.cwd, ELLAR_CLI_DIR, f"commands.{cli_service.app}.json"
+        )
+
+    def _get_project_source_root(self) -> t.Optional[str]:
+        root_module = self._project_meta.root_module
+        top_level_package = root_module.partition(":")[0].split(".")[0]
+
+        # Locates the package without importing it
+        spec = PathFinder.find_spec(
+            top_level_package, [self._cli_service.cwd, *sys.path]
+        )
+        if spec is None:
+            return None
+
+        if spec.submodule_search_locations:
+            return list(spec.submodule_search_locations)[0]
+        return spec.origin
+
+    def _get_config(self) -> t.Optional[str]:
+        """Import string of the config the application loads"""
+        config = os.environ.get(ELLAR_CONFIG_MODULE) or self._project_meta.config
+        return config if config and config != "null" else None
+
+    def _find_module_source(self, module_name: str) -> t.Optional[str]:
+        search_path = [self._cli_service.cwd, *sys.path]
+        parts = module_name.split(".")
+        spec = None
+        for index in range(len(parts)):
+            # finds parent packages without executing their `__init__.py`
+            spec = PathFinder.find_spec(".".join(parts[: index + 1]), search_path)
+            if spec is None:
+                return None
+            search_path = list(spec.submodule_search_locations or [])
+        return spec.origin if spec is not None else None
+
+    @classmethod
+    def _iter_source_files(cls, source_root: str) -> t.Iterator[str]:
+        if os.path.isfile(source_root):
+            yield source_root
+            return
+
+        for dir_path, dir_names, file_names in os.walk(source_root):
+            dir_names[:] = [
+                name
+                for name in dir_names
+                if not name.startswith(".") and name != "__pycache__"
+            ]
+            for file_name in file_names:
+                if file_name.endswith(".py"):
+                    yield os.path.join(dir_path, file_name)
+
+    def compute_fingerprint(self, sources: t.Sequence[str]) -> str:
+        """
+        Hashes the selected config, and the size and modification time of pyproject.toml,
+        the project package source files, the config module and `sources`.
+        """
+        files = {self._cli_service.py_project_path, *sources}
+
+        source_root = self._get_project_source_root()
+        if source_root:
+            files.update(self._iter_source_files(source_root))
+
+        # e.g. `ELLAR_CONFIG_MODULE=project.config:ProductionConfig`, outside the project
+        config = self._get_config()
+        config_source = (
+            self._find_module_source(config.partition(":")[0]) if config else None
+        )
+        if config_source:
+            files.add(config_source)
+
+        fingerprint = hashlib.sha1(
+            f"{ellar_cli.__version__}:{self._cli_service.app}:{config}".encode()
+        )
+        for file_path in sorted(files):
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                fingerprint.update(f"{file_path}:missing".encode())
+            else:
+                fingerprint.update(
+                    f"{file_path}:{stat.st_mtime_ns}:{stat.st_size}".encode()
+                )
+        return fingerprint.hexdigest()
+
+    def load(self) -> t.Optional[t.List[t.Dict[str, t.Any]]]:
+        """Returns recorded command specs or None if manifest is missing or stale."""
+        try:
+            with open(self.path, mode="r") as fp:
+                content = json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+        if content.get("version") != MANIFEST_VERSION or content.get(
+            "fingerprint"
+        ) != self.compute_fingerprint(content.get("sources", [])):
+            return None
+        return t.cast(t.List[t.Dict[str, t.Any]], content.get("commands", []))
+
+    def save(self, commands: t.List[t.Dict[str, t.Any]], sources: t.Set[str]) -> None:
+        content = {
+            "version": MANIFEST_VERSION,
+            "fingerprint": self.compute_fingerprint(sorted(sources)),
+            "sources": sorted(sources),
+            "commands": commands,
+        }
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, mode="w") as fw:
+                json.dump(content, fw)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # The manifest is only an optimization. A read-only project directory is fine.
+            pass
@@ -1,30 +1,82 @@
+import os
+import sys
 import typing as t
 
-from tomlkit import table
-from tomlkit.items import Table
-
 from ellar_cli.constants import ELLAR_PY_PROJECT
+from ellar_cli.constants import PY_PROJECT_TOML as PY_PROJECT_TOML
+
+if sys.version_info >= (3, 11):  # pragma: no cover
+    import tomllib
+else:  # pragma: no cover
+    import tomli as tomllib
+
+if t.TYPE_CHECKING:  # pragma: no cover
+    from tomlkit.items import Table
+
+    from ellar_cli.schema import EllarPyProjectSerializer
 
-PY_PROJECT_TOML = "pyproject.toml"
 ELLAR_DEFAULT_KEY = "default"
 ELLAR_PROJECTS_KEY = "projects"
 
+_StatKey = t.Tuple[int, int, int]
+# pyproject.toml path -> (file stat, `[tool.ellar]` it contained)
+_read_cache: t.Dict[str, t.Tuple[_StatKey, t.Optional["EllarPyProject"]]] = {}
+
+
+def _table(container: t.Optional[t.MutableMapping] = None) -> t.Any:
+    """
+    Returns a new table for `container`. Plain dicts come from the read-only parser
+    and get a dict. tomlkit is only imported for documents that are written back.
+    """
+    if type(container) is dict:
+        return {}
+
+    from tomlkit import table
+
+    return table()
+
 
 class EllarPyProject:
-    def __init__(self, ellar: t.Optional[Table] = None) -> None:
-        self._ellar = ellar if ellar is not None else table()
+    def __init__(self, ellar: t.Optional[t.MutableMapping] = None) -> None:
+        self._ellar = ellar if ellar is not None else _table()
         self._projects = t.cast(
-            Table, self._ellar.setdefault(ELLAR_PROJECTS_KEY, table())
+            "Table", self._ellar.setdefault(ELLAR_PROJECTS_KEY, _table(self._ellar))
         )
         self._default_project = self._ellar.get(ELLAR_DEFAULT_KEY, None)
+        self._project_meta: t.Dict[
+            t.Tuple[str, t.Type], "EllarPyProjectSerializer"
+        ] = {}
+
+    @classmethod
+    def read(cls, py_project_path: str) -> t.Optional["EllarPyProject"]:
+        """
+        Reads `[tool.ellar]` of a pyproject.toml with the standard library TOML parser.
+        The result is cached until the file changes. It's read only, changes must go through
+        `get_or_create_ellar_py_project` with a tomlkit document.
+        """
+        stat = os.stat(py_project_path)
+        stat_key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        cached = _read_cache.get(py_project_path)
+        if cached is not None and cached[0] == stat_key:
+            return cached[1]
+
+        with open(py_project_path, mode="rb") as fp:
+            content = tomllib.load(fp)
+
+        ellar = content.get("tool", {}).get(ELLAR_PY_PROJECT)
+        ellar_py_project = cls(ellar) if ellar is not None else None
+
+        _read_cache[py_project_path] = (stat_key, ellar_py_project)
+        return ellar_py_project
 
     @classmethod
     def get_or_create_ellar_py_project(
-        cls, py_project_table: Table
+        cls, py_project_table: "Table"
     ) -> "EllarPyProject":
         ellar_py_project_table = py_project_table.setdefault(
-            "tool", table()
-        ).setdefault(ELLAR_PY_PROJECT, table())
+            "tool", _table(py_project_table)
+        ).setdefault(ELLAR_PY_PROJECT, _table(py_project_table))
         return cls(ellar_py_project_table)
 
     @property
@@ -39,20 +91,35 @@ class EllarPyProject:
     def default_project(self, value: str) -> None:
         self._ellar.update(default=value)
 
-    def get_projects(self) -> Table:
+    def get_projects(self) -> "Table":
         return self._projects
 
-    def get_project(self, project_name: str) -> Table:
-        return t.cast(Table, self._projects.get(project_name))
+    def get_project(self, project_name: str) -> "Table":
+        return t.cast("Table", self._projects.get(project_name))
 
-    def get_or_create_project(self, project_name: str) -> Table:
-        project = self._projects.setdefault(project_name.lower(), table())
-        return t.cast(Table, project)
+    def get_project_meta(
+        self,
+        project_name: str,
+        schema_cls: t.Type["EllarPyProjectSerializer"],
+    ) -> "EllarPyProjectSerializer":
+        """Validates project `project_name` with `schema_cls` once"""
+        key = (project_name, schema_cls)
+        if key not in self._project_meta:
+            self._project_meta[key] = schema_cls.model_validate(
+                self.get_project(project_name)
+            )
+        return self._project_meta[key]
+
+    def get_or_create_project(self, project_name: str) -> "Table":
+        project = self._projects.setdefault(
+            project_name.lower(), _table(self._projects)
+        )
+        return t.cast("Table", project)
 
     def has_project(self, project_name: t.Optional[str]) -> bool:
         if not project_name:
             return False
         return project_name in self._projects
 
-    def get_root_node(self) -> Table:
-        return self._ellar
+    def get_root_node(self) -> "Table":
+        return t.cast("Table", self._ellar)
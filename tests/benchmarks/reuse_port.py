@@ -0,0 +1,283 @@
+"""
+Distribution of connections between `ellar runserver` workers.
+
+Serves a generated project with `--workers N`, once with the workers accepting from one shared
+socket and once with `--reuse-port`, and opens many short-lived connections against it, one
+request per connection (connection churn). Every response names the worker that served it.
+For each mode, reports the requests served by every worker, the spread between the busiest
+and the idlest worker and the throughput. Results are written as JSON:
+
+    python tests/benchmarks/reuse_port.py --workers 4 --output reuse-port-results.json
+"""
+
+import asyncio
+import json
+import os
+import platform
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import typing as t
+
+import click
+
+PROJECT_NAME = "reuse_port_project"
+
+MODES = {
+    "shared-socket": ["--preload"],
+    "reuse-port": ["--preload", "--reuse-port"],
+}
+
+_PY_PROJECT = """[project]
+name = "{name}"
+version = "0.0.1"
+
+[tool.ellar]
+default = "{name}"
+
+[tool.ellar.projects.{name}]
+project-name = "{name}"
+application = "{name}.server:bootstrap"
+config = "{name}.config:BenchmarkConfig"
+root-module = "{name}.root_module:ApplicationModule"
+"""
+
+_CONFIG = """from ellar.core import ConfigDefaultTypesMixin
+
+
+class BenchmarkConfig(ConfigDefaultTypesMixin):
+    DEBUG = False
+    SECRET_KEY = "ellar-cli-benchmark"
+"""
+
+_SERVER = """import os
+
+from ellar.app import App, AppFactory
+from ellar.common.constants import ELLAR_CONFIG_MODULE
+from ellar.core import LazyModuleImport as lazyLoad
+
+
+def bootstrap() -> App:
+    return AppFactory.create_from_app_module(
+        lazyLoad("{name}.root_module:ApplicationModule"),
+        config_module=os.environ.get(
+            ELLAR_CONFIG_MODULE, "{name}.config:BenchmarkConfig"
+        ),
+    )
+"""
+
+_ROOT_MODULE = """import os
+
+from ellar.common import Controller, ControllerBase, Module, get
+from ellar.core import ModuleBase
+
+
+@Controller("/worker")
+class WorkerController(ControllerBase):
+    @get("/")
+    def worker(self):
+        return {"pid": os.getpid()}
+
+
+@Module(controllers=[WorkerController])
+class ApplicationModule(ModuleBase):
+    pass
+"""
+
+
+def generate_project(directory: str) -> str:
+    """Writes a project serving the pid of its worker in `directory`. Returns its directory."""
+    project_dir = os.path.join(directory, "project")
+    package_dir = os.path.join(project_dir, PROJECT_NAME)
+    os.makedirs(package_dir)
+
+    files = {
+        os.path.join(project_dir, "pyproject.toml"): _PY_PROJECT.format(
+            name=PROJECT_NAME
+        ),
+        os.path.join(package_dir, "__init__.py"): "",
+        os.path.join(package_dir, "config.py"): _CONFIG,
+        os.path.join(package_dir, "server.py"): _SERVER.format(name=PROJECT_NAME),
+        os.path.join(package_dir, "root_module.py"): _ROOT_MODULE,
+    }
+    for path, content in files.items():
+        with open(path, mode="w") as fw:
+            fw.write(content)
+    return project_dir
+
+
+def _get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+class _Server:
+    """`ellar runserver` in a child process, until the context exits"""
+
+    def __init__(self, project_dir: str, args: t.List[str], workers: int) -> None:
+        self.project_dir = project_dir
+        self.args = args
+        self.workers = workers
+        self.output: t.List[str] = []
+
+    def __enter__(self) -> "_Server":
+        env = dict(os.environ)
+        env.pop("ELLAR_CONFIG_MODULE", None)
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "ellar_cli.cli", "runserver", *self.args],
+            cwd=self.project_dir,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+        reader = threading.Thread(target=self._read, daemon=True)
+        reader.start()
+
+        deadline = time.monotonic() + 60
+        while "".join(self.output).count("Application startup complete") < self.workers:
+            if self.process.poll() is not None or time.monotonic() > deadline:
+                self.__exit__()
+                raise click.ClickException(
+                    f"`ellar runserver {' '.join(self.args)}` did not start:\n"
+                    + "".join(self.output)
+                )
+            time.sleep(0.05)
+        return self
+
+    def _read(self) -> None:
+        assert self.process.stdout is not None
+        for line in self.process.stdout:
+            self.output.append(line.decode())
+
+    def __exit__(self, *args: t.Any) -> None:
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+async def _request(port: int) -> int:
+    """Sends one request on a new connection. Returns the pid of the worker that served it"""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write(
+            b"GET /worker/ HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n"
+        )
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    _, _, body = response.partition(b"\r\n\r\n")
+    return int(json.loads(body)["pid"])
+
+
+async def _run_clients(
+    port: int, requests: int, concurrency: int
+) -> t.Tuple[t.Dict[int, int], float]:
+    served: t.Dict[int, int] = {}
+    remaining = iter(range(requests))
+
+    async def _client() -> None:
+        for _ in remaining:
+            pid = await _request(port)
+            served[pid] = served.get(pid, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(_client() for _ in range(concurrency)))
+    return served, time.perf_counter() - start
+
+
+def benchmark_mode(
+    project_dir: str, mode: str, workers: int, requests: int, concurrency: int
+) -> t.Dict[str, t.Any]:
+    port = _get_free_port()
+    args = [*MODES[mode], "--workers", str(workers), "--port", str(port)]
+    args.append("--no-access-log")
+    with _Server(project_dir, args, workers=workers):
+        served, duration = asyncio.run(_run_clients(port, requests, concurrency))
+
+    counts = sorted(served.values(), reverse=True)
+    counts += [0] * (workers - len(counts))
+    mean = statistics.mean(counts)
+    return {
+        "mode": mode,
+        "workers": workers,
+        "requests": requests,
+        "concurrency": concurrency,
+        "requests_per_worker": counts,
+        "max_min_ratio": round(counts[0] / counts[-1], 3) if counts[-1] else None,
+        "coefficient_of_variation": round(statistics.pstdev(counts) / mean, 4),
+        "requests_per_second": round(requests / duration, 1),
+    }
+
+
+def run_benchmarks(
+    workers: int,
+    requests: int,
+    concurrency: int,
+    directory: t.Optional[str] = None,
+) -> t.Dict[str, t.Any]:
+    import ellar
+
+    import ellar_cli
+
+    results: t.List[t.Dict[str, t.Any]] = []
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        project_dir = generate_project(tmp_dir)
+        for mode in MODES:
+            result = benchmark_mode(project_dir, mode, workers, requests, concurrency)
+            results.append(result)
+            click.echo(
+                f"{mode:<14} per worker {result['requests_per_worker']}"
+                f"  cv {result['coefficient_of_variation']:.3f}"
+                f"  {result['requests_per_second']:>8.1f} req/s",
+                err=True,
+            )
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": len(os.sched_getaffinity(0)),
+            "ellar": ellar.__version__,
+            "ellar_cli": ellar_cli.__version__,
+        },
+        "results": results,
+    }
+
+
+@click.command(name="reuse-port-benchmarks")
+@click.option("--workers", type=click.IntRange(min=2), default=4, show_default=True)
+@click.option("--requests", type=click.IntRange(min=1), default=5000, show_default=True)
+@click.option(
+    "--concurrency", type=click.IntRange(min=1), default=64, show_default=True
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write the results to this JSON file instead of stdout.",
+)
+def main(
+    workers: int, requests: int, concurrency: int, output: t.Optional[str]
+) -> None:
+    results = run_benchmarks(workers, requests, concurrency)
+    content = json.dumps(results, indent=2)
+    if output:
+        with open(output, mode="w") as fw:
+            fw.write(content)
+    else:
+        click.echo(content)
+
+
+if __name__ == "__main__":
+    main()
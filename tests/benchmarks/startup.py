@@ -0,0 +1,352 @@
+"""
+CLI startup benchmarks.
+
+Generates synthetic Ellar projects with 10, 100 and 1000 modules, each registering a click
+command through `@Module(commands=[...])` (`MODULE_METADATA.COMMANDS`), and times:
+
+- `ellar --help` and `ellar <cmd> --help`, as new processes
+- command dispatch through `EllarCommandGroup.get_command`
+- entering and exiting the application context used by `with_injector_context`
+
+Cold runs start without the command manifest and bytecode caches of the project, warm runs
+reuse them. Results are written as JSON:
+
+    python tests/benchmarks/startup.py --output benchmark-results.json
+"""
+
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import typing as t
+
+import click
+
+PROJECT_NAME = "bench_project"
+DEFAULT_SIZES = (10, 100, 1000)
+
+_PY_PROJECT = """[project]
+name = "{name}"
+version = "0.0.1"
+
+[tool.ellar]
+default = "{name}"
+
+[tool.ellar.projects.{name}]
+project-name = "{name}"
+application = "{name}.server:bootstrap"
+config = "{name}.config:BenchmarkConfig"
+root-module = "{name}.root_module:ApplicationModule"
+"""
+
+_CONFIG = """from ellar.core import ConfigDefaultTypesMixin
+
+
+class BenchmarkConfig(ConfigDefaultTypesMixin):
+    DEBUG = False
+    SECRET_KEY = "ellar-cli-benchmark"
+"""
+
+_SERVER = """import os
+
+from ellar.app import App, AppFactory
+from ellar.common.constants import ELLAR_CONFIG_MODULE
+from ellar.core import LazyModuleImport as lazyLoad
+
+
+def bootstrap() -> App:
+    return AppFactory.create_from_app_module(
+        lazyLoad("{name}.root_module:ApplicationModule"),
+        config_module=os.environ.get(
+            ELLAR_CONFIG_MODULE, "{name}.config:BenchmarkConfig"
+        ),
+    )
+"""
+
+_ROOT_MODULE = """from ellar.common import Module
+from ellar.core import ModuleBase
+
+{imports}
+
+
+@Module(modules=[{modules}])
+class ApplicationModule(ModuleBase):
+    pass
+"""
+
+_MODULE = """from ellar.common import Module
+from ellar.core import ModuleBase
+
+import ellar_cli.click as click
+
+
+@click.command(name="command-{index:04d}")
+@click.option("--count", type=int, default=1, help="Number of greetings.")
+@click.argument("name", required=False)
+def command_{index:04d}(count: int, name: str):
+    \"\"\"Synthetic command {index}\"\"\"
+    for _ in range(count):
+        click.echo(f"Hello {{name}} from module {index}")
+
+
+@Module(commands=[command_{index:04d}])
+class Module{index:04d}(ModuleBase):
+    pass
+"""
+
+
+def generate_project(directory: str, modules: int) -> str:
+    """Writes a project with `modules` modules in `directory`. Returns the project directory."""
+    project_dir = os.path.join(directory, f"project_{modules}")
+    package_dir = os.path.join(project_dir, PROJECT_NAME)
+    modules_dir = os.path.join(package_dir, "modules")
+    os.makedirs(modules_dir)
+
+    files = {
+        os.path.join(project_dir, "pyproject.toml"): _PY_PROJECT.format(
+            name=PROJECT_NAME
+        ),
+        os.path.join(package_dir, "__init__.py"): "",
+        os.path.join(package_dir, "config.py"): _CONFIG.format(name=PROJECT_NAME),
+        os.path.join(package_dir, "server.py"): _SERVER.format(name=PROJECT_NAME),
+        os.path.join(modules_dir, "__init__.py"): "",
+        os.path.join(package_dir, "root_module.py"): _ROOT_MODULE.format(
+            imports="\n".join(
+                f"from .modules.module_{index:04d} import Module{index:04d}"
+                for index in range(modules)
+            ),
+            modules=", ".join(f"Module{index:04d}" for index in range(modules)),
+        ),
+    }
+    for index in range(modules):
+        files[os.path.join(modules_dir, f"module_{index:04d}.py")] = _MODULE.format(
+            index=index
+        )
+
+    for path, content in files.items():
+        with open(path, mode="w") as fw:
+            fw.write(content)
+    return project_dir
+
+
+def _clear_caches(project_dir: str) -> None:
+    shutil.rmtree(os.path.join(project_dir, ".ellar"), ignore_errors=True)
+    for dir_path, dir_names, _ in os.walk(project_dir):
+        if "__pycache__" in dir_names:
+            shutil.rmtree(os.path.join(dir_path, "__pycache__"))
+
+
+def _summary(samples: t.List[float]) -> t.Dict[str, t.Any]:
+    return {
+        "runs": len(samples),
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def _env() -> t.Dict[str, str]:
+    env = dict(os.environ)
+    env.pop("ELLAR_CONFIG_MODULE", None)
+    # measures the CLI itself, not a resident daemon
+    env["ELLAR_DAEMON"] = "0"
+    return env
+
+
+def _time_cli(project_dir: str, args: t.List[str], cold: bool) -> float:
+    if cold:
+        _clear_caches(project_dir)
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-m", "ellar_cli.cli", *args],
+        cwd=project_dir,
+        env=_env(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    duration = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise click.ClickException(
+            f"`ellar {' '.join(args)}` failed:\n{result.stderr.decode()}"
+        )
+    return duration
+
+
+def benchmark_cli(
+    project_dir: str, args: t.List[str], repeat: int
+) -> t.Dict[str, t.Any]:
+    cold = [_time_cli(project_dir, args, cold=True) for _ in range(repeat)]
+    # leaves the caches of the last cold run for the warm runs
+    warm = [_time_cli(project_dir, args, cold=False) for _ in range(repeat)]
+    return {"cold": _summary(cold), "warm": _summary(warm)}
+
+
+def _run_in_process_benchmarks(repeat: int) -> t.Dict[str, t.Any]:
+    """Runs in a fresh interpreter in the project directory. See `--worker`"""
+    from ellar.threading.sync_worker import execute_async_context_manager
+
+    from ellar_cli.main import create_ellar_cli
+    from ellar_cli.service import EllarCLIService
+
+    sys.path.insert(0, os.getcwd())
+    os.environ["ELLAR_COMMAND_MANIFEST"] = "0"
+
+    def _dispatch() -> float:
+        cli = create_ellar_cli()
+        ctx = click.Context(cli)
+        ctx.params["project"] = "default"
+
+        start = time.perf_counter()
+        command = cli.get_command(ctx, "command-0000")
+        duration = (time.perf_counter() - start) * 1000
+        assert command is not None
+        return duration
+
+    # the first dispatch also imports the project modules
+    dispatch_cold = [_dispatch()]
+    dispatch_warm = [_dispatch() for _ in range(repeat)]
+
+    meta_ = EllarCLIService.import_project_meta()
+    assert meta_ is not None
+    meta_.import_application()
+
+    def _injector_context() -> float:
+        start = time.perf_counter()
+        with execute_async_context_manager(meta_.get_application_context()):
+            pass
+        return (time.perf_counter() - start) * 1000
+
+    context_cold = [_injector_context()]
+    context_warm = [_injector_context() for _ in range(repeat)]
+
+    return {
+        "dispatch": {"cold": _summary(dispatch_cold), "warm": _summary(dispatch_warm)},
+        "injector_context": {
+            "cold": _summary(context_cold),
+            "warm": _summary(context_warm),
+        },
+    }
+
+
+def benchmark_in_process(project_dir: str, repeat: int) -> t.Dict[str, t.Any]:
+    cold_runs: t.List[t.Dict[str, t.Any]] = []
+    for _ in range(repeat):
+        _clear_caches(project_dir)
+        result = subprocess.run(
+            [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--worker",
+                "--repeat",
+                str(repeat),
+            ],
+            cwd=project_dir,
+            env=_env(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        if result.returncode != 0:
+            raise click.ClickException(
+                f"In-process benchmarks failed:\n{result.stderr.decode()}"
+            )
+        cold_runs.append(json.loads(result.stdout.decode().splitlines()[-1]))
+
+    def _merge(name: str) -> t.Dict[str, t.Any]:
+        return {
+            kind: {
+                "runs": sum(run[name][kind]["runs"] for run in cold_runs),
+                "min_ms": min(run[name][kind]["min_ms"] for run in cold_runs),
+                "median_ms": round(
+                    statistics.median(
+                        run[name][kind]["median_ms"] for run in cold_runs
+                    ),
+                    3,
+                ),
+                "max_ms": max(run[name][kind]["max_ms"] for run in cold_runs),
+            }
+            for kind in ("cold", "warm")
+        }
+
+    return {
+        "get_command": _merge("dispatch"),
+        "with_injector_context": _merge("injector_context"),
+    }
+
+
+def run_benchmarks(
+    sizes: t.Sequence[int], repeat: int, directory: t.Optional[str] = None
+) -> t.Dict[str, t.Any]:
+    import ellar
+
+    import ellar_cli
+
+    results: t.List[t.Dict[str, t.Any]] = []
+    with tempfile.TemporaryDirectory(dir=directory) as tmp_dir:
+        for size in sizes:
+            project_dir = generate_project(tmp_dir, size)
+            benchmarks = {
+                "ellar --help": benchmark_cli(project_dir, ["--help"], repeat),
+                "ellar <cmd> --help": benchmark_cli(
+                    project_dir, ["command-0000", "--help"], repeat
+                ),
+                **benchmark_in_process(project_dir, repeat),
+            }
+            for name, timings in benchmarks.items():
+                results.append({"modules": size, "benchmark": name, **timings})
+                click.echo(
+                    f"{size:>5} modules  {name:<22} cold {timings['cold']['median_ms']:>9.1f} ms"
+                    f"  warm {timings['warm']['median_ms']:>9.1f} ms",
+                    err=True,
+                )
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "ellar": ellar.__version__,
+            "ellar_cli": ellar_cli.__version__,
+        },
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+@click.command(name="startup-benchmarks")
+@click.option(
+    "--sizes",
+    default=",".join(str(size) for size in DEFAULT_SIZES),
+    show_default=True,
+    help="Comma separated numbers of modules of the generated projects.",
+)
+@click.option("--repeat", type=click.IntRange(min=1), default=5, show_default=True)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write the results to this JSON file instead of stdout.",
+)
+@click.option("--worker", is_flag=True, hidden=True)
+def main(sizes: str, repeat: int, output: t.Optional[str], worker: bool) -> None:
+    if worker:
+        click.echo(json.dumps(_run_in_process_benchmarks(repeat)))
+        return
+
+    results = run_benchmarks(
+        [int(size) for size in sizes.split(",") if size.strip()], repeat
+    )
+    content = json.dumps(results, indent=2)
+    if output:
+        with open(output, mode="w") as fw:
+            fw.write(content)
+    else:
+        click.echo(content)
+
+
+if __name__ == "__main__":
+    main()
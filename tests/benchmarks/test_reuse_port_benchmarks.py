@@ -0,0 +1,20 @@
+import os
+
+import pytest
+from reuse_port import run_benchmarks
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork")
+def test_run_benchmarks_reports_requests_per_worker(tmp_path):
+    results = run_benchmarks(
+        workers=2, requests=60, concurrency=4, directory=str(tmp_path)
+    )
+
+    assert [item["mode"] for item in results["results"]] == [
+        "shared-socket",
+        "reuse-port",
+    ]
+    for item in results["results"]:
+        assert len(item["requests_per_worker"]) == 2
+        assert sum(item["requests_per_worker"]) == 60
+        assert item["requests_per_second"] > 0
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+from startup import generate_project, run_benchmarks
+
+
+def test_generated_project_registers_module_commands(tmp_path):
+    project_dir = generate_project(str(tmp_path), 3)
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "ellar_cli.cli",
+            "command-0002",
+            "--count",
+            "2",
+            "bench",
+        ],
+        cwd=project_dir,
+        stdout=subprocess.PIPE,
+        env={
+            key: value
+            for key, value in os.environ.items()
+            if key != "ELLAR_CONFIG_MODULE"
+        },
+    )
+    assert result.returncode == 0
+    assert result.stdout == b"Hello bench from module 2\nHello bench from module 2\n"
+
+
+def test_run_benchmarks_reports_cold_and_warm_timings(tmp_path):
+    results = run_benchmarks([2], repeat=1, directory=str(tmp_path))
+
+    assert [item["benchmark"] for item in results["results"]] == [
+        "ellar --help",
+        "ellar <cmd> --help",
+        "get_command",
+        "with_injector_context",
+    ]
+    for item in results["results"]:
+        assert item["modules"] == 2
+        assert item["cold"]["runs"] == 1
+        assert item["warm"]["median_ms"] > 0
@@ -0,0 +1,74 @@
+import ellar_cli.click as click
+from ellar_cli.click.lazy import (
+    LazyCommand,
+    LazyGroup,
+    command_from_spec,
+    command_to_spec,
+)
+
+
+@click.group(name="tools")
+def tools():
+    pass
+
+
+@tools.command(name="greet", with_injector_context=False)
+@click.argument("name", help="Who to greet")
+@click.option("--times", type=int, default=1, help="Number of greetings")
+@click.option("--shout/--no-shout", default=False)
+@click.option("--mode", type=click.Choice(["fast", "slow"]), default="fast")
+def greet(name, times, shout, mode):
+    """Greets NAME"""
+    for _ in range(times):
+        click.echo(name.upper() if shout else name)
+
+
+def test_command_to_spec_records_command_description():
+    spec = command_to_spec(tools)
+    assert spec["name"] == "tools"
+    assert spec["import"] == f"{__name__}:tools"
+
+    greet_spec = spec["commands"][0]
+    assert greet_spec["import"] == f"{__name__}:greet"
+    assert greet_spec["help"] == "Greets NAME"
+    assert [param["name"] for param in greet_spec["params"]] == [
+        "name",
+        "times",
+        "shout",
+        "mode",
+    ]
+    assert greet_spec["params"][3]["type"]["choices"] == ["fast", "slow"]
+
+
+def test_lazy_command_help_is_served_without_loading(cli_runner):
+    loaded = []
+
+    def _loader(ctx):
+        loaded.append(ctx)
+        return tools
+
+    lazy_tools = command_from_spec(command_to_spec(tools), _loader)
+    assert isinstance(lazy_tools, LazyGroup)
+    assert isinstance(lazy_tools.commands["greet"], LazyCommand)
+
+    res = cli_runner.invoke(lazy_tools, ["greet", "--help"])
+    assert res.exit_code == 0
+    assert "Greets NAME" in res.output
+    assert "--shout / --no-shout" in res.output
+    assert "[fast|slow]" in res.output
+    assert loaded == []
+
+
+def test_lazy_command_is_loaded_on_invoke(cli_runner):
+    loaded = []
+
+    def _loader(ctx):
+        loaded.append(ctx)
+        return tools
+
+    lazy_tools = command_from_spec(command_to_spec(tools), _loader)
+
+    res = cli_runner.invoke(lazy_tools, ["greet", "ellar", "--times", "2", "--shout"])
+    assert res.exit_code == 0, res.output
+    assert res.output == "ELLAR\nELLAR\n"
+    assert len(loaded) == 1
@@ -0,0 +1,212 @@
+import asyncio
+import json
+
+import pytest
+from ellar.core import Config, current_injector
+
+import ellar_cli.click as click
+from ellar_cli.click.pipeline import read_items
+from ellar_cli.event_loop import run_coroutine
+from ellar_cli.main import create_ellar_cli
+from ellar_cli.testing import EllarCliRunner
+
+
+def test_run_fan_out_bounds_concurrency_and_reads_lazily():
+    produced = []
+    running = []
+    max_running = []
+    max_pending = []
+
+    def items():
+        for index in range(100):
+            produced.append(index)
+            yield index
+
+    async def handler(item):
+        running.append(item)
+        max_running.append(len(running))
+        await asyncio.sleep(0)
+        running.remove(item)
+        max_pending.append(len(produced) - item)
+
+    stats = run_coroutine(
+        click.run_fan_out(handler, items(), concurrency=4, progress_interval=0)
+    )
+    assert (stats.succeeded, stats.failed, stats.processed) == (100, 0, 100)
+    assert max(max_running) == 4
+    # the source is only read ahead by the queue size and the running calls
+    assert max(max_pending) <= 4 * 2 + 4 + 1
+
+
+def test_run_fan_out_batches_async_source():
+    batches = []
+
+    async def items():
+        for index in range(10):
+            yield index
+
+    async def handler(batch):
+        batches.append(batch)
+
+    stats = run_coroutine(
+        click.run_fan_out(
+            handler, items(), concurrency=2, batch_size=4, progress_interval=0
+        )
+    )
+    assert stats.processed == 10
+    assert sorted(batches) == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+def test_run_fan_out_writes_failed_items(tmp_path):
+    failed_file = str(tmp_path / "failed.txt")
+
+    async def handler(item):
+        if item in ("b", "d"):
+            raise ValueError(f"bad {item}")
+
+    stats = run_coroutine(
+        click.run_fan_out(
+            handler, ["a", "b", "c", "d"], progress_interval=0, failed_file=failed_file
+        )
+    )
+    assert (stats.succeeded, stats.failed) == (2, 2)
+    assert sorted(read_items(failed_file)) == ["b", "d"]
+    errors = [json.loads(line) for line in read_items(f"{failed_file}.errors")]
+    assert sorted(error["error"] for error in errors) == [
+        "ValueError('bad b')",
+        "ValueError('bad d')",
+    ]
+
+
+def test_run_fan_out_resumes_from_failed_file(tmp_path):
+    failed_file = tmp_path / "failed.txt"
+    failed_file.write_text("".join(f"{index}\n" for index in range(10)))
+    handled = []
+
+    async def handler(item):
+        handled.append(item)
+        if int(item) % 2 or item == "4":
+            raise ValueError(item)
+
+    # the failed items of the run replace its input once it's read
+    stats = run_coroutine(
+        click.run_fan_out(
+            handler,
+            read_items(str(failed_file)),
+            progress_interval=0,
+            failed_file=str(failed_file),
+        )
+    )
+    assert (stats.succeeded, stats.failed) == (4, 6)
+    assert sorted(handled) == [str(index) for index in range(10)]
+    assert sorted(read_items(str(failed_file))) == ["1", "3", "4", "5", "7", "9"]
+
+    handled.clear()
+    stats = run_coroutine(
+        click.run_fan_out(
+            handler,
+            read_items(str(failed_file)),
+            progress_interval=0,
+            failed_file=str(failed_file),
+        )
+    )
+    assert sorted(handled) == ["1", "3", "4", "5", "7", "9"]
+    assert stats.failed == 6
+    assert not [path for path in tmp_path.iterdir() if path.suffix == ".tmp"]
+
+
+def test_run_fan_out_writes_pending_items_when_interrupted(tmp_path):
+    failed_file = str(tmp_path / "failed.txt")
+    started = asyncio.Event()
+
+    async def handler(batch):
+        if 4 in batch:
+            started.set()
+            await asyncio.sleep(60)
+
+    async def main():
+        run = asyncio.ensure_future(
+            click.run_fan_out(
+                handler,
+                range(100),
+                concurrency=1,
+                batch_size=2,
+                progress_interval=0,
+                failed_file=failed_file,
+            )
+        )
+        await started.wait()
+        run.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await run
+
+    run_coroutine(main())
+    # the batch being handled, the queued ones and those never read
+    assert [int(item) for item in read_items(failed_file)] == list(range(4, 100))
+    errors = [json.loads(line) for line in read_items(f"{failed_file}.errors")]
+    assert errors[0] == {"item": 4, "error": "not processed, the run was interrupted"}
+
+
+def test_run_fan_out_reports_progress(capsys):
+    async def handler(item):
+        await asyncio.sleep(0.02)
+
+    run_coroutine(
+        click.run_fan_out(handler, range(5), concurrency=1, progress_interval=0.03)
+    )
+    assert "processed, 0 failed" in capsys.readouterr().err
+
+
+@pytest.fixture
+def fan_out_cli(change_os_dir):
+    cli = create_ellar_cli("example_project.server:application")
+    handled = []
+
+    @cli.command(name="handle-items")
+    @click.option("--prefix", default="item")
+    @click.fan_out(concurrency=2, progress_interval=0)
+    async def handle_items(item, prefix):
+        if item == "fail":
+            raise RuntimeError("failed")
+        handled.append(
+            f"{prefix}-{item}-{current_injector.get(Config).APPLICATION_NAME}"
+        )
+
+    async def numbers(count):
+        for index in range(count):
+            yield index
+
+    @cli.command(name="handle-numbers")
+    @click.option("--count", type=int, default=3)
+    @click.fan_out(batch_size=2, source=numbers, progress_interval=0)
+    async def handle_numbers(batch, count):
+        handled.append(batch)
+
+    return cli, handled
+
+
+def test_fan_out_command_reads_stdin(fan_out_cli, tmp_path):
+    cli, handled = fan_out_cli
+    failed_file = tmp_path / "failed.txt"
+
+    result = EllarCliRunner().invoke(
+        cli,
+        ["handle-items", "--prefix", "x", "--failed-file", str(failed_file)],
+        input="a\n\nfail\nb\n",
+    )
+    assert result.exit_code == 1, result.output
+    assert sorted(handled) == ["x-a-example_project", "x-b-example_project"]
+    assert failed_file.read_text() == "fail\n"
+    assert "Done: 3 processed, 1 failed" in result.stderr
+
+
+def test_fan_out_command_with_source(fan_out_cli):
+    cli, handled = fan_out_cli
+
+    result = EllarCliRunner().invoke(cli, ["handle-numbers", "--count", "5"])
+    assert result.exit_code == 0, result.output
+    assert sorted(handled) == [[0, 1], [2, 3], [4]]
+
+    help_result = EllarCliRunner().invoke(cli, ["handle-numbers", "--help"])
+    assert "--batch-size" in help_result.output
+    assert "--input TEXT" not in help_result.output
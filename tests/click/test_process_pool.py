@@ -0,0 +1,107 @@
+import gc
+import operator
+import os
+
+import pytest
+from ellar.core import Config, current_injector
+
+import ellar_cli.click as click
+from ellar_cli.main import create_ellar_cli
+from ellar_cli.testing import EllarCliRunner
+
+
+def test_run_in_processes_keeps_order_across_workers():
+    offset = 10
+
+    def square(item):
+        # closures can't be pickled, workers inherit them
+        return item * item + offset, os.getpid()
+
+    results = list(click.run_in_processes(square, range(50), workers=3, chunk_size=2))
+    assert [value for value, _ in results] == [i * i + 10 for i in range(50)]
+    pids = {pid for _, pid in results}
+    assert os.getpid() not in pids
+    assert len(pids) <= 3
+
+
+def test_run_in_processes_with_single_worker_runs_in_process():
+    results = list(click.run_in_processes(lambda _: os.getpid(), range(3), workers=1))
+    assert results == [os.getpid()] * 3
+
+
+def test_run_in_processes_raises_worker_errors():
+    def fail(item):
+        raise ValueError(item)
+
+    with pytest.raises(ValueError):
+        list(click.run_in_processes(fail, range(3), workers=2))
+
+
+def test_run_in_processes_interleaved():
+    def square(item):
+        return item * item
+
+    squares = click.run_in_processes(square, range(50), workers=2, chunk_size=1)
+    negated = click.run_in_processes(operator.neg, range(50), workers=2, chunk_size=1)
+    assert list(zip(squares, negated)) == [(i * i, -i) for i in range(50)]
+    assert gc.get_freeze_count() == 0
+
+
+def test_run_in_processes_leaves_objects_frozen_by_others():
+    gc.freeze()
+    try:
+        frozen = gc.get_freeze_count()
+        results = click.run_in_processes(operator.neg, range(10), workers=2)
+        assert list(results) == [-i for i in range(10)]
+        assert gc.get_freeze_count() == frozen
+    finally:
+        gc.unfreeze()
+
+
+def test_parallel_fails_for_coroutines():
+    with pytest.raises(AssertionError):
+
+        @click.parallel()
+        async def handler(item):
+            pass
+
+
+@pytest.fixture
+def parallel_cli(change_os_dir):
+    cli = create_ellar_cli("example_project.server:application")
+
+    @cli.command(name="describe")
+    @click.option("--suffix", default="!")
+    @click.parallel(workers=2, chunk_size=1)
+    def describe(item, suffix):
+        config = current_injector.get(Config)
+        return f"{item}-{config.APPLICATION_NAME}{suffix}"
+
+    def total(results, count):
+        click.echo(sum(results))
+
+    @cli.command(name="total")
+    @click.option("--count", type=int, default=10)
+    @click.parallel(source=lambda count: range(count), merge=total)
+    def square(item, count):
+        return item * item
+
+    return cli
+
+
+def test_parallel_command_runs_in_workers_with_injector(parallel_cli):
+    result = EllarCliRunner().invoke(
+        parallel_cli, ["describe", "--suffix", "?"], input="a\nb\n\nc\n"
+    )
+    assert result.exit_code == 0, result.output
+    assert result.stdout == (
+        "a-example_project?\nb-example_project?\nc-example_project?\n"
+    )
+
+
+def test_parallel_command_with_source_and_merge(parallel_cli):
+    result = EllarCliRunner().invoke(
+        parallel_cli, ["total", "--count", "5", "--workers", "2"]
+    )
+    assert result.exit_code == 0, result.output
+    assert result.stdout == "30\n"
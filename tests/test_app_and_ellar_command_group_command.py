@@ -2,6 +2,8 @@ import importlib
 import subprocess
 from unittest import mock
 
+from ellar.app import App
+
 runserver = importlib.import_module("ellar_cli.manage_commands.runserver")
 
 
@@ -98,7 +100,7 @@ def test_running_example_project_1_works(cli_runner, change_os_dir):
 
         assert mock_run.called
         assert mock_run.call_args.kwargs["factory"] is False
-        assert mock_run.call_args.args == ("example_project.server:application",)
+        assert isinstance(mock_run.call_args.args[0], App)
 
 
 def test_running_example_project_2_works(cli_runner, change_os_dir):
@@ -108,6 +110,20 @@ def test_running_example_project_2_works(cli_runner, change_os_dir):
         )
         assert result.exit_code == 0
 
+        assert mock_run.called
+        assert mock_run.call_args.kwargs["factory"] is False
+        assert isinstance(mock_run.call_args.args[0], App)
+
+
+def test_running_example_project_2_with_reload_passes_factory(
+    cli_runner, change_os_dir
+):
+    with mock.patch.object(runserver, "uvicorn_run") as mock_run:
+        result = cli_runner.invoke_ellar_command(
+            ["--project", "example_project_2", "runserver", "--reload"]
+        )
+        assert result.exit_code == 0
+
         assert mock_run.called
         assert mock_run.call_args.kwargs["factory"] is True
         assert mock_run.call_args.args == ("example_project_2.server:bootstrap",)
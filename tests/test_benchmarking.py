@@ -0,0 +1,213 @@
+import asyncio
+import json
+
+import pytest
+from ellar.app import AppFactory
+from ellar.common import Controller, ControllerBase, get, post
+from pydantic import BaseModel
+
+from ellar_cli.benchmarking import (
+    BenchRoute,
+    LatencyHistogram,
+    benchmark_route,
+    build_requests,
+    filter_routes,
+    get_routes,
+    lifespan,
+    percentile,
+)
+from ellar_cli.service import EllarCLIException
+
+
+class Item(BaseModel):
+    name: str
+
+
+@Controller("/items")
+class ItemController(ControllerBase):
+    @get("/")
+    def list_items(self):
+        return []
+
+    @get("/{item_id:int}")
+    def get_item(self, item_id: int):
+        return {"id": item_id}
+
+    @post("/")
+    def create_item(self, item: Item):
+        return item
+
+
+def test_percentile():
+    values = [float(value) for value in range(1, 1001)]
+    assert percentile(values, 50) == 500
+    assert percentile(values, 99) == 990
+    assert percentile(values, 99.9) == 999
+    assert percentile(values, 100) == 1000
+    assert percentile([3.0], 0) == 3.0
+    assert percentile([], 50) == 0.0
+
+
+def test_get_routes_of_an_ellar_application():
+    app = AppFactory.create_app(controllers=[ItemController])
+    routes = filter_routes(get_routes(app.routes), ["/items/*"])
+    assert sorted(route.key for route in routes) == [
+        "GET /items/",
+        "GET /items/{item_id:int}",
+        "POST /items/",
+    ]
+    assert filter_routes(routes, ["POST *"]) == [
+        BenchRoute("POST", "/items/", "create_item")
+    ]
+
+
+def test_build_requests_from_fixtures():
+    route = BenchRoute("POST", "/items/{item_id:int}/{slug}", None)
+
+    (default_request,) = build_requests(route, [])
+    assert default_request.scope["path"] == "/items/1/bench"
+    assert default_request.body == b""
+
+    first, second = build_requests(
+        route,
+        [
+            {"path_params": {"item_id": 7}, "json": {"name": "a"}},
+            {"query": {"q": "x"}, "headers": {"X-Token": "t"}, "body": "raw"},
+        ],
+    )
+    assert first.scope["path"] == "/items/7/bench"
+    assert json.loads(first.body) == {"name": "a"}
+    assert (b"content-type", b"application/json") in first.scope["headers"]
+    assert second.scope["query_string"] == b"q=x"
+    assert (b"x-token", b"t") in second.scope["headers"]
+    assert (b"content-length", b"3") in second.scope["headers"]
+
+
+def test_benchmark_route_records_latencies_and_statuses():
+    calls = []
+
+    async def app(scope, receive, send):
+        calls.append(scope["path"])
+        if scope["path"] == "/fail":
+            raise RuntimeError("failed")
+        await receive()
+        status = 201 if scope["path"] == "/created" else 200
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+    route = BenchRoute("GET", "/{name}", None)
+    requests = build_requests(
+        route,
+        [{"path_params": {"name": name}} for name in ("created", "ok", "fail")],
+    )
+    result = asyncio.run(
+        benchmark_route(app, route, requests, concurrency=3, duration=0.2, warmup=0.05)
+    )
+
+    assert result.requests == len(result.latencies) > 0
+    assert len(calls) > result.requests
+    assert result.latencies == sorted(result.latencies)
+    assert set(result.statuses) == {"200", "201", "error"}
+    assert result.failed == result.statuses["error"]
+    assert set(result.to_dict()["latency_ms"]) == {"p50", "p90", "p99", "p99.9"}
+
+
+def test_lifespan_runs_startup_and_shutdown():
+    events = []
+
+    async def app(scope, receive, send):
+        assert scope["type"] == "lifespan"
+        while True:
+            message = await receive()
+            events.append(message["type"])
+            if message["type"] == "lifespan.startup":
+                scope["state"]["ready"] = True
+                await send({"type": "lifespan.startup.complete"})
+            else:
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def main():
+        async with lifespan(app) as state:
+            assert state == {"ready": True}
+            events.append("running")
+
+    asyncio.run(main())
+    assert events == ["lifespan.startup", "running", "lifespan.shutdown"]
+
+
+def test_lifespan_fails_when_startup_fails():
+    async def app(scope, receive, send):
+        await receive()
+        await send({"type": "lifespan.startup.failed", "message": "no database"})
+
+    async def main():
+        async with lifespan(app):
+            pass  # pragma: no cover
+
+    with pytest.raises(EllarCLIException, match="no database"):
+        asyncio.run(main())
+
+
+def test_lifespan_is_optional():
+    async def app(scope, receive, send):
+        assert scope["type"] == "http"
+
+    async def main():
+        async with lifespan(app) as state:
+            return state
+
+    assert asyncio.run(main()) == {}
+
+
+def test_latency_histogram_keeps_three_significant_figures():
+    histogram = LatencyHistogram()
+    values = [value * 7 for value in range(1, 100_001)]
+    for value in values:
+        histogram.record(value)
+
+    assert histogram.total_count == len(values)
+    assert histogram.min == 7
+    assert histogram.max == 700_000
+    assert histogram.mean == pytest.approx(350_003.5)
+    assert len(histogram.counts) < 10_000
+    for p in (50, 90, 99, 99.9, 100):
+        expected = percentile(values, p)
+        assert histogram.value_at_percentile(p) == pytest.approx(expected, rel=1e-3)
+
+    # small values are exact
+    small = LatencyHistogram()
+    small.record(1999)
+    assert small.counts == {1999: 1}
+
+
+def test_latency_histogram_corrects_coordinated_omission():
+    histogram = LatencyHistogram()
+    for _ in range(99):
+        histogram.record(100)
+    histogram.record(1000)
+
+    corrected = histogram.corrected(expected_interval=100)
+    # the stall of 1000us held back 9 requests, sent every 100us
+    assert corrected.total_count == 109
+    assert sorted(corrected.counts)[-10:] == [
+        100,
+        200,
+        300,
+        400,
+        500,
+        600,
+        700,
+        800,
+        900,
+        1000,
+    ]
+    assert histogram.value_at_percentile(99) == 100
+    assert corrected.value_at_percentile(99) == 900
+
+    other = LatencyHistogram()
+    other.record(5)
+    corrected.merge(other)
+    assert corrected.total_count == 110
+    assert corrected.min == 5
+    assert corrected.to_dict([50])["p50"] == 0.1
@@ -0,0 +1,52 @@
+import os
+
+import click
+import pytest
+from ellar.common.constants import ELLAR_CONFIG_MODULE
+
+from ellar_cli.click import BootLevel
+from ellar_cli.constants import ELLAR_META
+from ellar_cli.main import create_ellar_cli
+from ellar_cli.service import EllarCLIService
+
+
+@pytest.fixture()
+def project_meta(change_os_dir):
+    return EllarCLIService.import_project_meta()
+
+
+def test_boot_none_does_not_import_the_project(project_meta):
+    project_meta.boot(BootLevel.NONE)
+    assert os.environ.get(ELLAR_CONFIG_MODULE) is None
+    assert project_meta._store.app_instance is None
+
+
+def test_boot_config_loads_config_only(project_meta):
+    project_meta.boot(BootLevel.CONFIG)
+    assert os.environ[ELLAR_CONFIG_MODULE] == "example_project.config:DevelopmentConfig"
+    assert project_meta.get_application_config().APPLICATION_NAME == "example_project"
+    assert project_meta._store.module_tree is None
+    assert project_meta._store.app_instance is None
+
+
+def test_boot_module_tree_does_not_build_application(project_meta):
+    project_meta.boot(BootLevel.MODULE_TREE)
+    assert project_meta.import_root_module() in project_meta.get_module_tree().modules
+    assert project_meta._store.app_instance is None
+
+
+def test_boot_app_builds_application(project_meta):
+    project_meta.boot(BootLevel.APP)
+    assert project_meta._store.app_instance is not None
+
+
+def test_commands_below_module_tree_do_not_load_module_commands(change_os_dir):
+    cli = create_ellar_cli()
+    ctx = click.Context(cli)
+    ctx.params["project"] = "default"
+
+    assert cli.get_command(ctx, "create-module") is cli.commands["create-module"]
+    assert ctx.meta[ELLAR_META].app == "example_project"
+    assert "whatever-you-want" not in cli.commands
+
+    assert cli.get_command(ctx, "whatever-you-want") is not None
@@ -0,0 +1,92 @@
+import json
+import os
+import subprocess
+from unittest import mock
+
+import pytest
+
+from ellar_cli import profiling
+
+
+@pytest.fixture
+def cli_timings():
+    timings = profiling.start_cli_timings()
+    yield timings
+    profiling._cli_timings = None
+
+
+def test_cli_phase_does_nothing_without_timings():
+    assert profiling.get_cli_timings() is None
+    with profiling.cli_phase("command"):
+        pass
+
+
+def test_cli_phase_records_reentered_phase_once(cli_timings):
+    with profiling.cli_phase("command"):
+        with profiling.cli_phase("command"):
+            pass
+    assert [phase["name"] for phase in cli_timings.to_list()] == ["command"]
+
+
+def test_cli_timed_context_records_enter_and_exit(cli_timings):
+    context_manager = mock.MagicMock()
+    with pytest.raises(RuntimeError):
+        with profiling.cli_timed_context(context_manager, "enter", "exit"):
+            raise RuntimeError()
+
+    assert context_manager.__exit__.call_args[0][0] is RuntimeError
+    assert [phase["name"] for phase in cli_timings.to_list()] == ["enter", "exit"]
+
+
+def test_timings_option_prints_phases_as_json(change_os_dir):
+    result = subprocess.run(
+        [
+            "ellar",
+            "--timings",
+            "--timings-format",
+            "json",
+            "db",
+            "command-with-context",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    assert result.returncode == 0
+    assert result.stdout == (
+        b"Running a command with application context - example_project\n"
+    )
+    output = json.loads(result.stderr.splitlines()[-1])
+    phases = [phase["name"] for phase in output["phases"]]
+    assert phases[:2] == ["import_ellar", "import_project_meta"]
+    assert phases[-4:] == [
+        "import_application",
+        "injector_context",
+        "command",
+        "teardown",
+    ]
+    assert output["total_ms"] >= sum(phase["duration_ms"] for phase in output["phases"])
+
+
+def test_timings_env_prints_phase_table(change_os_dir):
+    result = subprocess.run(
+        ["ellar", "whatever-you-want"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env={**os.environ, "ELLAR_TIMINGS": "1"},
+    )
+    assert result.returncode == 0
+    assert result.stdout == b"Whatever you want command\n"
+    lines = result.stderr.decode().splitlines()
+    assert lines[0].split() == ["start", "ms", "total", "ms", "phase"]
+    assert lines[-1].split()[-1] == "total"
+
+
+def test_no_timings_by_default(change_os_dir):
+    result = subprocess.run(
+        ["ellar", "whatever-you-want"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        env={k: v for k, v in os.environ.items() if k != "ELLAR_TIMINGS"},
+    )
+    assert result.returncode == 0
+    assert result.stderr == b""
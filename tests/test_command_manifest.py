@@ -0,0 +1,94 @@
+import os
+import shutil
+from unittest import mock
+
+from ellar.app import AppFactory
+from ellar.common.constants import ELLAR_CONFIG_MODULE
+
+from ellar_cli.constants import ELLAR_COMMAND_MANIFEST_ENV
+from ellar_cli.service import CommandManifest, EllarCLIService
+
+
+def test_command_manifest_is_written_and_reused(cli_runner, change_os_dir):
+    shutil.rmtree(".ellar", ignore_errors=True)
+
+    result = cli_runner.invoke_ellar_command(["--help"])
+    assert result.exit_code == 0
+    assert os.path.exists(os.path.join(".ellar", "commands.example_project.json"))
+
+    with mock.patch.object(
+        AppFactory,
+        "read_all_module",
+        side_effect=RuntimeError("Modules should not be read"),
+    ):
+        result = cli_runner.invoke_ellar_command(["--help"])
+        assert result.exit_code == 0
+        assert "whatever-you-want" in result.output
+        assert "Whatever you want" in result.output
+
+        result = cli_runner.invoke_ellar_command(["db", "create-migration", "--help"])
+        assert result.exit_code == 0
+        assert "Creates Database Migration" in result.output
+
+        result = cli_runner.invoke_ellar_command(["whatever-you-want"])
+        assert result.exit_code == 0
+        assert result.output == "Whatever you want command\n"
+
+
+def test_command_manifest_is_not_used_when_disabled(cli_runner, change_os_dir):
+    shutil.rmtree(".ellar", ignore_errors=True)
+
+    result = cli_runner.invoke_ellar_command(
+        ["--help"], env={ELLAR_COMMAND_MANIFEST_ENV: "0"}
+    )
+    assert result.exit_code == 0
+    assert not os.path.exists(".ellar")
+
+
+def test_command_manifest_is_invalidated_by_file_changes(
+    tmp_path, tmp_py_project_path, add_ellar_project_to_py_project
+):
+    add_ellar_project_to_py_project("some_project")
+    package = tmp_path / "some_project"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    command_source = tmp_path / "commands.py"
+    command_source.write_text("")
+
+    manifest = CommandManifest(EllarCLIService.import_project_meta())
+    assert manifest.load() is None
+
+    manifest.save([{"name": "some-command"}], {str(command_source)})
+    assert manifest.load() == [{"name": "some-command"}]
+
+    for path in (tmp_py_project_path, package / "__init__.py", command_source):
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert manifest.load() is None
+
+        manifest.save([{"name": "some-command"}], {str(command_source)})
+        assert manifest.load() == [{"name": "some-command"}]
+
+
+def test_command_manifest_is_invalidated_by_config_changes(
+    tmp_path, monkeypatch, tmp_py_project_path, add_ellar_project_to_py_project
+):
+    add_ellar_project_to_py_project("some_project")
+    (tmp_path / "some_project").mkdir()
+    (tmp_path / "some_project" / "__init__.py").write_text("")
+    config_source = tmp_path / "settings.py"
+    config_source.write_text("")
+    monkeypatch.setenv(ELLAR_CONFIG_MODULE, "settings:DevelopmentConfig")
+
+    manifest = CommandManifest(EllarCLIService.import_project_meta())
+    manifest.save([{"name": "some-command"}], set())
+    assert manifest.load() == [{"name": "some-command"}]
+
+    monkeypatch.setenv(ELLAR_CONFIG_MODULE, "settings:ProductionConfig")
+    assert manifest.load() is None
+    manifest.save([{"name": "some-command"}], set())
+    assert manifest.load() == [{"name": "some-command"}]
+
+    stat = os.stat(config_source)
+    os.utime(config_source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert manifest.load() is None
@@ -17,17 +17,26 @@ good_app_info = """Usage: good_app.py [OPTIONS] COMMAND [ARGS]...
   Ellar, ASGI Python Web framework
 
 Options:
-  --project TEXT  Run Specific Command on a specific project  [default:
-                  default]
-  -v, --version   Show the version and exit.
-  --help          Show this message and exit.
+  --project TEXT                 Run Specific Command on a specific project
+                                 [default: default]
+  -v, --version                  Show the version and exit.
+  --timings                      Print the duration of the CLI phases to
+                                 stderr. Also enabled with ELLAR_TIMINGS=1
+  --timings-format [table|json]  Format of `--timings`. Defaults to table
+  --help                         Show this message and exit.
 
 Commands:
-  create-module  - Scaffolds Ellar Application Module -
+  batch            - Runs many commands under a single application boot -
+  bench            - Benchmarks the routes of the application in-process -
+  create-module    - Scaffolds Ellar Application Module -
+  daemon           - Manages Ellar CLI Daemon -
   failing-1
   failing-2
   failing-3
-  runserver      - Starts Uvicorn Server -
+  loadtest         - Load tests a running server over HTTP -
+  profile-startup  - Profiles Project Startup Phases -
+  runserver        - Starts Uvicorn Server -
+  top              - Shows live statistics of server workers -
   working
 """
 
@@ -0,0 +1,93 @@
+import subprocess
+from unittest import mock
+
+import pytest
+
+from ellar_cli.main import app_cli
+from ellar_cli.manage_commands.batch import parse_batch
+from ellar_cli.service import EllarCLIException, EllarCLIService
+from ellar_cli.testing import EllarCliRunner
+
+
+@pytest.mark.parametrize(
+    "content, file_name, input_format",
+    [
+        ("db create-migration\n# comment\n\nsay-hi 'Ellar CLI'\n", "-", "auto"),
+        ('["db create-migration", ["say-hi", "Ellar CLI"]]', "-", "auto"),
+        ("- db create-migration\n- [say-hi, Ellar CLI]\n", "batch.yaml", "auto"),
+        ("- db create-migration\n- say-hi 'Ellar CLI'\n", "-", "yaml"),
+    ],
+)
+def test_parse_batch(content, file_name, input_format):
+    assert parse_batch(content, file_name, input_format) == [
+        ["db", "create-migration"],
+        ["say-hi", "Ellar CLI"],
+    ]
+
+
+@pytest.mark.parametrize("content", ['{"command": "db"}', "[1, 2]"])
+def test_parse_batch_fails_for_invalid_entries(content):
+    with pytest.raises(EllarCLIException):
+        parse_batch(content, "-", "json")
+
+
+def test_batch_runs_commands_in_one_injector_context(change_os_dir):
+    get_application_context = EllarCLIService.get_application_context
+
+    with mock.patch.object(
+        EllarCLIService,
+        "get_application_context",
+        autospec=True,
+        side_effect=get_application_context,
+    ) as application_context_mock:
+        result = EllarCliRunner().invoke(
+            app_cli,
+            ["batch", "-"],
+            input="db command-with-context\nwhatever-you-want\ndb command-with-context\n",
+        )
+
+    assert result.exit_code == 0, result.output
+    assert application_context_mock.call_count == 1
+    assert result.stdout == (
+        "Running a command with application context - example_project\n"
+        "Whatever you want command\n"
+        "Running a command with application context - example_project\n"
+    )
+    assert "ok" in result.stderr
+    assert "whatever-you-want" in result.stderr
+
+
+def test_batch_stops_on_failure(change_os_dir):
+    result = subprocess.run(
+        ["ellar", "batch", "-"],
+        input=b"db create-migration --invalid\nwhatever-you-want\n",
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    assert result.returncode == 2
+    assert result.stdout == b""
+    assert b"No such option: --invalid" in result.stderr
+    assert b"skipped 1 command(s) after a failure" in result.stderr
+
+
+def test_batch_continues_on_failure(change_os_dir):
+    result = subprocess.run(
+        ["ellar", "batch", "-", "--continue-on-failure"],
+        input=b"db create-migration --invalid\nwhatever-you-want\n",
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    assert result.returncode == 2
+    assert result.stdout == b"Whatever you want command\n"
+
+
+def test_batch_fails_before_running_for_unknown_command(change_os_dir):
+    result = subprocess.run(
+        ["ellar", "batch", "-"],
+        input=b"whatever-you-want\nunknown-command\n",
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    assert result.returncode == 1
+    assert result.stdout == b""
+    assert b"No such command 'unknown-command' in batch file." in result.stderr
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+from ellar.common.constants import ELLAR_CONFIG_MODULE
+
+from ellar_cli.main import app_cli
+from ellar_cli.manage_commands.bench import parse_fixtures
+from ellar_cli.service import EllarCLIException
+from ellar_cli.testing import EllarCliRunner
+
+_FAILING_CONTROLLER = """
+
+from ellar.common import Controller, ControllerBase, get
+
+
+@Controller("/failing")
+class FailingController(ControllerBase):
+    @get("/")
+    def fail(self):
+        raise RuntimeError("Failing route")
+
+
+ApplicationModule = Module(modules=[HomeModule], controllers=[FailingController])(
+    type("ApplicationModule", (ModuleBase,), {})
+)
+"""
+
+
+@pytest.mark.parametrize(
+    "content, file_name",
+    [
+        ('{"POST /items/": {"json": {"name": "a"}}}', "fixtures.json"),
+        ("POST /items/:\n  - json:\n      name: a\n", "fixtures.yaml"),
+    ],
+)
+def test_parse_fixtures(content, file_name):
+    assert parse_fixtures(content, file_name) == {
+        "POST /items/": [{"json": {"name": "a"}}]
+    }
+
+
+@pytest.mark.parametrize("content", ["[1, 2]", '{"GET /": [1]}', "{"])
+def test_parse_fixtures_fails_for_invalid_content(content):
+    with pytest.raises(EllarCLIException):
+        parse_fixtures(content, "fixtures.json")
+
+
+def test_bench_fails_without_routes(change_os_dir):
+    result = EllarCliRunner().invoke(app_cli, ["bench"])
+    assert result.exit_code == 1
+    assert "No routes to benchmark." in result.output
+
+
+def test_bench_reports_every_route(
+    tmp_path, process_runner, write_empty_py_project, monkeypatch
+):
+    monkeypatch.delenv(ELLAR_CONFIG_MODULE, raising=False)
+    process_runner(["ellar", "create-project", "bench_project"])
+    (tmp_path / "fixtures.json").write_text(
+        json.dumps({"GET /*": {"headers": {"accept": "text/html"}}})
+    )
+
+    result = process_runner(
+        [
+            "ellar",
+            "bench",
+            "--duration",
+            "0.2",
+            "--warmup",
+            "0",
+            "--concurrency",
+            "2",
+            "--fixtures",
+            "fixtures.json",
+            "--json",
+        ]
+    )
+    assert result.returncode == 0, result.stderr
+    output = json.loads(result.stdout)
+    assert output["concurrency"] == 2
+    (route,) = output["routes"]
+    assert route["route"] == "GET /"
+    assert route["requests"] > 0
+    assert route["statuses"] == {"200": route["requests"]}
+    assert list(route["latency_ms"]) == ["p50", "p90", "p99", "p99.9"]
+
+
+def test_bench_fails_when_a_route_fails(
+    tmp_path, process_runner, write_empty_py_project, monkeypatch
+):
+    monkeypatch.delenv(ELLAR_CONFIG_MODULE, raising=False)
+    process_runner(["ellar", "create-project", "bench_project_2"])
+    with open(tmp_path / "bench_project_2" / "root_module.py", mode="a") as fw:
+        fw.write(_FAILING_CONTROLLER)
+
+    result = process_runner(["ellar", "bench", "--duration", "0.2", "--warmup", "0"])
+    assert result.returncode == 1
+    lines = result.stdout.decode().splitlines()
+    assert lines[0].split() == [
+        "route",
+        "requests",
+        "req/s",
+        "p50",
+        "ms",
+        "p90",
+        "ms",
+        "p99",
+        "ms",
+        "p99.9",
+        "ms",
+        "statuses",
+    ]
+    assert [line.split()[:2] for line in lines[1:]] == [
+        ["GET", "/"],
+        ["GET", "/failing/"],
+    ]
+    assert "500:" in lines[2]
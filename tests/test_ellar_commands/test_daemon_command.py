@@ -0,0 +1,199 @@
+import json
+import os
+import socket
+import stat
+import subprocess
+import sys
+import time
+
+import pytest
+
+from ellar_cli import daemon
+from ellar_cli.daemon import (
+    CLIDaemon,
+    ensure_daemon_dir,
+    forward_to_daemon,
+    get_daemon_paths,
+    send_daemon_request,
+)
+from ellar_cli.main import app_cli
+
+
+@pytest.fixture()
+def running_daemon(change_os_dir):
+    socket_path, _ = get_daemon_paths()
+    process = subprocess.Popen(
+        ["ellar", "daemon", "start", "--foreground"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while not os.path.exists(socket_path):
+            assert process.poll() is None, process.stdout.read()
+            assert time.monotonic() < deadline, "daemon did not start"
+            time.sleep(0.05)
+        yield socket_path
+    finally:
+        subprocess.run(["ellar", "daemon", "stop"], stdout=subprocess.PIPE)
+        process.wait(timeout=10)
+        process.stdout.close()
+
+
+def test_daemon_serves_commands(running_daemon):
+    result = subprocess.run(["ellar", "whatever-you-want"], stdout=subprocess.PIPE)
+    assert result.returncode == 0
+    assert result.stdout == b"Whatever you want command\n"
+
+    result = subprocess.run(
+        ["ellar", "db", "command-with-context"], stdout=subprocess.PIPE
+    )
+    assert result.returncode == 0
+    assert (
+        result.stdout
+        == b"Running a command with application context - example_project\n"
+    )
+
+    result = subprocess.run(["ellar", "unknown-command"], stderr=subprocess.PIPE)
+    assert result.returncode == 2
+    assert b"No such command 'unknown-command'" in result.stderr
+
+    result = subprocess.run(["ellar", "daemon", "status"], stdout=subprocess.PIPE)
+    status = json.loads(result.stdout)
+    assert status["status"] == "running"
+    assert status["project"] == "default"
+    assert status["served"] == 3
+
+
+def test_daemon_rejects_invocations_with_another_config(running_daemon):
+    env = dict(os.environ, ELLAR_CONFIG_MODULE="example_project.config:BaseConfig")
+    result = subprocess.run(
+        ["ellar", "whatever-you-want"], stdout=subprocess.PIPE, env=env
+    )
+    assert result.returncode == 0
+    assert result.stdout == b"Whatever you want command\n"
+
+    env["ELLAR_CONFIG_MODULE"] = "example_project.config:DevelopmentConfig"
+    subprocess.run(["ellar", "whatever-you-want"], stdout=subprocess.PIPE, env=env)
+
+    result = subprocess.run(["ellar", "daemon", "status"], stdout=subprocess.PIPE)
+    # only the invocation with the config of the daemon, the other one ran locally
+    assert json.loads(result.stdout)["served"] == 1
+
+
+def test_daemon_start_fails_when_already_running(running_daemon):
+    result = subprocess.run(
+        ["ellar", "daemon", "start"], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    assert result.returncode == 1
+    assert b"Ellar CLI daemon is already running" in result.stderr
+
+
+def test_daemon_can_be_disabled(running_daemon, monkeypatch):
+    monkeypatch.setenv("ELLAR_DAEMON", "0")
+    assert forward_to_daemon(running_daemon, ["whatever-you-want"], "ellar") is None
+
+
+def test_daemon_status_when_not_running(change_os_dir):
+    result = subprocess.run(["ellar", "daemon", "status"], stdout=subprocess.PIPE)
+    assert result.stdout == b"Ellar CLI daemon is not running.\n"
+
+
+@pytest.mark.parametrize(
+    "args, project",
+    [
+        (["whatever-you-want"], "default"),
+        (["--project", "example_project_2", "say-hi"], "example_project_2"),
+        (["--project=example_project_2", "say-hi"], "example_project_2"),
+        (["say-hi", "--project", "example_project_2"], "default"),
+    ],
+)
+def test_daemon_requested_project(args, project):
+    assert CLIDaemon._get_requested_project({"args": args}) == project
+
+
+@pytest.mark.parametrize(
+    "args, name",
+    [
+        (["daemon", "start"], "daemon"),
+        (["--project", "daemon", "say-hi"], "say-hi"),
+        (["--timings", "--project=x", "daemon", "status"], "daemon"),
+        (["batch", "--name", "daemon"], "batch"),
+        (["--", "daemon"], "daemon"),
+        (["--timings"], None),
+    ],
+)
+def test_invoked_command_name(args, name):
+    assert app_cli._get_command_name(args) == name
+
+
+def test_daemon_client_is_not_imported_without_daemon(change_os_dir, tmp_path):
+    script = (
+        "import sys\n"
+        "from ellar_cli.main import app_cli\n"
+        "try:\n"
+        "    app_cli(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print('ellar_cli.daemon' in sys.modules)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        stdout=subprocess.PIPE,
+        env=dict(os.environ, XDG_RUNTIME_DIR=str(tmp_path)),
+    )
+    assert result.returncode == 0
+    assert result.stdout.splitlines()[-1] == b"False"
+
+
+@pytest.fixture()
+def daemon_socket_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    socket_path, _ = get_daemon_paths()
+    ensure_daemon_dir(socket_path)
+    return socket_path
+
+
+def listen(socket_path: str) -> socket.socket:
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o077)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(umask)
+    server.listen(1)
+    server.setblocking(False)
+    return server
+
+
+def test_daemon_socket_of_another_user_is_never_used(daemon_socket_path, monkeypatch):
+    with listen(daemon_socket_path) as server:
+        if os.getuid() == 0:
+            os.chown(daemon_socket_path, 65534, 65534)
+        else:  # pragma: no cover
+            monkeypatch.setattr(os, "getuid", lambda: 65534)
+        monkeypatch.setattr("ellar_cli.daemon._can_forward_stdio", lambda: True)
+
+        assert forward_to_daemon(daemon_socket_path, ["say-hi"], "ellar") is None
+        assert send_daemon_request(daemon_socket_path, {"command": "status"}) is None
+        # it never connected
+        with pytest.raises(BlockingIOError):
+            server.accept()
+
+
+def test_daemon_files_are_only_accessible_to_the_user(daemon_socket_path, monkeypatch):
+    daemon_dir = os.path.dirname(daemon_socket_path)
+    assert stat.S_IMODE(os.lstat(daemon_dir).st_mode) == 0o700
+    with listen(daemon_socket_path):
+        assert daemon._is_daemon_socket(daemon_socket_path)
+        os.chmod(daemon_dir, 0o755)
+        assert not daemon._is_daemon_socket(daemon_socket_path)
+
+    with pytest.raises(PermissionError, match="only accessible to the current user"):
+        ensure_daemon_dir(daemon_socket_path)
+
+    os.unlink(daemon_socket_path)
+    os.rmdir(daemon_dir)
+    os.symlink(os.path.dirname(daemon_dir), daemon_dir)
+    with pytest.raises(PermissionError):
+        ensure_daemon_dir(daemon_socket_path)
@@ -0,0 +1,285 @@
+import asyncio
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from ellar_cli.loadtest import (
+    LoadTestTarget,
+    build_request,
+    read_response,
+    run_closed_loop,
+    run_open_loop,
+)
+from ellar_cli.main import app_cli
+from ellar_cli.testing import EllarCliRunner
+
+
+class KeepAliveServer:
+    """
+    HTTP/1.1 server answering every request on its connections in a thread. Responses to
+    `/chunked` are chunked, `/close` closes the connection and `/slow` takes 50ms.
+    """
+
+    def __init__(self, uds=None):
+        self.uds = uds
+        self.port = 0
+        self.connections = 0
+        self.requests = []
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        assert self._started.wait(5)
+        return self
+
+    def __exit__(self, *args):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        if self.uds:
+            server = self._loop.run_until_complete(
+                asyncio.start_unix_server(self._handle, self.uds)
+            )
+        else:
+            server = self._loop.run_until_complete(
+                asyncio.start_server(self._handle, "127.0.0.1", 0)
+            )
+            self.port = server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+        server.close()
+        tasks = asyncio.all_tasks(self._loop)
+        for task in tasks:
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self._loop.close()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                request_line = head.split(b"\r\n", 1)[0].decode()
+                length = 0
+                for line in head.split(b"\r\n")[1:]:
+                    name, _, value = line.partition(b":")
+                    if name.lower() == b"content-length":
+                        length = int(value)
+                body = await reader.readexactly(length)
+                self.requests.append((request_line, body))
+
+                path = request_line.split(" ")[1]
+                if path == "/slow":
+                    await asyncio.sleep(0.05)
+                if path == "/chunked":
+                    writer.write(
+                        b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n"
+                        b"3\r\nabc\r\n2;ext=1\r\nde\r\n0\r\nTrailer: x\r\n\r\n"
+                    )
+                elif path == "/close":
+                    writer.write(
+                        b"HTTP/1.1 201 Created\r\nConnection: close\r\n"
+                        b"Content-Length: 2\r\n\r\nok"
+                    )
+                    await writer.drain()
+                    break
+                else:
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def test_read_response():
+    async def _read(data, method="GET"):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        response = await read_response(reader, method)
+        return response, await reader.read()
+
+    assert asyncio.run(
+        _read(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nokNEXT")
+    ) == ((200, True), b"NEXT")
+    assert asyncio.run(
+        _read(
+            b"HTTP/1.1 404 Not Found\r\nTransfer-Encoding: chunked\r\n\r\n"
+            b"1\r\na\r\n0\r\n\r\nNEXT"
+        )
+    ) == ((404, True), b"NEXT")
+    assert asyncio.run(
+        _read(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nNEXT", "HEAD")
+    ) == ((200, True), b"NEXT")
+    assert asyncio.run(_read(b"HTTP/1.0 500 Error\r\n\r\nbody")) == (
+        (500, False),
+        b"",
+    )
+
+
+def test_build_request():
+    assert build_request(
+        "POST", "/items", "127.0.0.1:8000", [("X-Token", "t")], b"{}"
+    ) == (
+        b"POST /items HTTP/1.1\r\nHost: 127.0.0.1:8000\r\nX-Token: t\r\n"
+        b"Content-Length: 2\r\n\r\n{}"
+    )
+
+
+def test_closed_loop_reuses_connections():
+    with KeepAliveServer() as server:
+        target = LoadTestTarget("127.0.0.1", server.port)
+        requests = [
+            ("GET", build_request("GET", path, target.host_header))
+            for path in ("/", "/chunked")
+        ]
+        result = asyncio.run(
+            run_closed_loop(target, requests, connections=3, duration=0.3, warmup=0.1)
+        )
+
+    assert result.requests > 20
+    assert result.statuses == {"200": result.requests}
+    assert result.errors == {}
+    assert server.connections == 3
+    assert result.service_time.total_count == result.requests
+    assert result.expected_interval == result.service_time.value_at_percentile(50)
+    assert result.response_time.total_count >= result.requests
+
+
+def test_closed_loop_reconnects_when_the_server_closes_connections():
+    with KeepAliveServer() as server:
+        target = LoadTestTarget("127.0.0.1", server.port)
+        requests = [("GET", build_request("GET", "/close", target.host_header))]
+        result = asyncio.run(
+            run_closed_loop(target, requests, connections=2, duration=0.2)
+        )
+
+    assert result.statuses == {"201": result.requests}
+    assert server.connections == result.requests
+
+
+def test_open_loop_measures_from_the_scheduled_time(tmp_path):
+    with KeepAliveServer(uds=str(tmp_path / "server.sock")) as server:
+        target = LoadTestTarget("127.0.0.1", 0, uds=server.uds)
+        requests = [("GET", build_request("GET", "/slow", target.host_header))]
+        result = asyncio.run(
+            run_open_loop(target, requests, rate=100, connections=1, duration=0.3)
+        )
+
+    # one connection serves 20 requests per second, requests queue for it
+    assert result.requests == 30
+    assert result.expected_interval == 10_000
+    assert result.service_time.value_at_percentile(50) < 100_000
+    assert result.response_time.value_at_percentile(99) > 500_000
+
+
+def test_loadtest_records_connection_errors():
+    with KeepAliveServer() as server:
+        port = server.port
+    target = LoadTestTarget("127.0.0.1", port)
+    requests = [("GET", build_request("GET", "/", target.host_header))]
+    result = asyncio.run(
+        run_closed_loop(target, requests, connections=1, duration=0.05)
+    )
+    assert result.requests == 0
+    assert result.errors["ConnectionRefusedError"] > 0
+
+
+def test_loadtest_command_json_output(tmp_path):
+    body_file = tmp_path / "body.json"
+    body_file.write_text('{"name": "a"}')
+    output = tmp_path / "results.json"
+
+    with KeepAliveServer() as server:
+        result = EllarCliRunner().invoke(
+            app_cli,
+            [
+                "loadtest",
+                "--port",
+                str(server.port),
+                "--method",
+                "post",
+                "--path",
+                "/items",
+                "--header",
+                "Content-Type: application/json",
+                "--data",
+                f"@{body_file}",
+                "--rate",
+                "50",
+                "--duration",
+                "0.2",
+                "--warmup",
+                "0",
+                "--output",
+                str(output),
+            ],
+        )
+
+    assert result.exit_code == 0, result.output
+    report = json.loads(output.read_text())
+    assert report["target"] == f"http://127.0.0.1:{server.port}"
+    assert report["mode"] == "open"
+    assert report["requests"] == 10
+    assert report["statuses"] == {"200": 10}
+    assert list(report["latency_ms"]["response_time"]) == [
+        "count",
+        "min",
+        "mean",
+        "max",
+        "p50",
+        "p75",
+        "p90",
+        "p99",
+        "p99.9",
+        "p99.99",
+        "p100",
+    ]
+    assert server.requests[0] == ("POST /items HTTP/1.1", b'{"name": "a"}')
+    assert "10 requests" in result.stderr
+
+
+def test_loadtest_command_fails_without_responses(tmp_path):
+    with KeepAliveServer(uds=str(tmp_path / "server.sock")) as server:
+        uds = server.uds
+    os.unlink(uds)
+
+    start = time.monotonic()
+    result = EllarCliRunner().invoke(
+        app_cli,
+        ["loadtest", "--uds", uds, "--duration", "0.1", "--warmup", "0"],
+    )
+    assert time.monotonic() - start < 5
+    assert result.exit_code == 1
+    report = json.loads(result.stdout)
+    assert report["target"] == f"unix:{uds}"
+    assert report["errors"] == {
+        "FileNotFoundError": report["errors"]["FileNotFoundError"]
+    }
+    assert "No request got a response." in result.stderr
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (["--header", "invalid"], "Invalid header 'invalid'"),
+        (
+            ["--rate", "10", "--expected-interval", "5"],
+            "--expected-interval only applies to closed loop load tests",
+        ),
+        (["--data", "@missing.json"], "Can't read the request body"),
+    ],
+)
+def test_loadtest_command_invalid_options(args, message, tmp_path):
+    os.chdir(tmp_path)
+    result = EllarCliRunner().invoke(app_cli, ["loadtest", *args])
+    assert result.exit_code == 1
+    assert message in result.output
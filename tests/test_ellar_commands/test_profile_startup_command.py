@@ -0,0 +1,71 @@
+import json
+import subprocess
+
+from ellar_cli.profiling import PhaseTimings, parse_importtime
+
+IMPORT_TIME_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     encodings.aliases
+import time:       300 |        400 |   encodings
+import time:        50 |         50 |   codecs
+import time:       200 |        650 | site
+some other output
+import time:      1000 |       1000 | json
+"""
+
+
+def test_parse_importtime_builds_import_tree():
+    tree = parse_importtime(IMPORT_TIME_OUTPUT)
+    assert [node.name for node in tree] == ["site", "json"]
+
+    site = tree[0]
+    assert site.cumulative_us == 650
+    assert [node.name for node in site.children] == ["encodings", "codecs"]
+    assert site.children[0].children[0].to_dict() == {
+        "name": "encodings.aliases",
+        "self_us": 100,
+        "cumulative_us": 100,
+        "children": [],
+    }
+
+
+def test_phase_timings_records_phases():
+    timings = PhaseTimings()
+    with timings.phase("first"):
+        pass
+    with timings.phase("second"):
+        pass
+    assert [phase["name"] for phase in timings.to_list()] == ["first", "second"]
+
+
+def test_profile_startup_command_fails_without_project(process_runner):
+    result = process_runner(["ellar", "profile-startup"])
+    assert result.returncode == 1
+    assert b"No available project found" in result.stderr
+
+
+def test_profile_startup_command_json_output(change_os_dir):
+    result = subprocess.run(
+        ["ellar", "profile-startup", "--json"], stdout=subprocess.PIPE
+    )
+    assert result.returncode == 0
+    output = json.loads(result.stdout)
+    assert [phase["name"] for phase in output["phases"]] == [
+        "import_ellar",
+        "import_project_meta",
+        "import_root_module",
+        "read_all_module",
+        "import_application",
+        "injector_context",
+    ]
+    assert "ellar.app" in [node["name"] for node in output["imports"]]
+
+
+def test_profile_startup_command_prints_tree(change_os_dir):
+    result = subprocess.run(
+        ["ellar", "--project", "example_project_2", "profile-startup", "--depth", "1"],
+        stdout=subprocess.PIPE,
+    )
+    assert result.returncode == 0
+    assert b"Startup phases" in result.stdout
+    assert b"import_application" in result.stdout
+    assert b"ellar.app" in result.stdout
@@ -4,6 +4,7 @@ import sys
 from unittest import mock
 
 import pytest
+from ellar.app import App
 
 from ellar_cli.service import EllarCLIService
 
@@ -31,8 +32,9 @@ def test_runserver_command_works(cli_runner, process_runner, write_empty_py_proj
         result = cli_runner.invoke_ellar_command(["runserver"])
     assert result.exit_code == 0, result.stderr
     mock_run.assert_called_once()
-    ellar_cli_service = EllarCLIService.import_project_meta()
-    assert mock_run.call_args[0] == (ellar_cli_service.project_meta.application,)
+    # a single worker without reload is given the application built by the command
+    assert isinstance(mock_run.call_args[0][0], App)
+    assert mock_run.call_args[1]["factory"] is False
 
 
 def test_cli_headers(
@@ -62,6 +64,9 @@ def test_cli_call_change_reload_run(
     assert result.exit_code == 0, result.stderr
     mock_run.assert_called_once()
     assert mock_run.call_args[1]["reload"] is True
+    ellar_cli_service = EllarCLIService.import_project_meta()
+    assert mock_run.call_args[0] == (ellar_cli_service.project_meta.application,)
+    assert mock_run.call_args[1]["factory"] is True
 
 
 def test_cli_call_multiprocess_run(
@@ -74,6 +79,8 @@ def test_cli_call_multiprocess_run(
     assert result.exit_code == 0, result.stderr
     mock_run.assert_called_once()
     assert mock_run.call_args[1]["workers"] == 2
+    ellar_cli_service = EllarCLIService.import_project_meta()
+    assert mock_run.call_args[0] == (ellar_cli_service.project_meta.application,)
 
 
 def test_cli_uds(
@@ -141,3 +148,17 @@ def test_mis_match_env_variables(
     assert result.exit_code == 0, result.output
     _, kwargs = mock_run.call_args
     assert kwargs["http"] == "httptools"
+
+
+def test_runserver_does_not_build_application_for_multiple_workers(
+    cli_runner, process_runner, write_empty_py_project
+):
+    process_runner(["ellar", "create-project", "ellar_project_8"])
+    with mock.patch.object(runserver, "uvicorn_run") as mock_run, mock.patch.object(
+        EllarCLIService, "import_application"
+    ) as mock_import_application:
+        result = cli_runner.invoke_ellar_command(["runserver", "--workers=2"])
+
+    assert result.exit_code == 0, result.output
+    mock_import_application.assert_not_called()
+    assert mock_run.call_args[1]["factory"] is True
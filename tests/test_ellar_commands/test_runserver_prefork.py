@@ -0,0 +1,656 @@
+import importlib
+import os
+import signal
+import socket
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from unittest import mock
+
+import pytest
+from ellar.app import App
+
+from ellar_cli.server.stats import get_stats_path
+
+runserver = importlib.import_module("ellar_cli.manage_commands.runserver")
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork")
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_children(pid: int) -> list:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                fields = stat.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        if int(fields[1]) == pid:
+            children.append(int(entry))
+    return children
+
+
+def is_running(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as stat:
+            return stat.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except OSError:
+        return False
+
+
+def get_cmdline(pid: int) -> bytes:
+    with open(f"/proc/{pid}/cmdline", "rb") as cmdline:
+        return cmdline.read()
+
+
+def http_get(port: int, path: str = "/") -> int:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as res:
+            return res.status
+    except urllib.error.HTTPError as ex:
+        return ex.code
+
+
+class ServerProcess:
+    def __init__(self, args: list) -> None:
+        self.process = subprocess.Popen(
+            ["ellar", "runserver", *args],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+        self.lines: list = []
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+
+    def _read(self) -> None:
+        for line in self.process.stdout:
+            self.lines.append(line.decode())
+
+    @property
+    def output(self) -> str:
+        return "".join(self.lines)
+
+    def wait_for(self, text: str, count: int = 1, timeout: float = 30) -> None:
+        deadline = time.monotonic() + timeout
+        while self.output.count(text) < count:
+            assert self.process.poll() is None, self.output
+            assert time.monotonic() < deadline, self.output
+            time.sleep(0.05)
+
+    def stop(self, timeout: float = 30) -> int:
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+        try:
+            return self.process.wait(timeout=timeout)
+        finally:
+            self._reader.join(timeout=5)
+
+
+@pytest.fixture()
+def run_server(change_os_dir):
+    servers = []
+
+    def _run(*args: str) -> ServerProcess:
+        server = ServerProcess(list(args))
+        servers.append(server)
+        return server
+
+    yield _run
+
+    for server in servers:
+        # workers included
+        try:
+            os.killpg(server.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        server.process.wait()
+        server._reader.join()
+        server.process.stdout.close()
+        # left behind by a killed supervisor
+        stats_path = get_stats_path(server.process.pid)
+        if os.path.exists(stats_path):
+            os.remove(stats_path)
+
+
+def test_preload_serves_with_forked_workers(run_server):
+    port = get_free_port()
+    server = run_server("--preload", "--workers", "2", "--port", str(port))
+    server.wait_for("Application startup complete", count=2)
+
+    # any response at all shows a worker is serving
+    assert http_get(port, "/docs") > 0
+
+    workers = get_children(server.process.pid)
+    assert len(workers) == 2
+    for worker in workers:
+        # forked, not spawned by multiprocessing
+        assert get_cmdline(worker) == get_cmdline(server.process.pid)
+
+    assert server.stop() == 0, server.output
+    assert "Application preloaded, forking 2 worker(s)" in server.output
+    assert "Stopping parent process" in server.output
+
+
+def test_preload_replaces_dead_workers(run_server):
+    port = get_free_port()
+    server = run_server(
+        "--preload", "--gc-freeze", "--workers", "1", "--port", str(port)
+    )
+    server.wait_for("Application startup complete")
+
+    (worker,) = get_children(server.process.pid)
+    os.kill(worker, signal.SIGKILL)
+    server.wait_for("Application startup complete", count=2)
+
+    (replacement,) = get_children(server.process.pid)
+    assert replacement != worker
+    assert http_get(port, "/docs") > 0
+    assert server.stop() == 0, server.output
+
+
+def test_preload_builds_application_once(
+    cli_runner, process_runner, write_empty_py_project
+):
+    process_runner(["ellar", "create-project", "ellar_project_prefork"])
+    with mock.patch("ellar_cli.server.PreforkSupervisor") as mock_supervisor:
+        mock_supervisor.return_value.run.return_value = 0
+        result = cli_runner.invoke_ellar_command(
+            ["runserver", "--preload", "--workers=3", "--gc-freeze"]
+        )
+
+    assert result.exit_code == 0, result.output
+    config, workers = mock_supervisor.call_args[0]
+    assert isinstance(config.app, App)
+    assert workers == 3
+    assert mock_supervisor.call_args[1]["gc_freeze"] is True
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (["--preload", "--reload"], "--preload is not valid with --reload."),
+        (["--gc-freeze"], "--gc-freeze requires --preload."),
+    ],
+)
+def test_preload_invalid_options(
+    args, message, cli_runner, process_runner, write_empty_py_project
+):
+    process_runner(["ellar", "create-project", "ellar_project_prefork_2"])
+    with mock.patch.object(runserver, "uvicorn_run") as mock_run:
+        result = cli_runner.invoke_ellar_command(["runserver", *args])
+
+    assert result.exit_code == 1
+    assert message in result.output
+    mock_run.assert_not_called()
+
+
+def test_pin_workers(run_server):
+    port = get_free_port()
+    cpu = os.sched_getaffinity(0)
+    server = run_server("--pin-workers", "--workers", "1", "--port", str(port))
+    server.wait_for("Application startup complete")
+
+    (worker,) = get_children(server.process.pid)
+    first_cpu = min(cpu)
+    assert os.sched_getaffinity(worker) == {first_cpu}
+    # the supervisor itself is not pinned
+    assert os.sched_getaffinity(server.process.pid) == cpu
+    assert f"Workers pinned to CPUs: worker 0 -> CPU {first_cpu}" in server.output
+    assert server.stop() == 0, server.output
+
+
+def test_workers_auto(cli_runner, process_runner, write_empty_py_project):
+    process_runner(["ellar", "create-project", "ellar_project_prefork_3"])
+    with mock.patch.object(runserver, "uvicorn_run") as mock_run, mock.patch(
+        "ellar_cli.server.cpu.get_available_cpus", return_value=[0, 1, 2, 3]
+    ), mock.patch("ellar_cli.server.cpu.get_cgroup_cpu_quota", return_value=2.5):
+        result = cli_runner.invoke_ellar_command(["runserver", "--workers", "auto"])
+
+    assert result.exit_code == 0, result.output
+    assert mock_run.call_args[1]["workers"] == 3
+    assert "Workers: 3 (auto: 4 available CPU(s), cgroup CPU quota 2.5)" in (
+        result.output
+    )
+
+
+def test_workers_auto_from_web_concurrency(
+    cli_runner, process_runner, write_empty_py_project
+):
+    process_runner(["ellar", "create-project", "ellar_project_prefork_4"])
+    with mock.patch.object(runserver, "uvicorn_run") as mock_run, mock.patch(
+        "ellar_cli.server.cpu.get_available_cpus", return_value=[0, 1]
+    ), mock.patch("ellar_cli.server.cpu.get_cgroup_cpu_quota", return_value=None):
+        result = cli_runner.invoke_ellar_command(
+            ["runserver"], env={"WEB_CONCURRENCY": "auto"}
+        )
+
+    assert result.exit_code == 0, result.output
+    assert mock_run.call_args[1]["workers"] == 2
+
+
+def test_pin_workers_layout(cli_runner, process_runner, write_empty_py_project):
+    process_runner(["ellar", "create-project", "ellar_project_prefork_5"])
+    with mock.patch(
+        "ellar_cli.server.PreforkSupervisor"
+    ) as mock_supervisor, mock.patch(
+        "ellar_cli.server.cpu.get_available_cpus", return_value=[2, 3, 5]
+    ):
+        mock_supervisor.return_value.run.return_value = 0
+        result = cli_runner.invoke_ellar_command(
+            ["runserver", "--workers=2", "--pin-workers"]
+        )
+
+    assert result.exit_code == 0, result.output
+    assert "worker 0 -> CPU 2, worker 1 -> CPU 3" in result.output
+    config, workers = mock_supervisor.call_args[0]
+    # not preloaded: each worker imports the application
+    assert config.app == "ellar_project_prefork_5.server:bootstrap"
+    assert config.factory is True
+    (hook,) = mock_supervisor.call_args[1]["hooks"]
+    assert hook.cpus == [2, 3]
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (["--workers=3", "--pin-workers"], "--pin-workers requires a CPU per worker"),
+        (["--workers=0"], "'0' is not a positive integer."),
+        (["--workers=many"], "'many' is not a valid integer or 'auto'."),
+        (["--pin-workers", "--reload"], "--pin-workers is not valid with --reload."),
+    ],
+)
+def test_workers_invalid_options(
+    args, message, cli_runner, process_runner, write_empty_py_project
+):
+    process_runner(["ellar", "create-project", "ellar_project_prefork_6"])
+    with mock.patch.object(runserver, "uvicorn_run") as mock_run, mock.patch(
+        "ellar_cli.server.cpu.get_available_cpus", return_value=[0, 1]
+    ):
+        result = cli_runner.invoke_ellar_command(["runserver", *args])
+
+    assert result.exit_code != 0
+    assert message in result.output
+    mock_run.assert_not_called()
+
+
+def test_pin_workers_requires_cpu_affinity(
+    cli_runner, process_runner, write_empty_py_project, monkeypatch
+):
+    process_runner(["ellar", "create-project", "ellar_project_prefork_10"])
+    # like on macOS
+    monkeypatch.delattr(os, "sched_setaffinity")
+    with mock.patch.object(runserver, "uvicorn_run") as mock_run:
+        result = cli_runner.invoke_ellar_command(
+            ["runserver", "--workers=2", "--pin-workers"]
+        )
+
+    assert result.exit_code != 0
+    assert "--pin-workers is not supported on this platform" in result.output
+    mock_run.assert_not_called()
+
+
+def get_listening_inodes(port: int) -> set:
+    inodes = set()
+    with open("/proc/net/tcp") as tcp:
+        for line in list(tcp)[1:]:
+            fields = line.split()
+            local_port = int(fields[1].split(":")[1], 16)
+            if local_port == port and fields[3] == "0A":
+                inodes.add(fields[9])
+    return inodes
+
+
+def get_socket_inodes(pid: int) -> set:
+    inodes = set()
+    for fd in os.listdir(f"/proc/{pid}/fd"):
+        try:
+            target = os.readlink(f"/proc/{pid}/fd/{fd}")
+        except OSError:
+            continue
+        if target.startswith("socket:["):
+            inodes.add(target[len("socket:[") : -1])
+    return inodes
+
+
+def test_reuse_port_workers_listen_on_their_own_socket(run_server):
+    port = get_free_port()
+    server = run_server("--reuse-port", "--workers", "2", "--port", str(port))
+    server.wait_for("Application startup complete", count=2)
+
+    listening = get_listening_inodes(port)
+    assert len(listening) == 2
+    workers = get_children(server.process.pid)
+    assert len(workers) == 2
+    for worker in workers:
+        assert len(get_socket_inodes(worker) & listening) == 1
+    # the supervisor doesn't listen
+    assert not get_socket_inodes(server.process.pid) & listening
+
+    assert http_get(port, "/docs") > 0
+    assert "Each worker listens on its own SO_REUSEPORT socket" in server.output
+    assert server.stop() == 0, server.output
+
+
+def test_reuse_port_fails_when_address_is_in_use(run_server):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        port = sock.getsockname()[1]
+        server = run_server("--reuse-port", "--port", str(port))
+        assert server.process.wait(timeout=30) == 3
+    assert "Address already in use" in server.output
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (["--reuse-port", "--uds", "server.sock"], "--reuse-port is not valid with"),
+        (["--reuse-port", "--port", "0"], "--reuse-port requires a fixed --port."),
+        (["--reuse-port", "--reload"], "--reuse-port is not valid with --reload."),
+    ],
+)
+def test_reuse_port_invalid_options(
+    args, message, cli_runner, process_runner, write_empty_py_project
+):
+    process_runner(["ellar", "create-project", "ellar_project_prefork_7"])
+    with mock.patch.object(runserver, "uvicorn_run") as mock_run:
+        result = cli_runner.invoke_ellar_command(["runserver", *args])
+
+    assert result.exit_code == 1
+    assert message in result.output
+    mock_run.assert_not_called()
+
+
+def test_sighup_replaces_workers_one_at_a_time(run_server):
+    port = get_free_port()
+    server = run_server(
+        "--prefork",
+        "--workers",
+        "2",
+        "--port",
+        str(port),
+        "--timeout-graceful-shutdown",
+        "5",
+    )
+    server.wait_for("Application startup complete", count=2)
+    old_workers = set(get_children(server.process.pid))
+
+    failures = []
+    stop = threading.Event()
+
+    def _requests():
+        while not stop.is_set():
+            try:
+                http_get(port, "/docs")
+            except OSError as ex:
+                failures.append(ex)
+
+    client = threading.Thread(target=_requests)
+    client.start()
+    try:
+        server.process.send_signal(signal.SIGHUP)
+        server.wait_for("Rolling restart complete")
+    finally:
+        stop.set()
+        client.join()
+
+    new_workers = set(get_children(server.process.pid))
+    assert len(new_workers) == 2
+    assert not new_workers & old_workers
+    assert failures == []
+
+    # a new worker is ready before the worker it replaces stops
+    events = [
+        "stopped" if line.endswith("stopped\n") else "ready"
+        for line in server.lines
+        if line.endswith("stopped\n") or "Application startup complete" in line
+    ]
+    assert events == ["ready", "ready", "ready", "stopped", "ready", "stopped"]
+    assert server.stop() == 0, server.output
+
+
+def test_prefork_imports_application_in_workers(
+    cli_runner, process_runner, write_empty_py_project
+):
+    process_runner(["ellar", "create-project", "ellar_project_prefork_8"])
+    with mock.patch("ellar_cli.server.PreforkSupervisor") as mock_supervisor:
+        mock_supervisor.return_value.run.return_value = 0
+        result = cli_runner.invoke_ellar_command(["runserver", "--prefork"])
+
+    assert result.exit_code == 0, result.output
+    config, workers = mock_supervisor.call_args[0]
+    assert config.app == "ellar_project_prefork_8.server:bootstrap"
+    assert workers == 1
+
+
+def test_prefork_exits_when_workers_fail_to_boot(
+    process_runner, write_empty_py_project, monkeypatch
+):
+    # exported by the commands of other tests run in this process
+    monkeypatch.delenv("ELLAR_CONFIG_MODULE", raising=False)
+    process_runner(["ellar", "create-project", "ellar_project_prefork_9"])
+    with open(os.path.join("ellar_project_prefork_9", "server.py"), "a") as fw:
+        fw.write("\n\ndef bootstrap():\n    raise RuntimeError('Boot failed')\n")
+
+    result = process_runner(
+        ["ellar", "runserver", "--prefork", "--workers", "2", "--port", "0"],
+        stderr=subprocess.STDOUT,
+        timeout=60,
+    )
+    output = result.stdout.decode()
+    assert result.returncode == 3, output
+    assert "RuntimeError: Boot failed" in output
+    assert "failed to boot" in output
+    # not replaced again and again
+    assert output.count("Booted worker") == 2
+
+
+def test_max_requests_replaces_worker_without_downtime(run_server):
+    port = get_free_port()
+    server = run_server(
+        "--limit-max-requests",
+        "3",
+        "--limit-max-requests-jitter",
+        "4",
+        "--port",
+        str(port),
+    )
+    server.wait_for("Application startup complete")
+    (worker,) = get_children(server.process.pid)
+
+    # every request is served while the worker is replaced
+    for _ in range(8):
+        assert http_get(port, "/docs") > 0
+    server.wait_for("Application startup complete", count=2)
+    server.wait_for(f"Worker 0 [{worker}] stopped")
+
+    limit = int(server.output.split("Maximum request limit of ")[1].split(" ")[0])
+    assert 3 <= limit <= 7
+    assert f"Replacing worker 0 [{worker}]: maximum request limit reached" in (
+        server.output
+    )
+    assert server.stop() == 0, server.output
+
+
+def test_max_rss_replaces_workers_one_at_a_time(run_server):
+    port = get_free_port()
+    server = run_server("--limit-max-rss", "1", "--workers", "2", "--port", str(port))
+    server.wait_for("Application startup complete", count=2)
+    workers = get_children(server.process.pid)
+
+    server.wait_for("Application startup complete", count=4)
+    server.wait_for("stopped", count=2)
+    for worker in workers:
+        assert f"[{worker}]: RSS of " in server.output
+    assert "above the limit of 1 MiB" in server.output
+
+    events = [
+        "stopped" if line.endswith("stopped\n") else "ready"
+        for line in server.lines
+        if line.endswith("stopped\n") or "Application startup complete" in line
+    ]
+    # never two workers replaced at once
+    assert events[:6] == ["ready", "ready", "ready", "stopped", "ready", "stopped"]
+    assert server.stop() == 0, server.output
+
+
+@pytest.mark.parametrize(
+    "args, message",
+    [
+        (
+            ["--limit-max-requests-jitter", "10"],
+            "--limit-max-requests-jitter requires --limit-max-requests.",
+        ),
+        (
+            ["--limit-max-rss", "100", "--reload"],
+            "--limit-max-rss is not valid with --reload.",
+        ),
+    ],
+)
+def test_recycling_invalid_options(
+    args, message, cli_runner, process_runner, write_empty_py_project
+):
+    process_runner(["ellar", "create-project", "ellar_project_prefork_9"])
+    with mock.patch.object(runserver, "uvicorn_run") as mock_run:
+        result = cli_runner.invoke_ellar_command(["runserver", *args])
+
+    assert result.exit_code == 1
+    assert message in result.output
+    mock_run.assert_not_called()
+
+
+def test_workers_exit_when_supervisor_dies(run_server):
+    port = get_free_port()
+    server = run_server("--prefork", "--workers", "2", "--port", str(port))
+    server.wait_for("Application startup complete", count=2)
+    workers = get_children(server.process.pid)
+
+    server.process.kill()
+    for worker in workers:
+        deadline = time.monotonic() + 10
+        while is_running(worker):
+            assert time.monotonic() < deadline, server.output
+            time.sleep(0.05)
+    assert "Supervisor process died. Exiting." in server.output
+
+
+def test_profile_writes_collapsed_stacks_of_each_worker(run_server, tmp_path):
+    port = get_free_port()
+    profile_dir = tmp_path / "profiles"
+    server = run_server(
+        "--workers",
+        "2",
+        "--port",
+        str(port),
+        "--profile",
+        str(profile_dir),
+        "--profile-frequency",
+        "1000",
+    )
+    server.wait_for("Application startup complete", count=2)
+    assert "Profiling workers at 1000 Hz" in server.output
+    workers = get_children(server.process.pid)
+
+    for _ in range(20):
+        assert http_get(port, "/docs") > 0
+    server.process.send_signal(signal.SIGUSR2)
+    server.wait_for("stack samples to", count=2)
+    # workers are still running
+    assert sorted(get_children(server.process.pid)) == sorted(workers)
+
+    assert server.stop() == 0, server.output
+    assert server.output.count("stack samples to") == 4
+    files = sorted(os.listdir(profile_dir))
+    assert len(files) == 4
+    for worker in workers:
+        index = 0 if f"worker-0-{worker}-1.collapsed" in files else 1
+        assert f"worker-{index}-{worker}-1.collapsed" in files
+        assert f"worker-{index}-{worker}-2.collapsed" in files
+
+    lines = [
+        line for name in files for line in (profile_dir / name).read_text().splitlines()
+    ]
+    assert lines
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0
+        assert stack.split(";")[0].startswith("<module> (")
+
+
+@pytest.mark.parametrize("option", ["--profile", "--loop-lag-threshold=100"])
+def test_worker_monitoring_is_not_valid_with_reload(
+    option, cli_runner, process_runner, write_empty_py_project
+):
+    process_runner(["ellar", "create-project", "ellar_project_prefork_10"])
+    with mock.patch.object(runserver, "uvicorn_run") as mock_run:
+        result = cli_runner.invoke_ellar_command(["runserver", option, "--reload"])
+
+    assert result.exit_code == 1
+    flag = option.split("=")[0]
+    assert f"{flag} is not valid with --reload." in result.output
+    mock_run.assert_not_called()
+
+
+def test_loop_lag_threshold_reports_lag_of_each_worker(run_server):
+    port = get_free_port()
+    server = run_server(
+        "--workers", "2", "--port", str(port), "--loop-lag-threshold", "500"
+    )
+    server.wait_for("Application startup complete", count=2)
+    assert "Logging event loop stalls of workers longer than 500ms" in server.output
+    workers = get_children(server.process.pid)
+
+    for _ in range(10):
+        assert http_get(port, "/docs") > 0
+
+    assert server.stop() == 0, server.output
+    for worker in workers:
+        assert f" [{worker}] over " in server.output
+    assert server.output.count("Event loop lag of worker ") == 2
+
+
+def test_top_shows_worker_stats_published_by_workers(run_server):
+    port = get_free_port()
+    server = run_server("--prefork", "--workers", "2", "--port", str(port))
+    server.wait_for("Application startup complete", count=2)
+    assert "Worker stats in " in server.output
+    stats_path = server.output.split("Worker stats in ", 1)[1].split(",", 1)[0]
+    assert os.path.exists(stats_path)
+
+    server.process.send_signal(signal.SIGHUP)
+    server.wait_for("Rolling restart complete")
+    workers = get_children(server.process.pid)
+    for _ in range(10):
+        assert http_get(port, "/docs") > 0
+    # published every second
+    time.sleep(1.5)
+
+    result = subprocess.run(
+        ["ellar", "top", "--pid", str(server.process.pid), "-n", "1"],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    assert result.returncode == 0, result.stderr
+    rows = [line.split() for line in result.stdout.splitlines()[3:]]
+    assert sorted(int(row[1]) for row in rows) == sorted(workers)
+    assert sorted(row[0] for row in rows) == ["0", "1"]
+    assert sum(int(row[3]) for row in rows) == 10
+    for row in rows:
+        assert float(row[6]) > 0
+        # restarted once by the SIGHUP
+        assert row[8] == "1"
+
+    assert server.stop() == 0, server.output
+    assert not os.path.exists(stats_path)
@@ -0,0 +1,115 @@
+import os
+import time
+
+import pytest
+
+from ellar_cli.main import app_cli
+from ellar_cli.manage_commands.top import _update_rates
+from ellar_cli.server import StatsTable, WorkerStats
+from ellar_cli.server import stats as stats_module
+from ellar_cli.testing import EllarCliRunner
+
+
+@pytest.fixture()
+def stats_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(stats_module, "get_stats_dir", lambda: str(tmp_path))
+    return tmp_path
+
+
+def create_table(pid: int) -> StatsTable:
+    now = time.time()
+    table = StatsTable.create(
+        stats_module.get_stats_path(pid), 4, supervisor_pid=pid, started_at=now - 3700
+    )
+    table.write(0, slot=0, pid=101, started_at=now - 65, requests=1200, rss=50 * 2**20)
+    table.write(
+        1, slot=1, pid=102, started_at=now - 5, restarts=2, loop_lag=0.0125, in_flight=3
+    )
+    return table
+
+
+def test_top_shows_the_workers_of_a_supervisor(stats_dir, tmp_path):
+    table = create_table(os.getpid())
+    prometheus_file = tmp_path / "ellar.prom"
+
+    result = EllarCliRunner().invoke(
+        app_cli,
+        ["top", "-n", "2", "--interval", "0.1", "--prometheus", str(prometheus_file)],
+    )
+    table.close()
+
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    assert lines[0].startswith(f"Supervisor [{os.getpid()}], up 1:01:")
+    assert ", 2 worker(s), 0.0 requests/s" in lines[0]
+    assert lines[2].split() == [
+        "WORKER",
+        "PID",
+        "UPTIME",
+        "REQUESTS",
+        "REQ/S",
+        "IN-FLIGHT",
+        "RSS",
+        "MIB",
+        "LAG",
+        "MS",
+        "RESTARTS",
+    ]
+    assert lines[3].split() == [
+        "0",
+        "101",
+        "0:01:05",
+        "1200",
+        "-",
+        "0",
+        "50.0",
+        "0.0",
+        "0",
+    ]
+    assert lines[4].split()[1] == "102"
+    assert lines[4].split()[4:] == ["-", "3", "0.0", "12.5", "2"]
+    assert len(lines) == 10
+
+    assert 'ellar_worker_requests_total{worker="0",pid="101"} 1200' in (
+        prometheus_file.read_text()
+    )
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_update_rates():
+    before = WorkerStats(0, 101, 0, 0, 0, 100, 0, 0.0, 0.0, 10.0)
+    after = before._replace(requests=150, updated_at=12.0)
+    rates = _update_rates([after], {101: before}, {})
+    assert rates == {101: 25.0}
+    # not published again since
+    assert _update_rates([after], {101: after}, rates) == {101: 25.0}
+    # new worker
+    assert _update_rates([after], {}, rates) == {101: 25.0}
+    assert _update_rates([after], {}, {}) == {}
+
+
+def test_top_fails_without_stats_for_pid(stats_dir):
+    table = create_table(os.getpid())
+    os.remove(table.path)
+
+    result = EllarCliRunner().invoke(app_cli, ["top", "--pid", str(os.getpid())])
+    table.close()
+    assert result.exit_code == 1
+    assert f"No worker stats for pid {os.getpid()}" in result.output
+
+
+def test_top_requires_a_running_supervisor(stats_dir):
+    result = EllarCliRunner().invoke(app_cli, ["top"])
+    assert result.exit_code == 1
+    assert "No running prefork supervisor found." in result.output
+
+
+def test_top_requires_pid_with_several_supervisors(stats_dir):
+    tables = [create_table(os.getpid()), create_table(os.getppid())]
+    result = EllarCliRunner().invoke(app_cli, ["top"])
+    for table in tables:
+        table.close()
+
+    assert result.exit_code == 1
+    assert "Several prefork supervisors are running" in result.output
+    assert "choose one with --pid." in result.output
@@ -1,8 +1,11 @@
+import subprocess
+import sys
+
 from tomlkit import table
 from tomlkit.items import Table
 
 from ellar_cli.constants import ELLAR_PY_PROJECT
-from ellar_cli.service import EllarPyProject
+from ellar_cli.service import EllarCLIService, EllarPyProject
 
 
 def test_get_or_create_ellar_py_project(mock_py_project_table):
@@ -63,3 +66,44 @@ def test_get_root_node(mock_py_project_table):
     assert ellar_py_project.get_root_node() is mock_py_project_table["tool"].get(
         ELLAR_PY_PROJECT
     )
+
+
+def test_read_returns_none_without_ellar_table(tmp_py_project_path):
+    tmp_py_project_path.write_text('[project]\nname = "sample"\n')
+    assert EllarPyProject.read(str(tmp_py_project_path)) is None
+
+
+def test_read_is_cached_until_file_changes(
+    add_ellar_project_to_py_project, tmp_py_project_path
+):
+    add_ellar_project_to_py_project("some-project")
+
+    ellar_py_project = EllarPyProject.read(str(tmp_py_project_path))
+    assert ellar_py_project.default_project == "some-project"
+    assert EllarPyProject.read(str(tmp_py_project_path)) is ellar_py_project
+
+    schema_cls = EllarCLIService.schema_cls
+    project_meta = ellar_py_project.get_project_meta("some-project", schema_cls)
+    assert project_meta.application == "some-project.server:bootstrap"
+    assert ellar_py_project.get_project_meta("some-project", schema_cls) is project_meta
+
+    add_ellar_project_to_py_project("some-other-project")
+    updated_ellar_py_project = EllarPyProject.read(str(tmp_py_project_path))
+    assert updated_ellar_py_project is not ellar_py_project
+    assert updated_ellar_py_project.has_project("some-other-project")
+
+
+def test_import_project_meta_does_not_import_tomlkit(
+    add_ellar_project_to_py_project, tmp_path
+):
+    add_ellar_project_to_py_project("some-project")
+    script = (
+        "import sys\n"
+        "from ellar_cli.service import EllarCLIService\n"
+        "assert EllarCLIService.import_project_meta().app == 'some-project'\n"
+        "print('tomlkit' in sys.modules)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=str(tmp_path), stdout=subprocess.PIPE
+    )
+    assert result.stdout == b"False\n"
@@ -0,0 +1,110 @@
+import asyncio
+import contextlib
+import contextvars
+import threading
+
+import pytest
+from ellar.core import Config, current_injector
+
+from ellar_cli import event_loop
+from ellar_cli.main import create_ellar_cli
+from ellar_cli.service import EllarCLIException
+from ellar_cli.testing import EllarCliRunner
+
+current_value = contextvars.ContextVar("current_value", default=None)
+
+
+@contextlib.asynccontextmanager
+async def set_current_value(value, events):
+    token = current_value.set(value)
+    events.append(("enter", asyncio.get_running_loop()))
+    try:
+        yield value
+    except RuntimeError as ex:
+        events.append(("error", str(ex)))
+        if str(ex) != "suppressed":
+            raise
+    finally:
+        current_value.reset(token)
+        events.append(("exit", asyncio.get_running_loop()))
+
+
+async def get_running_loop():
+    return asyncio.get_running_loop()
+
+
+def test_run_coroutine_reuses_one_loop():
+    first = event_loop.run_coroutine(get_running_loop())
+    assert event_loop.run_coroutine(get_running_loop()) is first
+    assert first is event_loop.get_event_loop()
+
+
+def test_run_coroutine_from_other_thread_or_running_loop():
+    results = []
+    thread = threading.Thread(
+        target=lambda: results.append(event_loop.run_coroutine(get_running_loop()))
+    )
+    thread.start()
+    thread.join()
+
+    async def nested():
+        return event_loop.run_coroutine(get_running_loop())
+
+    results.append(event_loop.run_coroutine(nested()))
+    assert all(loop is not event_loop.get_event_loop() for loop in results)
+
+
+def test_enter_async_context_shares_the_cli_loop():
+    events = []
+    with event_loop.enter_async_context(set_current_value("a", events)) as value:
+        assert value == "a"
+        assert current_value.get() == "a"
+        loop = event_loop.run_coroutine(get_running_loop())
+
+    assert current_value.get() is None
+    assert events == [("enter", loop), ("exit", loop)]
+
+
+def test_enter_async_context_exit_receives_errors():
+    events = []
+    with pytest.raises(RuntimeError, match="failed"):
+        with event_loop.enter_async_context(set_current_value("a", events)):
+            raise RuntimeError("failed")
+    assert events[1] == ("error", "failed")
+
+    with event_loop.enter_async_context(set_current_value("a", events)):
+        raise RuntimeError("suppressed")
+    assert events[-2] == ("error", "suppressed")
+    assert current_value.get() is None
+
+
+def test_event_loop_env(monkeypatch):
+    monkeypatch.setenv("ELLAR_EVENT_LOOP", "asyncio")
+    loop = event_loop._new_event_loop()
+    assert isinstance(loop, asyncio.BaseEventLoop)
+    loop.close()
+
+    uvloop = pytest.importorskip("uvloop")
+    monkeypatch.setenv("ELLAR_EVENT_LOOP", "uvloop")
+    loop = event_loop._new_event_loop()
+    assert isinstance(loop, uvloop.Loop)
+    loop.close()
+
+    monkeypatch.setenv("ELLAR_EVENT_LOOP", "invalid")
+    with pytest.raises(EllarCLIException):
+        event_loop._new_event_loop()
+
+
+def test_async_command_runs_on_the_loop_of_the_injector_context(change_os_dir):
+    cli = create_ellar_cli("example_project.server:application")
+    loops = []
+
+    @cli.command(name="async-command")
+    async def async_command():
+        loops.append(asyncio.get_running_loop())
+        print(f"Async command in {current_injector.get(Config).APPLICATION_NAME}")
+
+    result = EllarCliRunner().invoke(cli, ["async-command"])
+    assert result.exit_code == 0, result.output
+    assert result.stdout == "Async command in example_project\n"
+    assert loops == [event_loop.get_event_loop()]
@@ -0,0 +1,56 @@
+import subprocess
+import sys
+
+import click
+
+from ellar_cli.click.lazy import LazyCommand
+from ellar_cli.main import create_ellar_cli
+
+
+def test_builtin_commands_are_registered_lazily_with_the_right_help():
+    cli = create_ellar_cli()
+    builtin_commands = [
+        "new",
+        "create-project",
+        "create-module",
+        "runserver",
+        "profile-startup",
+        "daemon",
+        "bench",
+        "loadtest",
+        "top",
+    ]
+
+    for name in builtin_commands:
+        lazy_command = cli.commands[name]
+        assert isinstance(lazy_command, LazyCommand)
+
+        command = lazy_command.resolve()
+        assert isinstance(command, click.Command)
+        assert command.name == name
+        assert lazy_command.help == command.help
+        assert lazy_command.boot_level == command.boot_level
+
+
+def test_ellar_help_does_not_import_ellar_or_uvicorn(tmp_path):
+    script = (
+        "import sys\n"
+        "from ellar_cli.main import app_cli\n"
+        "try:\n"
+        "    app_cli(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(sorted({m.split('.')[0] for m in sys.modules} & {'ellar', 'uvicorn', 'tomlkit'}))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script], cwd=str(tmp_path), stdout=subprocess.PIPE
+    )
+    assert result.returncode == 0
+    assert b"runserver" in result.stdout
+    assert result.stdout.splitlines()[-1] == b"[]"
+
+
+def test_lazy_builtin_command_help_loads_the_command(cli_runner):
+    result = cli_runner.invoke_ellar_command(["runserver", "--help"])
+    assert result.exit_code == 0
+    assert "--host TEXT" in result.output
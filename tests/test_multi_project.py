@@ -0,0 +1,94 @@
+import signal
+import subprocess
+
+import click
+import pytest
+
+from ellar_cli import multi_project
+from ellar_cli.multi_project import parse_projects_option
+
+AVAILABLE_PROJECTS = ["example_project", "example_project_2", "example_project_3"]
+
+
+def test_parse_projects_option_all_projects():
+    assert parse_projects_option(None, True, AVAILABLE_PROJECTS) == AVAILABLE_PROJECTS
+
+
+def test_parse_projects_option_removes_duplicates():
+    assert parse_projects_option(
+        "example_project_3, example_project,example_project_3",
+        False,
+        AVAILABLE_PROJECTS,
+    ) == ["example_project_3", "example_project"]
+
+
+def test_parse_projects_option_fails_for_unknown_project():
+    with pytest.raises(click.UsageError, match="Unknown project\\(s\\): unknown"):
+        parse_projects_option("example_project,unknown", False, AVAILABLE_PROJECTS)
+
+
+def test_all_projects_runs_command_on_every_project(change_os_dir):
+    result = subprocess.run(
+        ["ellar", "--all-projects", "--jobs", "2", "whatever-you-want"],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    assert result.returncode == 0, result.stderr
+    assert sorted(result.stdout.decode().splitlines()) == [
+        "[example_project]   Whatever you want command",
+        "[example_project_2] Whatever you want command from example_project_2",
+        "[example_project_3] Whatever you want command from example_project_3",
+    ]
+    assert "example_project_3   ok" in result.stderr.decode()
+
+
+def test_projects_aggregates_exit_codes(change_os_dir):
+    result = subprocess.run(
+        [
+            "ellar",
+            "--projects",
+            "example_project,example_project_3",
+            "db",
+            "command-with-context",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    assert result.returncode == 2
+    assert result.stdout == (
+        b"[example_project]   Running a command with application context - example_project\n"
+    )
+    stderr = result.stderr.decode()
+    assert (
+        "[example_project_3] Error: No such command 'command-with-context'." in stderr
+    )
+    assert "example_project     ok" in stderr
+    assert "example_project_3   failed (2)" in stderr
+
+
+def test_projects_fails_for_unknown_project(change_os_dir):
+    result = subprocess.run(
+        ["ellar", "--projects", "unknown", "whatever-you-want"],
+        stderr=subprocess.PIPE,
+    )
+    assert result.returncode == 2
+    assert b"Unknown project(s): unknown" in result.stderr
+
+
+def test_projects_fails_when_a_project_is_killed_by_a_signal(
+    change_os_dir, tmp_path, monkeypatch, capsys
+):
+    python = tmp_path / "python"
+    python.write_text(
+        '#!/bin/sh\ncase "$*" in *example_project_2*) kill -9 $$;; esac\nexit 0\n'
+    )
+    python.chmod(0o755)
+    monkeypatch.setattr(multi_project.sys, "executable", str(python))
+
+    exit_code = multi_project.run_in_projects(
+        ["example_project", "example_project_2"], ["whatever-you-want"]
+    )
+    assert exit_code == 128 + signal.SIGKILL
+    stderr = capsys.readouterr().err
+    assert "example_project     ok" in stderr
+    assert "example_project_2   killed by SIGKILL" in stderr
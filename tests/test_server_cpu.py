@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+from ellar_cli.server.cpu import (
+    get_auto_workers_count,
+    get_available_cpus,
+    get_cgroup_cpu_quota,
+)
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(content)
+
+
+def cgroup_paths(tmp_path):
+    return str(tmp_path / "cgroup"), str(tmp_path / "proc")
+
+
+@pytest.mark.parametrize(
+    "content, quota",
+    [("max 100000\n", None), ("150000 100000\n", 1.5), ("200000 100000", 2.0)],
+)
+def test_cgroup_v2_cpu_quota(tmp_path, content, quota):
+    write(str(tmp_path / "proc"), "0::/\n")
+    write(str(tmp_path / "cgroup" / "cpu.max"), content)
+    assert get_cgroup_cpu_quota(*cgroup_paths(tmp_path)) == quota
+
+
+def test_cgroup_v2_cpu_quota_of_the_process_cgroup(tmp_path):
+    write(str(tmp_path / "proc"), "0::/system.slice/app.service\n")
+    write(str(tmp_path / "cgroup" / "cpu.max"), "max 100000\n")
+    write(str(tmp_path / "cgroup" / "system.slice" / "cpu.max"), "400000 100000\n")
+    write(
+        str(tmp_path / "cgroup" / "system.slice" / "app.service" / "cpu.max"),
+        "150000 100000\n",
+    )
+    assert get_cgroup_cpu_quota(*cgroup_paths(tmp_path)) == 1.5
+
+    # the smallest quota of the ancestors applies
+    write(str(tmp_path / "cgroup" / "system.slice" / "cpu.max"), "100000 100000\n")
+    assert get_cgroup_cpu_quota(*cgroup_paths(tmp_path)) == 1.0
+
+
+@pytest.mark.parametrize("controller", ["cpu", "cpu,cpuacct"])
+def test_cgroup_v1_cpu_quota(tmp_path, controller):
+    write(str(tmp_path / "proc"), f"4:memory:/docker/abc\n3:{controller}:/docker/abc\n")
+    directory = tmp_path / "cgroup" / controller / "docker" / "abc"
+    write(str(directory / "cpu.cfs_quota_us"), "50000\n")
+    write(str(directory / "cpu.cfs_period_us"), "100000\n")
+    assert get_cgroup_cpu_quota(*cgroup_paths(tmp_path)) == 0.5
+
+
+def test_cgroup_v1_cpu_quota_of_a_container(tmp_path):
+    # the cgroup of the container is mounted as the root of the hierarchy
+    write(str(tmp_path / "proc"), "3:cpu,cpuacct:/docker/abc\n")
+    write(str(tmp_path / "cgroup" / "cpu,cpuacct" / "cpu.cfs_quota_us"), "200000\n")
+    write(str(tmp_path / "cgroup" / "cpu,cpuacct" / "cpu.cfs_period_us"), "100000\n")
+    assert get_cgroup_cpu_quota(*cgroup_paths(tmp_path)) == 2.0
+
+
+def test_cgroup_v1_without_quota(tmp_path):
+    write(str(tmp_path / "proc"), "3:cpu:/\n")
+    write(str(tmp_path / "cgroup" / "cpu" / "cpu.cfs_quota_us"), "-1\n")
+    write(str(tmp_path / "cgroup" / "cpu" / "cpu.cfs_period_us"), "100000\n")
+    assert get_cgroup_cpu_quota(*cgroup_paths(tmp_path)) is None
+
+
+def test_no_cgroup(tmp_path):
+    assert get_cgroup_cpu_quota(*cgroup_paths(tmp_path)) is None
+
+
+@pytest.mark.parametrize(
+    "cpus, quota, count",
+    [
+        ([0, 1, 2, 3], None, 4),
+        ([0, 1, 2, 3], 1.5, 2),
+        ([0, 1], 8.0, 2),
+        ([0, 1, 2, 3], 0.2, 1),
+    ],
+)
+def test_auto_workers_count(cpus, quota, count):
+    assert get_auto_workers_count(cpus, quota) == count
+
+
+def test_available_cpus():
+    cpus = get_available_cpus()
+    assert cpus and cpus == sorted(cpus)
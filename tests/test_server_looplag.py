@@ -0,0 +1,73 @@
+import asyncio
+import logging
+import time
+
+from ellar_cli.server import LoopLagHook, LoopLagMonitor, Worker
+
+
+def blocking_handler(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def test_loop_lag_monitor_logs_the_stack_of_blocking_code(caplog):
+    monitor = LoopLagMonitor(0.05, name="test")
+
+    async def main():
+        monitor.start(asyncio.get_running_loop())
+        try:
+            await asyncio.sleep(0.1)
+            blocking_handler(0.3)
+            await asyncio.sleep(0.1)
+        finally:
+            monitor.stop()
+
+    with caplog.at_level(logging.INFO, logger="uvicorn.error"):
+        asyncio.run(main())
+
+    stacks = [
+        record.getMessage()
+        for record in caplog.records
+        if "blocked for more than 50ms" in record.getMessage()
+    ]
+    assert len(stacks) == 1
+    assert "in blocking_handler\n" in stacks[0]
+    assert stacks[0].startswith("Event loop of test ")
+    assert any(
+        "Event loop of test was blocked for" in record.getMessage()
+        for record in caplog.records
+    )
+    assert monitor.stalls == 1
+    assert monitor.histogram.max >= 200_000
+    assert monitor.histogram.value_at_percentile(50) < 50_000
+
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger="uvicorn.error"):
+        monitor.report()
+    (message,) = [record.getMessage() for record in caplog.records]
+    assert message.startswith("Event loop lag of test over ")
+    assert "p99.9 " in message
+    assert "1 stall(s) over 50ms" in message
+    assert monitor.histogram.total_count == 0
+    assert monitor.stalls == 0
+
+
+def test_loop_lag_hook_reports_periodically_and_on_exit(caplog):
+    hook = LoopLagHook(0.05, report_interval=0.1)
+    worker = Worker(index=2)
+    worker.pid = 1234
+
+    async def main():
+        hook.worker_started(worker, server=None)
+        await asyncio.sleep(0.25)
+
+    with caplog.at_level(logging.INFO, logger="uvicorn.error"):
+        asyncio.run(main())
+        hook.worker_exit(worker, server=None)
+
+    reports = [
+        record.getMessage()
+        for record in caplog.records
+        if record.getMessage().startswith("Event loop lag of worker 2 [1234]")
+    ]
+    assert len(reports) == 3
+    assert not hook.monitor._watchdog.is_alive()
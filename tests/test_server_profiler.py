@@ -0,0 +1,73 @@
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+from ellar_cli.server import SamplingProfilerHook, StackSampler, Worker
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(signal, "setitimer"), reason="Requires signal.setitimer"
+)
+
+
+def busy_function(seconds: float) -> None:
+    deadline = time.process_time() + seconds
+    while time.process_time() < deadline:
+        pass
+
+
+def test_stack_sampler_records_busy_stacks_only(tmp_path):
+    idle = threading.Event()
+    thread = threading.Thread(target=idle.wait)
+    thread.start()
+
+    sampler = StackSampler(0.001)
+    sampler.start()
+    try:
+        busy_function(0.3)
+    finally:
+        sampler.stop()
+        idle.set()
+        thread.join()
+
+    path = str(tmp_path / "profile.collapsed")
+    count = sampler.dump(path)
+    assert count > 10
+    assert sampler.samples == {}
+
+    with open(path) as file:
+        lines = file.read().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == count
+    busy_samples = sum(
+        int(line.rsplit(" ", 1)[1]) for line in lines if "busy_function (" in line
+    )
+    assert busy_samples > count / 2
+    # the waiting thread isn't sampled
+    assert not any("Thread.run" in line for line in lines)
+    assert signal.getsignal(signal.SIGPROF) == signal.SIG_DFL
+
+    assert sampler.dump(path) == 0
+
+
+def test_sampling_profiler_hook_dumps_on_sigusr2_and_exit(tmp_path):
+    hook = SamplingProfilerHook(str(tmp_path / "profiles"), frequency=1000)
+    hook.before_fork(supervisor=None)
+    worker = Worker(index=1)
+    worker.pid = os.getpid()
+
+    original_handler = signal.getsignal(signal.SIGUSR2)
+    try:
+        hook.worker_init(worker)
+        busy_function(0.1)
+        os.kill(os.getpid(), signal.SIGUSR2)
+        busy_function(0.1)
+        hook.worker_exit(worker, server=None)
+    finally:
+        signal.signal(signal.SIGUSR2, original_handler)
+
+    assert sorted(os.listdir(tmp_path / "profiles")) == [
+        f"worker-1-{os.getpid()}-1.collapsed",
+        f"worker-1-{os.getpid()}-2.collapsed",
+    ]
@@ -0,0 +1,109 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from ellar_cli.server import StatsTable, WorkerStats
+from ellar_cli.server import stats as stats_module
+from ellar_cli.server.stats import find_stats_files, format_prometheus
+
+
+def test_stats_table_rows_are_shared_with_readers(tmp_path):
+    path = str(tmp_path / "stats")
+    table = StatsTable.create(path, 4, supervisor_pid=10, started_at=100.0)
+    assert os.path.getsize(path) == 64 + 4 * 64
+
+    table.write(2, slot=1, restarts=3)
+    table.write(2, pid=1234, started_at=101.0, requests=7, rss=2**20)
+    table.write(0, slot=0, pid=1235, started_at=102.0, loop_lag=0.5)
+
+    reader = StatsTable.open(path)
+    assert (reader.rows, reader.supervisor_pid, reader.started_at) == (4, 10, 100.0)
+    assert reader.workers() == [
+        WorkerStats(0, 1235, 0, 0, 0, 0, 0, 102.0, 0.5, 0.0),
+        WorkerStats(2, 1234, 1, 3, 0, 7, 2**20, 101.0, 0.0, 0.0),
+    ]
+
+    # updates are seen by readers
+    table.write(2, requests=8, in_flight=2)
+    assert reader.read(2).requests == 8
+    assert reader.read(2).in_flight == 2
+
+    table.clear(0)
+    assert [stats.pid for stats in reader.workers()] == [1234]
+
+    # a row left half written by a killed worker is still read, and written again
+    table._buffer[64 * 3 : 64 * 3 + 8] = (1).to_bytes(8, sys.byteorder)
+    assert reader.read(2).requests == 8
+    table.write(2, requests=9)
+    assert reader.read(2).requests == 9
+    reader.close()
+    table.close()
+
+
+def test_stats_table_rejects_other_files(tmp_path):
+    path = tmp_path / "other"
+    path.write_bytes(b"\0" * 128)
+    with pytest.raises(ValueError, match="is not a worker stats table"):
+        StatsTable.open(str(path))
+
+
+def test_stats_table_is_private_and_replaces_stale_tables(tmp_path):
+    path = tmp_path / "stats"
+    StatsTable.create(str(path), 1, supervisor_pid=10, started_at=0.0).close()
+    assert path.stat().st_mode & 0o777 == 0o600
+
+    # left behind by a killed supervisor
+    table = StatsTable.create(str(path), 2, supervisor_pid=11, started_at=0.0)
+    assert StatsTable.open(str(path)).supervisor_pid == 11
+    table.close()
+
+
+@pytest.mark.skipif(os.getuid() != 0, reason="Requires root to chown")
+def test_stats_table_never_opens_files_of_other_users(tmp_path):
+    target = tmp_path / "target"
+    target.write_text("data")
+    path = tmp_path / "stats"
+    path.symlink_to(target)
+    os.lchown(path, 65534, 65534)
+
+    with pytest.raises(FileExistsError):
+        StatsTable.create(str(path), 1, supervisor_pid=10, started_at=0.0)
+    assert target.read_text() == "data"
+    assert path.is_symlink()
+
+
+def test_find_stats_files_skips_stopped_supervisors(tmp_path, monkeypatch):
+    monkeypatch.setattr(stats_module, "get_stats_dir", lambda: str(tmp_path))
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+
+    for pid in (os.getpid(), process.pid):
+        StatsTable.create(
+            stats_module.get_stats_path(pid), 1, supervisor_pid=pid, started_at=0.0
+        ).close()
+    (tmp_path / "ellar-stats-invalid").write_bytes(b"")
+
+    assert find_stats_files() == {
+        os.getpid(): str(tmp_path / f"ellar-stats-{os.getpid()}")
+    }
+
+
+def test_format_prometheus():
+    text = format_prometheus(
+        [
+            WorkerStats(0, 1234, 0, 1, 2, 30, 4096, 1700000000.5, 0.002, 0.0),
+            WorkerStats(1, 1235, 1, 0, 0, 10, 8192, 1700000001.0, 0.0, 0.0),
+        ]
+    )
+    lines = text.splitlines()
+    assert lines[:4] == [
+        "# HELP ellar_worker_requests_total Requests served by the worker.",
+        "# TYPE ellar_worker_requests_total counter",
+        'ellar_worker_requests_total{worker="0",pid="1234"} 30',
+        'ellar_worker_requests_total{worker="1",pid="1235"} 10',
+    ]
+    assert 'ellar_worker_event_loop_lag_seconds{worker="0",pid="1234"} 0.002' in lines
+    assert 'ellar_worker_restarts_total{worker="0",pid="1234"} 1' in lines
+    assert text.endswith("\n")
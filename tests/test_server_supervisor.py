@@ -0,0 +1,104 @@
+import logging
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+from uvicorn import Config
+
+from ellar_cli.server import PreforkSupervisor, Worker
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="Requires os.fork")
+
+
+@pytest.fixture()
+def supervisor():
+    supervisor = PreforkSupervisor(
+        Config("example_project.server:application"), 1, boot_timeout=0.2
+    )
+    processes = []
+
+    def spawn_worker(worker: Worker) -> Worker:
+        # a worker that never reports it's ready
+        process = subprocess.Popen(
+            [sys.executable, "-c", "import time; time.sleep(60)"]
+        )
+        processes.append(process)
+        worker.pid = process.pid
+        worker.started_at = time.time()
+        supervisor.workers[worker.pid] = worker
+        return worker
+
+    supervisor.spawn_worker = spawn_worker
+    yield supervisor
+
+    for process in processes:
+        process.kill()
+        process.wait()
+
+
+def test_replacement_that_never_boots_is_killed(supervisor, caplog):
+    old = supervisor.spawn_worker(Worker(0))
+    old.ready = True
+
+    supervisor.start_rolling_restart()
+    supervisor._step_replacements()
+    new = supervisor._replacement
+    assert new is not None and new is not old
+
+    time.sleep(0.3)
+    with caplog.at_level(logging.INFO, logger="uvicorn.error"):
+        supervisor._step_replacements()
+        deadline = time.monotonic() + 10
+        while new.pid in supervisor.workers and time.monotonic() < deadline:
+            time.sleep(0.05)
+            supervisor.reap_workers()
+
+    assert f"Killing worker 0 [{new.pid}], it didn't boot in 0.2s" in caplog.text
+    # the replaced worker keeps serving, and the killed one isn't replaced
+    assert list(supervisor.workers.values()) == [old]
+    assert not old.retiring
+    assert (supervisor._replacement, supervisor._replaced) == (None, None)
+    assert not supervisor._rolling_restart
+
+    # replacements aren't stalled
+    supervisor.replace_worker(old, "test")
+    supervisor._step_replacements()
+    assert supervisor._replacement is not None
+
+
+def test_workers_exiting_after_start_are_replaced_with_increasing_delay(
+    supervisor, caplog
+):
+    def exit_worker() -> Worker:
+        (worker,) = supervisor.workers.values()
+        del supervisor.workers[worker.pid]
+        supervisor.on_worker_exited(worker, 1)
+        return worker
+
+    supervisor.spawn_worker(Worker(0))
+    # replaced at once the first time
+    exit_worker()
+    assert len(supervisor.workers) == 1
+
+    with caplog.at_level(logging.INFO, logger="uvicorn.error"):
+        exit_worker()
+    assert not supervisor.workers
+    assert "2 times in a row after it started, replacing it in 0.5s" in caplog.text
+    assert supervisor._next_tick_timeout() <= 0.5
+
+    supervisor._respawn_workers()
+    assert not supervisor.workers
+    time.sleep(0.5)
+    supervisor._respawn_workers()
+    assert [worker.index for worker in supervisor.workers.values()] == [0]
+
+    exit_worker()
+    assert supervisor._respawn_at[0] - time.monotonic() > 0.5
+
+    # a worker that served for a while is replaced at once
+    supervisor._respawn_at.clear()
+    supervisor.spawn_worker(Worker(0)).started_at -= 60
+    exit_worker()
+    assert len(supervisor.workers) == 1
@@ -0,0 +1,166 @@
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from ellar_cli.service import EllarCLIService, StaticCommandDiscovery
+
+ROOT_MODULE = """
+from ellar.common import Module
+from ellar.core import LazyModuleImport as lazyLoad, ModuleBase
+
+from . import commands
+from .modules.users import UsersModule
+
+
+@Module(
+    modules=[UsersModule.setup(), lazyLoad("static_project.modules.items:ItemsModule")],
+    commands=[commands.hello],
+)
+class ApplicationModule(ModuleBase):
+    pass
+"""
+
+COMMANDS = '''
+import ellar_cli.click as click
+
+
+@click.command()
+@click.option("--count", type=int, default=1, help="Number of greetings.")
+@click.option("--shout/--no-shout", default=False)
+@click.option("--mode", type=click.Choice(["a", "b"]), default="a")
+@click.argument("name")
+def hello(count, shout, mode, name):
+    """Says hello"""
+'''
+
+USERS = '''
+from ellar.common import Module
+from ellar.core import ModuleBase
+
+import ellar_cli.click as click
+
+
+@click.group(name="users")
+def users_group():
+    """Manages users"""
+
+
+@users_group.command(name="create")
+def create_user():
+    """Creates a user"""
+
+
+@Module(commands=[users_group])
+class UsersModule(ModuleBase):
+    @classmethod
+    def setup(cls):
+        return cls
+'''
+
+ITEMS = """
+from ellar.common import Module
+from ellar.core import ModuleBase
+
+from ..commands import hello as greet
+
+
+@Module(commands={commands})
+class ItemsModule(ModuleBase):
+    pass
+"""
+
+
+@pytest.fixture()
+def static_project(tmp_path, add_ellar_project_to_py_project):
+    def _create(items_commands: str = "[greet]", users: str = USERS) -> EllarCLIService:
+        add_ellar_project_to_py_project("static_project")
+        package = tmp_path / "static_project"
+        (package / "modules").mkdir(parents=True)
+        files = {
+            package / "__init__.py": "raise RuntimeError('must not be imported')",
+            package / "root_module.py": ROOT_MODULE,
+            package / "commands.py": COMMANDS,
+            package / "modules" / "__init__.py": "",
+            package / "modules" / "users.py": users,
+            package / "modules" / "items.py": ITEMS.format(commands=items_commands),
+        }
+        for path, content in files.items():
+            path.write_text(textwrap.dedent(content))
+        return EllarCLIService.import_project_meta()
+
+    return _create
+
+
+def test_static_discovery_finds_module_commands(static_project):
+    discovery = StaticCommandDiscovery(static_project())
+    specs = {spec["name"]: spec for spec in discovery.discover()}
+
+    assert sorted(specs) == ["hello", "users"]
+    assert "static_project" not in sys.modules
+
+    hello = specs["hello"]
+    assert hello["import"] == "static_project.commands:hello"
+    assert hello["help"] == "Says hello"
+    assert [
+        (param["name"], param["kind"], param["type"]["param_type"])
+        for param in hello["params"]
+    ] == [
+        ("count", "option", "Int"),
+        ("shout", "option", "Bool"),
+        ("mode", "option", "Choice"),
+        ("name", "argument", "String"),
+    ]
+    assert hello["params"][1]["secondary_opts"] == ["--no-shout"]
+    assert hello["params"][2]["type"]["choices"] == ["a", "b"]
+    assert hello["params"][3]["required"] is True
+
+    users = specs["users"]
+    assert users["import"] == "static_project.modules.users:users_group"
+    assert [command["name"] for command in users["commands"]] == ["create"]
+    assert discovery.source_files
+
+
+def test_static_discovery_gives_up_on_dynamic_declarations(static_project):
+    discovery = StaticCommandDiscovery(static_project("get_commands()"))
+    assert discovery.discover() is None
+
+
+def test_static_discovery_gives_up_on_added_sub_commands(static_project):
+    users = USERS + textwrap.dedent(
+        '''
+        @click.command(name="delete")
+        def delete_user():
+            """Deletes a user"""
+
+
+        users_group.add_command(delete_user)
+        '''
+    )
+    discovery = StaticCommandDiscovery(static_project(users=users))
+    assert discovery.discover() is None
+
+
+def test_static_discovery_lists_commands_without_importing_project(change_os_dir):
+    script = (
+        "import sys\n"
+        "from ellar_cli.main import app_cli\n"
+        "try:\n"
+        "    app_cli(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print('example_project' in sys.modules)\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        stdout=subprocess.PIPE,
+        env={
+            "ELLAR_STATIC_DISCOVERY": "1",
+            "ELLAR_COMMAND_MANIFEST": "0",
+            "PATH": "",
+        },
+    )
+    assert result.returncode == 0
+    assert b"whatever-you-want  Whatever you want" in result.stdout
+    assert result.stdout.splitlines()[-1] == b"False"